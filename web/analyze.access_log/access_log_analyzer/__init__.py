@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Analizador de access.log (Nginx / Apache) importable como librería.
+
+Ejemplo::
+
+    from access_log_analyzer import ComprehensiveLogAnalyzer
+
+    analyzer = ComprehensiveLogAnalyzer(threshold=1.0)
+    analyzer.feed(lines).finalize()
+    aggregates = analyzer.get_aggregates()
+"""
+
+from .analyzer import ComprehensiveLogAnalyzer
+from .cloudflare import is_cloudflare_ip, refresh_cloudflare_ranges
+from .compare import compare_summaries, load_comparison, load_endpoint_summaries, parse_window, print_comparison
+from .histogram import LatencyHistogram, percentile
+
+__all__ = [
+    'ComprehensiveLogAnalyzer',
+    'LatencyHistogram',
+    'compare_summaries',
+    'is_cloudflare_ip',
+    'load_comparison',
+    'load_endpoint_summaries',
+    'parse_window',
+    'percentile',
+    'print_comparison',
+    'refresh_cloudflare_ranges'
+]
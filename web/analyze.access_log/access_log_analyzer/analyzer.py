@@ -0,0 +1,1800 @@
+# -*- coding: utf-8 -*-
+"""
+Analizador de access.log: parseo en streaming, agregados y reportes
+"""
+
+import re
+import os
+import csv
+import heapq
+import json
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from .cloudflare import is_cloudflare_ip
+from .colo import ColoTracker, extract_colo
+from .anomaly import AnomalyDetector
+from .bandwidth import BandwidthTracker
+from .concurrency import ConcurrencyTracker, timestamp_to_epoch
+from .errorlog import ANY_ENDPOINT, ErrorLogCorrelator
+from .groupby import GroupByAggregator
+from .histogram import LatencyHistogram, apdex_score, quantile_from_counts
+from .pipeline import ORDERED_ENGINES, open_input, is_stream, run_pipeline
+from .quality import ParseQuality
+from .retries import RetryDetector, client_ip
+from .samples import SlowRequestSampler
+from .slo import SLOTracker
+from .sampling import LineSampler, mean_interval, proportion_interval, quantile_interval, scaled_interval
+from .storage import LazyRows, RequestStore, peak_rss
+from .useragent import UserAgentTracker
+
+# Expresiones del formato apilog, compiladas una sola vez
+TIMESTAMP_RE = re.compile(r'(\d+/\w+/\d+:\d+:\d+:\d+ -\d+)')
+REQUEST_RE = re.compile(r'"(\w+) (\S+)')
+STATUS_RE = re.compile(r'status=(\d+)')
+RT_RE = re.compile(r'\brt=(\d+\.\d+)')
+BYTES_RE = re.compile(r'status=\d+\s+(\d+)')
+
+# Rango del umbral automático (segundos)
+AUTO_THRESHOLD_MIN = 0.5
+AUTO_THRESHOLD_MAX = 3.0
+# Bandas de latencia para muestrear lentos antes de conocer el umbral automático
+AUTO_THRESHOLD_BANDS = [AUTO_THRESHOLD_MIN, 1.0, 1.5, 2.0, AUTO_THRESHOLD_MAX]
+
+# Excel limita los nombres de hoja a 31 caracteres
+EXCEL_SHEET_NAME_MAX = 31
+
+
+def excel_sheet_names(names):
+    """{nombre: nombre de hoja} únicos de hasta 31 caracteres (Excel no distingue mayúsculas)"""
+    result = {}
+    used = set()
+    for name in names:
+        sheet = name[:EXCEL_SHEET_NAME_MAX]
+        n = 1
+        while sheet.lower() in used:
+            n += 1
+            suffix = f"~{n}"
+            sheet = name[:EXCEL_SHEET_NAME_MAX - len(suffix)] + suffix
+        used.add(sheet.lower())
+        result[name] = sheet
+    return result
+
+
+class ComprehensiveLogAnalyzer:
+    """Analizador de access.log.
+
+    Uso como librería (sin archivos ni subprocesos)::
+
+        analyzer = ComprehensiveLogAnalyzer(threshold=[0.3, 1])
+        analyzer.feed(lines)          # iterable de str o bytes, se puede llamar varias veces
+        analyzer.finalize()
+        results = analyzer.get_aggregates()
+    """
+
+    def __init__(self, log_file=None, threshold=None, since=None, until=None, concurrency=False,
+                 max_memory=None, tmp_dir=None, samples=20, sample_rate=None,
+                 user_agents=False, error_log=None, group_by=None, anomalies=False, anomaly_z=3.0,
+                 anomaly_ratio=2.0, quarantine_file=None, retries=False, retry_window=10, workers=1, slo=None,
+                 bandwidth=False):
+        # Opciones tal cual, para construir los analizadores de cada lote (pipeline)
+        self._options = {name: value for name, value in locals().items() if name != 'self'}
+        self.log_file = log_file
+        # Procesos de parseo; con más de uno se usa el pipeline por lotes
+        self.workers = max(1, workers or 1)
+        # Ventana de tiempo opcional (datetime) para filtrar requests
+        self.since = since
+        self.until = until
+        # threshold puede ser un número o una lista (el primero es el principal).
+        # Si no se especifica, se calcula automáticamente al terminar de parsear
+        if threshold is not None and not isinstance(threshold, (list, tuple)):
+            threshold = [threshold]
+        self.user_threshold = threshold is not None
+        self.thresholds = list(threshold) if threshold is not None else []
+        self.threshold = self.thresholds[0] if self.thresholds else None
+        # Agregados exactos por endpoint (ver storage.py); con max_memory hace spill a disco.
+        # Todo lo que es por endpoint (latencia por status y hora, códigos) vive ahí
+        self.endpoints = RequestStore(max_memory=max_memory, tmp_dir=tmp_dir)
+        self._endpoint_details = None
+        # Agregados globales por request: [cantidad, suma de tiempos, máximo]
+        # con claves ('cf', bool), ('status', código, bool) y ('hour', hora)
+        self.time_stats = defaultdict(lambda: [0, 0.0, 0.0])
+        # Conteo exacto de valores de rt (resolución de ms) para percentiles
+        self.response_time_counts = Counter()
+        # Histogramas de latencia globales por celda (hora, es_cloudflare)
+        self.latency_cells = defaultdict(LatencyHistogram)
+        self._histogram_cache = {}
+        self.hourly_stats = defaultdict(lambda: defaultdict(int))
+        self.status_codes = defaultdict(int)
+        self.cloudflare_stats = {'cloudflare': 0, 'direct': 0}
+        self.export_data = {}
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.total_lines = 0
+        self.parsed_lines = 0
+        # Líneas rechazadas por motivo (sin imprimir por línea) y cuarentena opcional
+        self.quality = ParseQuality(quarantine_file=quarantine_file)
+        # Modo aproximado: solo se parsean las líneas elegidas por hash
+        self.sample_rate = sample_rate if sample_rate and sample_rate < 1 else None
+        self.sampler = LineSampler(self.sample_rate) if self.sample_rate else None
+        self.sampled_lines = 0
+        # Bytes enviados ($body_bytes_sent), si el formato los incluye (opcional: estado por endpoint)
+        self.bandwidth = BandwidthTracker() if bandwidth else None
+        # Latencia por data center de Cloudflare (sufijo de cf_ray)
+        self.colos = ColoTracker()
+        # Ejemplos de requests lentos/499/5xx (memoria fija); con umbral automático
+        # se muestrea por bandas dentro del rango posible y se filtra al reportar
+        slow_bands = [self.threshold] if self.user_threshold else AUTO_THRESHOLD_BANDS
+        self.samples = SlowRequestSampler(size=samples, slow_bands=slow_bands)
+        # Corte de "lento" de los motores que deciden en streaming: el umbral de -t o,
+        # con umbral automático, el mínimo posible (el definitivo se conoce al final)
+        streaming_slow = self.threshold if self.user_threshold else AUTO_THRESHOLD_MIN
+        # Motores opcionales que se alimentan en la misma pasada
+        self.concurrency = ConcurrencyTracker() if concurrency else None
+        self.user_agents = UserAgentTracker() if user_agents else None
+        # Agrupaciones declarativas, ej. [(('host', None), ('status_class', None))]
+        self.group_by = GroupByAggregator(group_by) if group_by else None
+        # error.log de nginx: se indexa antes del access.log y se cruza por minuto y endpoint
+        self.error_log_file = error_log
+        self.error_log = ErrorLogCorrelator(min_slow=slow_bands[0]) if error_log else None
+        self._error_log_loaded = False
+        # Anomalías por endpoint y minuto contra una base EWMA (estado acotado por endpoint)
+        self.anomalies = (AnomalyDetector(streaming_slow, z_score=anomaly_z, ratio=anomaly_ratio)
+                          if anomalies else None)
+        # Reintentos por (realip, endpoint) tras 499/5xx/lento, con expulsión por TTL
+        self.retries = RetryDetector(streaming_slow, window=retry_window) if retries else None
+        # SLOs por endpoint (ver slo.load_slo_config): requests y malos por minuto para los burn rates
+        self.slo = SLOTracker(**slo) if slo else None
+        self._last_timestamp = None
+        self._last_epoch = None
+
+    def suggest_threshold(self):
+        """Sugiere un threshold a partir del histograma global de latencias"""
+        # Para logs de aplicaciones web:
+        # - < 100ms: Excelente
+        # - 100-500ms: Bueno
+        # - 500ms-1s: Aceptable
+        # - > 1s: Lento
+        # - > 3s: Muy lento
+        overall = self.get_histogram('total')
+        if overall.total == 0:
+            return 1.0  # 1 segundo como valor por defecto
+
+        # Percentil 90 + margen, entre 0.5 y 3 segundos, redondeado a un
+        # límite de bucket (10ms) para que los conteos sigan siendo exactos
+        suggested = min(overall.quantile(0.90) * 1.5, AUTO_THRESHOLD_MAX)
+        suggested = max(suggested, AUTO_THRESHOLD_MIN)
+        return round(suggested, 2)
+
+    def apply_thresholds(self, thresholds):
+        """Cambia los umbrales sin reparsear (los conteos salen de los histogramas)"""
+        self.thresholds = list(thresholds)
+        self.threshold = self.thresholds[0]
+        self._endpoint_details = None
+
+    def get_histogram(self, *dimensions):
+        """Histograma combinado de las celdas agrupadas por las dimensiones dadas.
+
+        Dimensiones: 'endpoint', 'hour', 'cloudflare'. Sin dimensiones (o con
+        'total') devuelve el histograma global. El resultado es un dict
+        {clave: LatencyHistogram}, salvo para el global. Por endpoint se arma
+        desde el almacén (recorre todos los endpoints; sin desglose por Cloudflare).
+        """
+        dimensions = tuple(d for d in dimensions if d != 'total')
+        if dimensions in self._histogram_cache:
+            return self._histogram_cache[dimensions]
+
+        positions = {'hour': 0, 'cloudflare': 1}
+        if 'endpoint' in dimensions:
+            result = self._endpoint_histograms(dimensions)
+        elif not dimensions:
+            result = LatencyHistogram()
+            for hist in self.latency_cells.values():
+                result.merge(hist)
+        else:
+            result = defaultdict(LatencyHistogram)
+            for cell, hist in self.latency_cells.items():
+                key = tuple(cell[positions[d]] for d in dimensions)
+                result[key[0] if len(key) == 1 else key].merge(hist)
+
+        self._histogram_cache[dimensions] = result
+        return result
+
+    def _endpoint_histograms(self, dimensions):
+        """Histogramas por endpoint (y hora) desde las celdas (status, hora) del almacén"""
+        if 'cloudflare' in dimensions:
+            raise ValueError("Los histogramas por endpoint no se desglosan por 'cloudflare'")
+        result = defaultdict(LatencyHistogram)
+        for endpoint, stats in self.endpoints.items():
+            for (_, hour), cell in stats.cells.items():
+                values = {'endpoint': endpoint, 'hour': hour}
+                key = tuple(values[d] for d in dimensions)
+                result[key[0] if len(key) == 1 else key].merge(cell.hist)
+        return result
+
+    def parse_log(self):
+        """Parse el archivo de log ('-' lee stdin; .gz se descomprime al vuelo)"""
+        if self.log_file != '-' and not os.path.exists(self.log_file):
+            print(f"❌ Error: Archivo {self.log_file} no encontrado")
+            return False
+
+        print(f"🔍 Analizando: {self.log_file}")
+        if self.user_threshold:
+            print(f"⏱️  Umbral para lento: {', '.join(f'{t}s' for t in self.thresholds)}")
+        else:
+            print("⏱️  Umbral para lento: automático (se calcula al terminar)")
+        print(f"{'='*80}")
+
+        if self.error_log is not None:
+            self.load_error_log()
+            print(f"📕 error.log: {self.error_log_file} ({self.error_log.total_events:,} eventos indexados)")
+        if self.sampler is not None:
+            print(f"🎲 Modo aproximado: muestra determinista del {self.sample_rate:.2%} de las líneas")
+
+        if self.workers > 1:
+            print(f"⚙️  Pipeline: {self.workers} procesos de parseo por lotes")
+            with open_input(self.log_file) as f:
+                run_pipeline(self, f, self.workers, progress=True)
+        else:
+            # Con muestreo se lee en binario: el hash se calcula sobre los bytes crudos
+            # y solo se decodifican las líneas seleccionadas. Con cuarentena también,
+            # para escribir las líneas malformadas sin perder bytes inválidos
+            binary = self.sampler is not None or bool(self.quality.quarantine_file)
+            if is_stream(self.log_file):
+                f = open_input(self.log_file, binary=binary)
+            elif binary:
+                f = open(self.log_file, 'rb')
+            else:
+                f = open(self.log_file, 'r', encoding='utf-8', errors='ignore')
+            with f:
+                if self.endpoints.max_memory and not is_stream(self.log_file):
+                    self.endpoints.expected_records = int(self._estimate_lines(f) * (self.sample_rate or 1))
+                self.feed(f, progress=True)
+
+        print(f"\n{'='*80}")
+        print("✅ PROCESAMIENTO COMPLETADO")
+        print(f"{'='*80}")
+        print(f"📊 Líneas totales: {self.total_lines:,}")
+        if self.sampler is not None:
+            print(f"🎲 Líneas muestreadas: {self.sampled_lines:,} ({self.sample_rate:.2%})")
+        print(f"✅ Líneas parseadas: {self.parsed_lines:,}")
+        self.quality.print_summary(self.examined_lines)
+        print(f"🌐 Endpoints únicos: {len(self.endpoints):,}")
+        if self.endpoints.spills:
+            print(f"💾 Spill a disco: {self.endpoints.spilled:,} requests en {self.endpoints.spills} volcado(s), "
+                  f"{self.endpoints.partitions} particiones ({self.endpoints.spill_dir})")
+        if self.endpoints.max_memory:
+            # VmHWM: el pico real, no solo el de las lecturas periódicas del almacén
+            peak = max(self.endpoints.peak_rss, peak_rss() or 0)
+            if peak > self.endpoints.max_memory:
+                print(f"⚠️  RSS máximo {peak / 1024 ** 2:,.0f} MiB por encima de --max-memory: los agregados "
+                      f"globales y los de las opciones extra (--user-agents, --group-by, ...) no se vuelcan a disco")
+
+        # Mostrar rango de fechas
+        self.show_date_range()
+
+        self.finalize()
+        if not self.user_threshold:
+            self.suggest_better_threshold()
+
+        return True
+
+    def _estimate_lines(self, f, sample_size=1024 * 1024):
+        """Estima el total de líneas del archivo a partir del primer MB"""
+        sample = f.read(sample_size)
+        f.seek(0)
+        if not sample:
+            return 0
+        if isinstance(sample, bytes):
+            avg_length = len(sample) / max(sample.count(b'\n'), 1)
+        else:
+            avg_length = len(sample.encode('utf-8', errors='ignore')) / max(sample.count('\n'), 1)
+        return int(os.path.getsize(self.log_file) / avg_length)
+
+    def load_error_log(self):
+        """Indexa el error.log (una vez, antes del access.log)"""
+        if self.error_log is None or self._error_log_loaded:
+            return
+        self._error_log_loaded = True
+        self.error_log.load_file(self.error_log_file)
+
+    def feed(self, lines, progress=False):
+        """Procesa un iterable de líneas (str o bytes) y actualiza los agregados"""
+        self.load_error_log()
+        for line in lines:
+            self.total_lines += 1
+            raw = line if isinstance(line, bytes) else None
+            if self.sampler is not None:
+                key = raw if raw is not None else line.encode('utf-8', errors='ignore')
+                if self.sampler.selected(key.rstrip(b'\r\n')):
+                    self.sampled_lines += 1
+                else:
+                    line = None
+
+            if line is not None:
+                if raw is not None:
+                    line = raw.decode('utf-8', errors='ignore')
+                if self.parse_line(line, raw):
+                    self.parsed_lines += 1
+
+            if progress and self.total_lines % 10000 == 0:
+                print(f"📖 Líneas procesadas: {self.total_lines:,}...")
+
+        self._histogram_cache = {}
+        self._endpoint_details = None
+        return self
+
+    @property
+    def examined_lines(self):
+        """Líneas que llegaron al parser (con muestreo, solo las muestreadas): base de los % de calidad"""
+        return self.sampled_lines if self.sampler is not None else self.total_lines
+
+    def get_worker_options(self):
+        """Opciones para los analizadores de cada lote: sin spill, sin archivos y secuenciales"""
+        options = dict(self._options)
+        options.update(max_memory=None, tmp_dir=None, error_log=None, quarantine_file=None, workers=1)
+        return options
+
+    def get_partial(self):
+        """Estado de un lote para unirlo en otro analizador (solo estructuras serializables)"""
+        return {
+            'total_lines': self.total_lines,
+            'parsed_lines': self.parsed_lines,
+            'sampled_lines': self.sampled_lines,
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'time_stats': dict(self.time_stats),
+            'response_time_counts': self.response_time_counts,
+            'latency_cells': dict(self.latency_cells),
+            'hourly_stats': {hour: dict(stats) for hour, stats in self.hourly_stats.items()},
+            'status_codes': dict(self.status_codes),
+            'cloudflare_stats': self.cloudflare_stats,
+            'endpoints': self.endpoints,
+            'samples': self.samples,
+            'bandwidth': self.bandwidth,
+            'colos': self.colos,
+            'quality': self.quality,
+            'user_agents': self.user_agents,
+            'group_by': self.group_by,
+            'slo': self.slo,
+            'error_log': self.error_log.cells if self.error_log is not None else None,
+            'ordered': {name: getattr(self, name) for name in ORDERED_ENGINES
+                        if getattr(self, name) is not None}
+        }
+
+    def merge_partial(self, partial):
+        """Une el estado de un lote posterior (ver get_partial); los lotes deben llegar en orden"""
+        self.total_lines += partial['total_lines']
+        self.parsed_lines += partial['parsed_lines']
+        self.sampled_lines += partial['sampled_lines']
+        if self.first_timestamp is None:
+            self.first_timestamp = partial['first_timestamp']
+        if partial['last_timestamp'] is not None:
+            self.last_timestamp = partial['last_timestamp']
+
+        for key, (count, total, maximum) in partial['time_stats'].items():
+            stats = self.time_stats[key]
+            stats[0] += count
+            stats[1] += total
+            if maximum > stats[2]:
+                stats[2] = maximum
+        for hour, values in partial['hourly_stats'].items():
+            inner = self.hourly_stats[hour]
+            for name, value in values.items():
+                inner[name] += value
+        self.response_time_counts.update(partial['response_time_counts'])
+        for cell, hist in partial['latency_cells'].items():
+            self.latency_cells[cell].merge(hist)
+        for status, count in partial['status_codes'].items():
+            self.status_codes[status] += count
+        for kind, count in partial['cloudflare_stats'].items():
+            self.cloudflare_stats[kind] += count
+        self.endpoints.merge(partial['endpoints'])
+
+        self.samples.merge(partial['samples'])
+        if self.bandwidth is not None:
+            self.bandwidth.merge(partial['bandwidth'])
+        self.colos.merge(partial['colos'])
+        self.quality.merge(partial['quality'])
+        if self.user_agents is not None:
+            self.user_agents.merge(partial['user_agents'])
+        if self.group_by is not None:
+            self.group_by.merge(partial['group_by'])
+        if self.slo is not None:
+            self.slo.merge(partial['slo'])
+        if self.error_log is not None:
+            self.error_log.merge_cells(partial['error_log'])
+        # Los motores que dependen del orden unen los agregados del lote en orden
+        for name, batch in partial['ordered'].items():
+            getattr(self, name).merge(batch)
+
+        self._histogram_cache = {}
+        self._endpoint_details = None
+        return self
+
+    def finalize(self):
+        """Cierra el parseo: calcula el umbral automático si no se especificó"""
+        self._histogram_cache = {}
+        if not self.user_threshold:
+            self.apply_thresholds([self.suggest_threshold()])
+        if self.bandwidth is not None:
+            self.bandwidth.flush()
+        if self.concurrency is not None:
+            self.concurrency.flush()
+        if self.anomalies is not None:
+            self.anomalies.flush()
+        self._endpoint_details = None
+        return self
+
+    def close(self):
+        """Libera recursos temporales (archivos de spill) y cierra la cuarentena"""
+        self.endpoints.close()
+        self.quality.close()
+
+    def get_time_stats(self, kind, *key):
+        """[cantidad, suma, máximo] combinando las claves de time_stats que coinciden"""
+        count, total, maximum = 0, 0.0, 0.0
+        for stats_key, (c, t, m) in self.time_stats.items():
+            if stats_key[0] == kind and stats_key[1:len(key) + 1] == key:
+                count += c
+                total += t
+                maximum = max(maximum, m)
+        return count, total, maximum
+
+    def get_mean_time(self, kind, *key):
+        count, total, _ = self.get_time_stats(kind, *key)
+        return total / count if count else 0.0
+
+    def global_quantile(self, n, i):
+        """Percentil global exacto (mismo resultado que statistics.quantiles)"""
+        return quantile_from_counts(self.response_time_counts, n, i)
+
+    def get_endpoint_details(self):
+        """Métricas por endpoint a partir de sus contadores exactos (ver storage.EndpointStats).
+
+        Con spill a disco se procesa una partición a la vez; el resultado se
+        ordena por aparición para que sea idéntico a la corrida en memoria.
+        Con --max-memory los detalles no quedan en memoria: se escriben a un
+        archivo temporal (storage.DetailFile) que se recorre en el mismo orden.
+        Los lentos, el Apdex y sus horas son del umbral vigente al calcularlos.
+        """
+        if self._endpoint_details is not None:
+            return self._endpoint_details
+
+        if self.endpoints.max_memory:
+            details = self.endpoints.detail_file()
+            for endpoint, stats in self.endpoints.items():
+                details[endpoint] = self._endpoint_detail(stats)
+        else:
+            details = {endpoint: self._endpoint_detail(stats) for endpoint, stats in self.endpoints.items()}
+            order = self.endpoints.order
+            details = dict(sorted(details.items(), key=lambda x: order[x[0]]))
+        self._endpoint_details = details
+        return details
+
+    def _endpoint_detail(self, stats):
+        values = sorted(stats.times)
+        mean, stdev = stats.moments()
+        overall = LatencyHistogram()
+        by_hour = {}
+        status_time = {}
+        for (status, hour), cell in stats.cells.items():
+            overall.merge(cell.hist)
+            by_hour.setdefault(hour, LatencyHistogram()).merge(cell.hist)
+            status_time[status] = status_time.get(status, 0) + cell.time_us
+        t = self.threshold
+        return {
+            'total': stats.count,
+            'cf_count': stats.cloudflare,
+            'direct_count': stats.count - stats.cloudflare,
+            'avg_time': mean,
+            'max_time': values[-1] if values else 0.0,
+            'min_time': values[0] if values else 0.0,
+            'stdev': stdev,
+            'p95': quantile_from_counts(stats.times, 100, 95, values),
+            'p99': quantile_from_counts(stats.times, 100, 99, values),
+            'errors_499': stats.status.get(499, 0),
+            'errors_5xx': sum(count for code, count in stats.status.items() if 500 <= code <= 599),
+            'status_dist': dict(stats.status),
+            # Tiempo acumulado por status (segundos), para los promedios por código
+            'status_time': {status: time_us / 1e6 for status, time_us in status_time.items()},
+            'hour_dist': dict(stats.hours),
+            'slow': {threshold: overall.count_above(threshold) for threshold in self.thresholds},
+            'apdex': overall.apdex(t) if t is not None else None,
+            # hora -> (requests, lentos, frustrados) con T = umbral principal
+            'hour_apdex': {hour: (hist.total, hist.count_above(t), hist.count_above(t * 4))
+                           for hour, hist in sorted(by_hour.items())} if t is not None else {}
+        }
+
+    def get_aggregates(self):
+        """Agregados del análisis como estructuras simples (dict/list/números)"""
+        by_hour = self.get_histogram('hour')
+        hourly = {}
+        for hour, stats in self.hourly_stats.items():
+            hourly[hour] = dict(stats)
+            hourly[hour]['slow'] = by_hour[hour].count_above(self.threshold) if hour in by_hour else 0
+
+        return {
+            'total_lines': self.total_lines,
+            'parsed_lines': self.parsed_lines,
+            'thresholds': list(self.thresholds),
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'status_codes': dict(self.status_codes),
+            'cloudflare': dict(self.cloudflare_stats),
+            'hourly': hourly,
+            'endpoints': self.get_endpoint_summaries(),
+            'endpoints_by_code': self._get_endpoint_counts_by_code()
+        }
+
+    def _get_endpoint_counts_by_code(self):
+        """{código: {endpoint: requests}}"""
+        by_code = defaultdict(dict)
+        for endpoint, detail in self.get_endpoint_details().items():
+            for code, count in detail['status_dist'].items():
+                by_code[code][endpoint] = count
+        return dict(by_code)
+
+    def parse_line(self, line, raw=None):
+        """Parse una línea individual del log (`raw`: bytes originales, para la cuarentena)"""
+        try:
+            # Extraer información básica
+            method, url, status, response_time, timestamp, is_cloudflare, body_bytes = self.extract_data(
+                line)
+            if not method or not url:
+                self.quality.reject('sin_request' if line.strip() else 'linea_vacia', line, raw)
+                return False
+            if status is None:
+                self.quality.reject('sin_status', line, raw)
+                return False
+
+            # Filtrar por ventana de tiempo (modo compare)
+            if self.since or self.until:
+                dt = self.parse_timestamp(timestamp) if timestamp else None
+                if dt is None:
+                    self.quality.reject('sin_timestamp_en_ventana', line, raw)
+                    return False
+                if (self.since and dt < self.since) or (self.until and dt >= self.until):
+                    self.quality.reject('fuera_de_ventana', line, raw)
+                    return False
+
+            if response_time is None:
+                self.quality.warn('sin_rt')
+                response_time = 0.0
+            if not timestamp:
+                self.quality.warn('sin_timestamp')
+
+            # Actualizar primera y última timestamp
+            if timestamp:
+                if self.first_timestamp is None:
+                    self.first_timestamp = timestamp
+                self.last_timestamp = timestamp
+
+            clean_url = url.split('?')[0]
+            endpoint = f"{method} {clean_url}"
+
+            # Extraer hora CORREGIDO
+            hour = "unknown"
+            if timestamp and ":" in timestamp:
+                try:
+                    # Formato: 25/Sep/2025:00:00:10 -0600
+                    # Extraer la hora correctamente
+                    hour_part = timestamp.split(':')[1]
+                    hour = f"{int(hour_part):02d}:00"
+                except Exception as e:
+                    hour = "unknown"
+
+            self.endpoints.add(endpoint, status, response_time, hour, is_cloudflare)
+
+            # Estadísticas Cloudflare vs Directo
+            if is_cloudflare:
+                self.cloudflare_stats['cloudflare'] += 1
+            else:
+                self.cloudflare_stats['direct'] += 1
+
+            # Colo de Cloudflare que atendió el request (cf_ray="...-QRO")
+            self.colos.add(extract_colo(line), hour, is_cloudflare, status, response_time)
+
+            # Histograma de latencia de la celda; los lentos globales se derivan de aquí
+            self.latency_cells[(hour, is_cloudflare)].add(response_time)
+
+            # Estadísticas por hora
+            if hour != "unknown":
+                self.hourly_stats[hour]['total'] += 1
+                if status == 499:
+                    self.hourly_stats[hour]['error_499'] += 1
+                if is_cloudflare:
+                    self.hourly_stats[hour]['cloudflare'] += 1
+                else:
+                    self.hourly_stats[hour]['direct'] += 1
+
+            # Estadísticas por código de estado
+            self.status_codes[status] += 1
+
+            # Tiempos agregados (promedios y percentiles sin recorrer requests)
+            for key in (('cf', is_cloudflare), ('status', status, is_cloudflare), ('hour', hour)):
+                stats = self.time_stats[key]
+                stats[0] += 1
+                stats[1] += response_time
+                if response_time > stats[2]:
+                    stats[2] = response_time
+            self.response_time_counts[response_time] += 1
+
+            # Ejemplos para drill-down (solo se guarda la línea cruda)
+            self.samples.add(endpoint, status, response_time, line)
+
+            # Ancho de banda y tamaño de respuesta
+            if body_bytes is not None and self.bandwidth is not None:
+                self.bandwidth.add(endpoint, hour, is_cloudflare, body_bytes, response_time, timestamp)
+
+            # Desglose por clase de user agent (clasificación memorizada)
+            if self.user_agents is not None:
+                self.user_agents.add(self.user_agents.extract(line), endpoint, hour, is_cloudflare,
+                                     status, response_time)
+
+            # Agrupaciones personalizadas (una clave compuesta por agrupación)
+            if self.group_by is not None:
+                self.group_by.add({'line': line, 'endpoint': endpoint, 'method': method, 'path': clean_url,
+                                   'status': status, 'hour': hour, 'is_cloudflare': is_cloudflare},
+                                  status, response_time, body_bytes)
+
+            # Motores por minuto: el epoch se calcula una vez por timestamp distinto
+            if (self.error_log is not None or self.anomalies is not None or self.retries is not None
+                    or self.slo is not None) and timestamp:
+                if timestamp != self._last_timestamp:
+                    self._last_timestamp = timestamp
+                    self._last_epoch = timestamp_to_epoch(timestamp)
+
+                # Cruce con error.log (solo minutos con eventos)
+                if self.error_log is not None:
+                    self.error_log.add(self._last_epoch, endpoint, status, response_time)
+
+                # Anomalías contra la base del endpoint
+                if self.anomalies is not None:
+                    self.anomalies.add(self._last_epoch, endpoint, status, response_time)
+
+                # Reintentos del mismo cliente tras un fallo
+                if self.retries is not None:
+                    self.retries.add(self._last_epoch, client_ip(line), endpoint, hour, status, response_time)
+
+                # SLOs que cubren el endpoint
+                if self.slo is not None:
+                    self.slo.add(self._last_epoch, endpoint, status, response_time)
+
+            # Concurrencia reconstruida (timestamp de fin - rt)
+            if self.concurrency is not None and timestamp:
+                self.concurrency.add(timestamp, response_time, endpoint, status)
+
+            return True
+
+        except Exception as e:
+            # Sin imprimir por línea: un cambio de formato no debe inundar la salida
+            self.quality.reject(f"excepcion_{type(e).__name__}", line, raw)
+            return False
+
+    def extract_data(self, line):
+        """Extrae datos de una línea de log"""
+        method, url, status, response_time, timestamp, is_cloudflare = None, None, None, None, None, False
+        body_bytes = None
+
+        # Detectar Cloudflare (presencia de "cf-node")
+        is_cloudflare = is_cloudflare_ip(line)
+
+        # Timestamp completo
+        ts_match = TIMESTAMP_RE.search(line)
+        if ts_match:
+            timestamp = ts_match.group(1)
+
+        # Método y URL
+        quote_match = REQUEST_RE.search(line)
+        if quote_match:
+            method, url = quote_match.groups()
+
+        # Status
+        status_match = STATUS_RE.search(line)
+        if status_match:
+            status = int(status_match.group(1))
+
+        # Tiempo de respuesta
+        rt_match = RT_RE.search(line)
+        if rt_match:
+            response_time = float(rt_match.group(1))
+
+        # Bytes del cuerpo ($body_bytes_sent, justo después de status=)
+        bytes_match = BYTES_RE.search(line)
+        if bytes_match:
+            body_bytes = int(bytes_match.group(1))
+
+        return method, url, status, response_time, timestamp, is_cloudflare, body_bytes
+
+    def count_slow(self, dimension=None, key=None, threshold=None):
+        """Requests lentos (> threshold) de un grupo, derivados de los histogramas"""
+        threshold = threshold if threshold is not None else self.threshold
+        if dimension is None:
+            return self.get_histogram().count_above(threshold)
+        if dimension == 'endpoint':
+            detail = self.get_endpoint_details().get(key)
+            if detail is None:
+                return 0
+            if threshold in detail['slow']:
+                return detail['slow'][threshold]
+        groups = self.get_histogram(dimension)
+        return groups[key].count_above(threshold) if key in groups else 0
+
+    def show_date_range(self):
+        """Muestra el rango de fechas del log"""
+        if self.first_timestamp and self.last_timestamp:
+            print(f"📅 Rango de fechas del log:")
+            print(
+                f"   🟢 Inicio: {self.format_timestamp(self.first_timestamp)}")
+            print(f"   🔴 Fin:    {self.format_timestamp(self.last_timestamp)}")
+
+            # Calcular duración
+            try:
+                start_dt = self.parse_timestamp(self.first_timestamp)
+                end_dt = self.parse_timestamp(self.last_timestamp)
+                duration = end_dt - start_dt
+                print(f"   ⏳ Duración: {self.format_duration(duration)}")
+            except BaseException:
+                print(f"   ⏳ Duración: No se pudo calcular")
+        else:
+            print(f"📅 No se pudieron extraer las fechas del log")
+
+    def parse_timestamp(self, timestamp_str):
+        """Convierte string de timestamp a datetime object"""
+        try:
+            # Formato: 25/Sep/2025:00:00:10 -0600
+            date_part = timestamp_str.split(' ')[0]  # "25/Sep/2025:00:00:10"
+            return datetime.strptime(date_part, '%d/%b/%Y:%H:%M:%S')
+        except Exception as e:
+            return None
+
+    def format_timestamp(self, timestamp_str):
+        """Formatea el timestamp para mejor legibilidad"""
+        try:
+            dt = self.parse_timestamp(timestamp_str)
+            if dt:
+                return dt.strftime('%Y-%m-%d %H:%M:%S')
+            return timestamp_str
+        except BaseException:
+            return timestamp_str
+
+    def format_duration(self, duration):
+        """Formatea la duración en formato legible"""
+        days = duration.days
+        hours = duration.seconds // 3600
+        minutes = (duration.seconds % 3600) // 60
+        seconds = duration.seconds % 60
+
+        parts = []
+        if days > 0:
+            parts.append(f"{days} día{'s' if days > 1 else ''}")
+        if hours > 0:
+            parts.append(f"{hours} hora{'s' if hours > 1 else ''}")
+        if minutes > 0:
+            parts.append(f"{minutes} minuto{'s' if minutes > 1 else ''}")
+        if seconds > 0 or not parts:
+            parts.append(f"{seconds} segundo{'s' if seconds > 1 else ''}")
+
+        return ", ".join(parts)
+
+    def get_http_code_description(self, code):
+        """Devuelve la descripción del código HTTP"""
+        descriptions = {
+            200: "OK - Successful",
+            201: "Created",
+            202: "Accepted",
+            204: "No Content",
+            400: "Bad Request",
+            401: "Unauthorized",
+            403: "Forbidden",
+            404: "Not Found",
+            499: "Client Closed Request",
+            500: "Internal Server Error",
+            502: "Bad Gateway",
+            503: "Service Unavailable",
+            504: "Gateway Timeout"
+        }
+        return descriptions.get(code, "")
+
+    def generate_comprehensive_report(self):
+        """Genera reporte completo en pantalla"""
+        if not self.endpoints:
+            print("❌ No hay datos para generar reporte")
+            return
+
+        total_requests = sum(self.status_codes.values())
+        if total_requests == 0:
+            print("❌ No hay requests para analizar")
+            return
+
+        # Modo aproximado: estimaciones con margen de error en lugar de conteos
+        if self.sampler is not None:
+            self.print_sampling_estimates()
+        else:
+            self.print_general_stats()
+
+        # 1. DISTRIBUCIÓN DETALLADA POR CÓDIGOS HTTP
+        self.print_http_status_distribution()
+
+        # 2. TABLA CLOUDFLARE VS DIRECTOS
+        self.print_cloudflare_vs_direct()
+
+        # 3. ENDPOINTS POR CÓDIGO HTTP (200, 202, 400, etc.)
+        self.print_endpoints_by_http_code()
+
+        # 4. TABLA PRINCIPAL - ENDPOINTS INDIVIDUALES
+        self.print_endpoints_table()
+
+        # 5. ANÁLISIS POR HORA
+        self.print_hourly_analysis()
+
+        # 6. ENDPOINTS MÁS LENTOS
+        self.print_slowest_endpoints()
+
+        # 7. LENTOS POR UMBRAL Y APDEX
+        self.print_threshold_analysis()
+        self.print_apdex()
+
+        # 8. EJEMPLOS DE REQUESTS LENTOS
+        self.samples.print_report(self.threshold)
+
+        # 9. ANCHO DE BANDA
+        if self.bandwidth is not None and self.bandwidth.overall.count:
+            self.bandwidth.print_report(self.threshold)
+
+        # 10. CONCURRENCIA Y THROUGHPUT
+        if self.concurrency is not None:
+            self.concurrency.print_report(self.threshold)
+
+        # 11. BOTS VS HUMANOS
+        if self.user_agents is not None:
+            self.user_agents.print_report(self.thresholds)
+
+        # 12. CAUSAS EN ERROR.LOG
+        if self.error_log is not None:
+            self.error_log.print_report(self.threshold, self._get_error_log_baselines())
+
+        # 13. AGRUPACIONES PERSONALIZADAS
+        if self.group_by is not None:
+            self.group_by.print_report(self.thresholds)
+
+        # 14. ANOMALÍAS POR MINUTO
+        if self.anomalies is not None:
+            self.anomalies.print_report(self.threshold)
+
+        # 15. TORMENTAS DE REINTENTOS
+        if self.retries is not None:
+            self.retries.print_report(self.threshold)
+
+        # 16. SLOs Y BURN RATE
+        if self.slo is not None:
+            self.slo.print_report()
+
+    def print_general_stats(self):
+        """Estadísticas generales (conteos exactos)"""
+        total_requests = sum(self.status_codes.values())
+        slow_count = self.count_slow()
+        errors_499 = self.status_codes.get(499, 0)
+        cloudflare_count = self.cloudflare_stats['cloudflare']
+        direct_count = self.cloudflare_stats['direct']
+
+        # ESTADÍSTICAS GENERALES MEJORADAS
+        print(f"\n{'='*80}")
+        print("📈 ESTADÍSTICAS GENERALES COMPLETAS")
+        print(f"{'='*80}")
+        print(f"📊 Total de requests: {total_requests:,}")
+
+        print(
+            f"🐌 Requests lentos (> {self.threshold}s): {slow_count:,} ({slow_count/total_requests*100:.1f}%)")
+        print(
+            f"❌ Errores 499: {errors_499:,} ({errors_499/total_requests*100:.1f}%)")
+        print(
+            f"☁️  Requests Cloudflare: {cloudflare_count:,} ({cloudflare_count/total_requests*100:.1f}%)")
+        print(
+            f"🔗 Requests Directos: {direct_count:,} ({direct_count/total_requests*100:.1f}%)")
+
+        # Tiempos promedios
+        avg_time_total = self.get_mean_time('cf')
+        p95 = self.global_quantile(20, 19)  # Percentil 95
+        p99 = self.global_quantile(100, 99)  # Percentil 99
+
+        avg_time_cf = self.get_mean_time('cf', True)
+        avg_time_direct = self.get_mean_time('cf', False)
+
+        print(f"⏱️  Tiempo promedio total: {avg_time_total:.3f}s")
+        print(f"📊 Percentil 95: {p95:.3f}s")
+        print(f"📊 Percentil 99: {p99:.3f}s")
+        print(f"⏱️  Tiempo promedio Cloudflare: {avg_time_cf:.3f}s")
+        print(f"⏱️  Tiempo promedio Directo: {avg_time_direct:.3f}s")
+
+        if errors_499:
+            count_499, sum_499, max_499 = self.get_time_stats('status', 499)
+            print(f"💥 Tiempo promedio en 499: {sum_499 / count_499:.3f}s")
+            print(f"💥 Tiempo máximo en 499: {max_499:.3f}s")
+
+    def get_endpoint_baselines(self, endpoints=None):
+        """{endpoint: (total, lentos, 499, 5xx)} del log completo.
+
+        Con `endpoints` solo se incluyen esos; ANY_ENDPOINT ('*') trae la suma
+        de todos los endpoints.
+        """
+        details = self.get_endpoint_details()
+        baselines = {}
+        for endpoint in (details if endpoints is None else endpoints):
+            detail = details.get(endpoint)
+            if detail is not None:
+                baselines[endpoint] = (detail['total'], detail['slow'][self.threshold], detail['errors_499'],
+                                       detail['errors_5xx'])
+        errors_5xx = sum(count for code, count in self.status_codes.items() if 500 <= code <= 599)
+        baselines[ANY_ENDPOINT] = (sum(self.status_codes.values()), self.count_slow(),
+                                   self.status_codes.get(499, 0), errors_5xx)
+        return baselines
+
+    def _get_error_log_baselines(self):
+        """Bases solo de los endpoints que aparecen en el error.log"""
+        return self.get_endpoint_baselines({endpoint for _, endpoint, _, _ in self.error_log.events})
+
+    def get_sampling_estimates(self):
+        """Estimaciones del log completo a partir de la muestra, con margen al 95%.
+
+        Las líneas leídas se cuentan exactamente; los conteos se estiman como
+        fracción de las líneas muestreadas escalada a ese total.
+        """
+        rate = self.sample_rate
+        sampled = sum(self.status_codes.values())
+        if sampled == 0:
+            return []
+        lines, sampled_lines = self.total_lines, self.sampled_lines
+
+        errors_5xx = sum(count for code, count in self.status_codes.items() if 500 <= code <= 599)
+        rows = []
+
+        def add(metric, unit, estimate, margin, hits, low=None, high=None):
+            rows.append({
+                'Metrica': metric,
+                'Unidad': unit,
+                'Estimacion': estimate,
+                'Margen_95': margin,
+                'Inferior': low if low is not None else estimate - margin,
+                'Superior': high if high is not None else estimate + margin,
+                'Muestra': hits
+            })
+
+        add('Líneas totales (exacto)', 'requests', float(lines), 0.0, sampled_lines)
+        estimate, margin = scaled_interval(sampled, sampled_lines, lines, rate)
+        add('Requests válidos', 'requests', estimate, margin, sampled)
+        for metric, hits in ((f'Requests lentos (> {self.threshold}s)', self.count_slow()),
+                             ('Errores 499', self.status_codes.get(499, 0)),
+                             ('Errores 5xx', errors_5xx),
+                             ('Requests Cloudflare', self.cloudflare_stats['cloudflare'])):
+            estimate, margin = scaled_interval(hits, sampled_lines, lines, rate)
+            add(metric, 'requests', estimate, margin, hits)
+            p, p_margin = proportion_interval(hits, sampled, rate)
+            add(f'% {metric}', '%', p * 100, p_margin * 100, hits)
+
+        mean, margin = mean_interval(self.response_time_counts, rate)
+        add('Tiempo promedio', 's', mean, margin, sampled)
+        for label, q in (('Percentil 95', 0.95), ('Percentil 99', 0.99)):
+            estimate, low, high = quantile_interval(self.response_time_counts, q)
+            add(label, 's', estimate, max(estimate - low, high - estimate), sampled, low, high)
+        return rows
+
+    def get_sampling_endpoint_estimates(self, limit=None):
+        """Requests, % lentos y % 499 estimados por endpoint (de más a menos muestreado)"""
+        details = self.get_endpoint_details()
+        if limit:
+            return list(self._sampling_endpoint_rows(
+                heapq.nlargest(limit, details.items(), key=lambda x: x[1]['total'])))
+        totals = {endpoint: detail['total'] for endpoint, detail in details.items()}
+        ranked = sorted(totals, key=totals.get, reverse=True)
+        return self._export_rows(
+            lambda: self._sampling_endpoint_rows((endpoint, details[endpoint]) for endpoint in ranked))
+
+    def _sampling_endpoint_rows(self, items):
+        rate = self.sample_rate
+        for endpoint, detail in items:
+            sampled = detail['total']
+            estimate, margin = scaled_interval(sampled, self.sampled_lines, self.total_lines, rate)
+            slow_pct, slow_margin = proportion_interval(detail['slow'][self.threshold], sampled, rate)
+            pct_499, margin_499 = proportion_interval(detail['errors_499'], sampled, rate)
+            yield {
+                'Endpoint': endpoint,
+                'Muestra': sampled,
+                'Requests_Estimados': round(estimate),
+                'Requests_Margen_95': round(margin),
+                'Porcentaje_Lentos': slow_pct * 100,
+                'Porcentaje_Lentos_Margen_95': slow_margin * 100,
+                'Porcentaje_499': pct_499 * 100,
+                'Porcentaje_499_Margen_95': margin_499 * 100
+            }
+
+    def print_sampling_estimates(self):
+        """Estadísticas generales en modo aproximado: estimación ± margen"""
+        print(f"\n{'='*80}")
+        print(f"🎲 ESTIMACIONES POR MUESTREO ({self.sample_rate:.2%} de las líneas, margen al 95%)")
+        print(f"{'='*80}")
+        print(f"{'MÉTRICA':<34} {'ESTIMACIÓN':>14} {'± MARGEN':>12} {'MUESTRA':>10}")
+        print(f"{'-'*80}")
+        for row in self.get_sampling_estimates():
+            if row['Unidad'] == 'requests':
+                value, margin = f"{row['Estimacion']:,.0f}", f"± {row['Margen_95']:,.0f}"
+            elif row['Unidad'] == '%':
+                value, margin = f"{row['Estimacion']:.2f}%", f"± {row['Margen_95']:.2f}%"
+            else:
+                value, margin = f"{row['Estimacion']:.3f}s", f"± {row['Margen_95']:.3f}s"
+            print(f"{row['Metrica']:<34} {value:>14} {margin:>12} {row['Muestra']:>10,}")
+
+        print(f"\n{'ENDPOINT':<50} {'REQUESTS EST.':>20} {'% LENTOS':>16} {'% 499':>16}")
+        print(f"{'-'*105}")
+        for row in self.get_sampling_endpoint_estimates(limit=15):
+            display_ep = row['Endpoint'][:48] + ".." if len(row['Endpoint']) > 50 else row['Endpoint']
+            requests_col = f"{row['Requests_Estimados']:,} ± {row['Requests_Margen_95']:,}"
+            slow_col = f"{row['Porcentaje_Lentos']:.1f} ± {row['Porcentaje_Lentos_Margen_95']:.1f}%"
+            col_499 = f"{row['Porcentaje_499']:.1f} ± {row['Porcentaje_499_Margen_95']:.1f}%"
+            print(f"{display_ep:<50} {requests_col:>20} {slow_col:>16} {col_499:>16}")
+
+        scale = self.total_lines / self.sampled_lines if self.sampled_lines else 0
+        print(f"\nℹ️  Las tablas siguientes se calculan sobre la muestra: los conteos son de la muestra "
+              f"(×{scale:,.0f} para estimar el total); porcentajes, promedios y percentiles "
+              f"son estimaciones directas.")
+
+    def suggest_better_threshold(self):
+        """Muestra el threshold calculado a partir de los percentiles del histograma"""
+        overall = self.get_histogram('total')
+        if overall.total == 0:
+            return
+
+        p75 = overall.quantile(0.75)
+        p90 = overall.quantile(0.90)
+        print(f"💡 Threshold automático basado en percentiles: {self.threshold:.2f}s")
+        print(f"   (Percentil 75: {p75:.3f}s, Percentil 90: {p90:.3f}s)")
+
+    def print_http_status_distribution(self):
+        """Distribución detallada por códigos HTTP"""
+        print(f"\n{'='*80}")
+        print("🔢 DISTRIBUCIÓN DETALLADA POR CÓDIGOS HTTP")
+        print(f"{'='*80}")
+        print(
+            f"{'CÓDIGO':<8} {'TOTAL':>8} {'%':>6} {'CLOUDFLARE':>10} {'DIRECTO':>8} {'AVG(s)':>8}")
+        print(f"{'-'*80}")
+
+        total_requests = sum(self.status_codes.values())
+        if total_requests == 0:
+            print("No hay datos para mostrar")
+            return
+
+        for code in sorted(self.status_codes.keys()):
+            count = self.status_codes[code]
+            percentage = (count / total_requests) * 100
+
+            # Calcular distribución Cloudflare vs Directo para este código
+            cf_count = self.get_time_stats('status', code, True)[0]
+            direct_count = self.get_time_stats('status', code, False)[0]
+            avg_time = self.get_mean_time('status', code)
+
+            # Descripción del código HTTP
+            code_desc = self.get_http_code_description(code)
+
+            print(
+                f"{code:<8} {count:>8} {percentage:>5.1f}% {cf_count:>10} {direct_count:>8} {avg_time:>7.3f}s")
+            if code_desc:
+                print(f"         {code_desc}")
+
+    def print_cloudflare_vs_direct(self):
+        """Tabla comparativa Cloudflare vs Directos"""
+        print(f"\n{'='*100}")
+        print("☁️ vs 🔗 COMPARATIVA CLOUDFLARE vs DIRECTOS")
+        print(f"{'='*100}")
+        print(f"{'MÉTRICA':<25} {'CLOUDFLARE':>12} {'DIRECTO':>12} {'DIFERENCIA':>12} {'%CF':>8} {'%DIR':>8}")
+        print(f"{'-'*100}")
+
+        cf_total = self.cloudflare_stats['cloudflare']
+        direct_total = self.cloudflare_stats['direct']
+        total = cf_total + direct_total
+
+        if total == 0:
+            print("No hay datos para mostrar")
+            return
+
+        # Requests totales
+        pct_cf = (cf_total / total) * 100
+        pct_direct = (direct_total / total) * 100
+        diff = cf_total - direct_total
+        print(f"{'Total Requests':<25} {cf_total:>12,} {direct_total:>12,} {diff:>12,} {pct_cf:>7.1f}% {pct_direct:>7.1f}%")
+
+        # Requests lentos
+        cf_slow = self.count_slow('cloudflare', True)
+        direct_slow = self.count_slow('cloudflare', False)
+
+        pct_cf_slow = (cf_slow / cf_total) * 100 if cf_total > 0 else 0
+        pct_direct_slow = (direct_slow / direct_total) * \
+        100 if direct_total > 0 else 0
+        diff_slow = cf_slow - direct_slow
+
+        print(f"{'Requests Lentos':<25} {cf_slow:>12,} {direct_slow:>12,} {diff_slow:>12,} {pct_cf_slow:>7.1f}% {pct_direct_slow:>7.1f}%")
+
+        # Errores 499
+        cf_499 = self.get_time_stats('status', 499, True)[0]
+        direct_499 = self.get_time_stats('status', 499, False)[0]
+
+        pct_cf_499 = (cf_499 / cf_total) * 100 if cf_total > 0 else 0
+        pct_direct_499 = (direct_499 / direct_total) * \
+        100 if direct_total > 0 else 0
+        diff_499 = cf_499 - direct_499
+
+        print(f"{'Errores 499':<25} {cf_499:>12,} {direct_499:>12,} {diff_499:>12,} {pct_cf_499:>7.1f}% {pct_direct_499:>7.1f}%")
+
+        # Tiempos promedio
+        if cf_total and direct_total:
+            avg_cf = self.get_mean_time('cf', True)
+            avg_direct = self.get_mean_time('cf', False)
+            diff_avg = avg_cf - avg_direct
+
+            print(
+                f"{'Tiempo Promedio':<25} {avg_cf:>11.3f}s {avg_direct:>11.3f}s {diff_avg:>11.3f}s {'-':>8} {'-':>8}")
+
+        # Desglose por colo de Cloudflare (solo si el formato trae cf_ray)
+        if self.colos.cells:
+            self.colos.print_report(self.threshold)
+
+    def print_endpoints_by_http_code(self):
+        """Endpoints por código HTTP específico"""
+        important_codes = [200, 202, 400, 404, 499, 500]
+        details = self.get_endpoint_details()
+
+        for code in important_codes:
+            if code in self.status_codes:
+                total_requests = self.status_codes[code]
+
+                if total_requests > 0:
+                    print(f"\n{'='*80}")
+                    print(
+                        f"📊 ENDPOINTS CON CÓDIGO HTTP {code} - {self.get_http_code_description(code)}")
+                    print(f"{'='*80}")
+                    print(
+                        f"{'ENDPOINT':<60} {'REQUESTS':>8} {'%':>6} {'AVG(s)':>7}")
+                    print(f"{'-'*80}")
+
+                    # Top 15 por cantidad de requests (sin ordenar todos los endpoints)
+                    top = heapq.nlargest(15, ((endpoint, detail['status_dist'][code], detail['status_time'][code])
+                                              for endpoint, detail in details.items()
+                                              if code in detail['status_dist']), key=lambda x: x[1])
+
+                    for endpoint, count, time in top:
+                        # Tiempo acumulado de este endpoint con este código
+                        avg_time = time / count
+                        pct = (count / total_requests) * 100
+                        display_ep = endpoint[:58] + \
+                            ".." if len(endpoint) > 60 else endpoint
+                        print(
+                            f"{display_ep:<60} {count:>8} {pct:>5.1f}% {avg_time:>6.2f}s")
+
+    def print_endpoints_table(self):
+        """Tabla de endpoints individuales"""
+        print(f"\n{'='*120}")
+        print("🏆 TOP 25 ENDPOINTS INDIVIDUALES MÁS SOLICITADOS")
+        print(f"{'='*120}")
+        print(f"{'ENDPOINT':<60} {'TOTAL':>6} {'CF':>4} {'DIR':>4} {'AVG(s)':>7} {'499':>4} {'>' + format(self.threshold, 'g') + 's':>5} {'%LENTO':>7}")
+        print(f"{'-'*120}")
+
+        endpoint_stats = ({
+            'endpoint': endpoint,
+            'total': detail['total'],
+            'cf_count': detail['cf_count'],
+            'direct_count': detail['direct_count'],
+            'avg_time': detail['avg_time'],
+            'errors_499': detail['errors_499'],
+            'slow_count': detail['slow'][self.threshold]
+        } for endpoint, detail in self.get_endpoint_details().items())
+
+        for ep in heapq.nlargest(25, endpoint_stats, key=lambda x: x['total']):
+            pct_slow = (ep['slow_count'] / ep['total']) * \
+                100 if ep['total'] > 0 else 0
+            display_ep = ep['endpoint'][:58] + \
+                ".." if len(ep['endpoint']) > 60 else ep['endpoint']
+
+            print(f"{display_ep:<60} {ep['total']:>6} {ep['cf_count']:>4} {ep['direct_count']:>4} "
+                  f"{ep['avg_time']:>6.2f}s {ep['errors_499']:>4} {ep['slow_count']:>5} {pct_slow:>6.1f}%")
+
+    def print_hourly_analysis(self):
+        """Análisis por hora"""
+        if not self.hourly_stats:
+            print("\n⚠️  No se pudieron extraer datos horarios")
+            return
+
+        print(f"\n{'='*100}")
+        print("🕐 DISTRIBUCIÓN POR HORARIO")
+        print(f"{'='*100}")
+        print(
+            f"{'HORA':<6} {'TOTAL':>8} {'CF':>6} {'DIR':>6} {'LENTOS':>6} {'499':>5} {'AVG(s)':>7} {'APDEX':>6}")
+        print(f"{'-'*100}")
+
+        for hour in sorted(self.hourly_stats.keys()):
+            stats = self.hourly_stats[hour]
+            total = stats['total']
+            cf = stats.get('cloudflare', 0)
+            direct = stats.get('direct', 0)
+            slow = self.count_slow('hour', hour)
+            errors_499 = stats.get('error_499', 0)
+            avg_time = self.get_mean_time('hour', hour)
+            apdex = self.get_histogram('hour')[hour].apdex(self.threshold)
+
+            print(
+                f"{hour:<6} {total:>8} {cf:>6} {direct:>6} {slow:>6} {errors_499:>5} {avg_time:>6.2f}s {apdex:>6.3f}")
+
+    def print_slowest_endpoints(self):
+        """Endpoints más lentos"""
+        print(f"\n{'='*100}")
+        print("🐌 TOP 15 ENDPOINTS MÁS LENTOS (por tiempo promedio)")
+        print(f"{'='*100}")
+        print(
+            f"{'ENDPOINT':<60} {'TOTAL':>6} {'AVG(s)':>7} {'MAX(s)':>7} {'>' + format(self.threshold, 'g') + 's':>6} {'499':>4}")
+        print(f"{'-'*100}")
+
+        endpoint_stats = ({
+            'endpoint': endpoint,
+            'total': detail['total'],
+            'avg_time': detail['avg_time'],
+            'max_time': detail['max_time'],
+            'slow_count': detail['slow'][self.threshold],
+            'errors_499': detail['errors_499']
+        } for endpoint, detail in self.get_endpoint_details().items()
+            if detail['total'] >= 10)  # Mínimo 10 requests
+
+        for ep in heapq.nlargest(15, endpoint_stats, key=lambda x: x['avg_time']):
+            display_ep = ep['endpoint'][:58] + \
+                ".." if len(ep['endpoint']) > 60 else ep['endpoint']
+            print(f"{display_ep:<60} {ep['total']:>6} {ep['avg_time']:>6.2f}s "
+                  f"{ep['max_time']:>6.2f}s {ep['slow_count']:>6} {ep['errors_499']:>4}")
+
+    def print_threshold_analysis(self):
+        """Requests lentos para cada umbral (-t 0.3,1,3), sin reparsear"""
+        if len(self.thresholds) < 2:
+            return
+
+        total = self.get_histogram().total
+        cf_total = self.cloudflare_stats['cloudflare']
+        direct_total = self.cloudflare_stats['direct']
+
+        print(f"\n{'='*80}")
+        print("⏱️  REQUESTS LENTOS POR UMBRAL")
+        print(f"{'='*80}")
+        print(f"{'UMBRAL':<8} {'LENTOS':>10} {'%':>7} {'CF':>10} {'%CF':>7} {'DIR':>10} {'%DIR':>7}")
+        print(f"{'-'*80}")
+
+        for threshold in self.thresholds:
+            slow = self.count_slow(threshold=threshold)
+            cf_slow = self.count_slow('cloudflare', True, threshold)
+            direct_slow = self.count_slow('cloudflare', False, threshold)
+            pct = (slow / total * 100) if total > 0 else 0
+            pct_cf = (cf_slow / cf_total * 100) if cf_total > 0 else 0
+            pct_direct = (direct_slow / direct_total * 100) if direct_total > 0 else 0
+            print(f"{str(threshold) + 's':<8} {slow:>10,} {pct:>6.1f}% {cf_slow:>10,} {pct_cf:>6.1f}% "
+                  f"{direct_slow:>10,} {pct_direct:>6.1f}%")
+
+    def print_apdex(self):
+        """Endpoints con peor Apdex (T = umbral principal)"""
+        print(f"\n{'='*80}")
+        print(f"😐 TOP 15 ENDPOINTS CON PEOR APDEX (T = {self.threshold}s)")
+        print(f"{'='*80}")
+        print(f"{'ENDPOINT':<60} {'TOTAL':>6} {'APDEX':>6} {'PEOR HORA':>10}")
+        print(f"{'-'*80}")
+
+        endpoint_stats = ((endpoint, detail['total'], detail['apdex'], detail['hour_apdex'])
+                          for endpoint, detail in self.get_endpoint_details().items() if detail['total'] >= 10)
+
+        for endpoint, total, apdex, hours in heapq.nsmallest(15, endpoint_stats, key=lambda x: x[2]):
+            display_ep = endpoint[:58] + ".." if len(endpoint) > 60 else endpoint
+            # Peor hora con al menos 10 requests (la primera en caso de empate)
+            hour, hour_apdex = '-', None
+            for candidate, counts in hours.items():
+                if candidate == "unknown" or counts[0] < 10:
+                    continue
+                candidate_apdex = apdex_score(*counts)
+                if hour_apdex is None or candidate_apdex < hour_apdex:
+                    hour, hour_apdex = candidate, candidate_apdex
+            worst = f"{hour} {hour_apdex:.2f}" if hour_apdex is not None else '-'
+            print(f"{display_ep:<60} {total:>6} {apdex:>6.3f} {worst:>10}")
+
+    # SNAPSHOTS Y MODO COMPARE
+    def get_endpoint_summaries(self):
+        """Resumen por endpoint usado por el modo compare y los snapshots"""
+        return dict(self._iter_endpoint_summaries())
+
+    def _iter_endpoint_summaries(self):
+        for endpoint, detail in self.get_endpoint_details().items():
+            yield endpoint, {
+                'total': detail['total'],
+                'mean': detail['avg_time'],
+                'stdev': detail['stdev'],
+                'p95': detail['p95'],
+                'p99': detail['p99'],
+                'slow': detail['slow'][self.threshold],
+                'errors_499': detail['errors_499']
+            }
+
+    def save_snapshot(self, filename):
+        """Guarda un snapshot JSON con el resumen por endpoint (escrito de a un endpoint)"""
+        snapshot = {
+            'version': 1,
+            'log_file': self.log_file,
+            'threshold': self.threshold,
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp
+        }
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                # Mismo JSON que json.dump(..., indent=1), sin armar el dict de endpoints
+                f.write(json.dumps(snapshot, ensure_ascii=False, indent=1)[:-2] + ',\n "endpoints": {')
+                for i, (endpoint, summary) in enumerate(self._iter_endpoint_summaries()):
+                    f.write(f"{',' if i else ''}\n  {json.dumps(endpoint, ensure_ascii=False)}: "
+                            f"{json.dumps(summary, ensure_ascii=False)}")
+                f.write("\n }\n}\n")
+            print(f"✅ Snapshot guardado: {filename}")
+            return True
+        except Exception as e:
+            print(f"❌ Error guardando snapshot: {e}")
+            return False
+
+    # MÉTODOS DE EXPORTACIÓN (se mantienen igual)
+    def prepare_export_data(self):
+        """Prepara todos los datos para exportación"""
+        self.export_data = {
+            'procesamiento_completado': self._get_processing_stats(),
+            'estadisticas_generales': self._get_general_stats(),
+            'distribucion_http': self._get_http_distribution(),
+            'cloudflare_vs_directo': self._get_cloudflare_stats(),
+            'endpoints_por_codigo': self._get_endpoints_by_code(),
+            'top_endpoints': self._get_top_endpoints(),
+            'analisis_horario': self._get_hourly_analysis(),
+            'endpoints_lentos': self._get_slow_endpoints(),
+            'detalle_endpoints': self._get_detailed_endpoints(),
+            'umbrales': self._get_threshold_analysis(),
+            'apdex': self._get_apdex(),
+            'ejemplos_lentos': self.samples.get_rows(self.threshold),
+            'lineas_rechazadas': self.quality.get_example_rows()
+        }
+        if self.user_agents is not None:
+            self.export_data['ua_clases'] = self.user_agents.get_class_rows(self.thresholds)
+            self.export_data['ua_codigos'] = self.user_agents.get_status_rows()
+            self.export_data['ua_horario'] = self.user_agents.get_hourly_rows(self.threshold)
+            self.export_data['ua_endpoints'] = self.user_agents.get_endpoint_rows(self.threshold)
+            self.export_data['ua_familias'] = self.user_agents.get_family_rows(self.threshold)
+        if self.error_log is not None:
+            self.export_data['errorlog_causas'] = self.error_log.get_cause_rows()
+            self.export_data['errorlog_endpoints'] = self.error_log.get_endpoint_rows(
+                self.threshold, self._get_error_log_baselines())
+            self.export_data['errorlog_upstreams'] = self.error_log.get_upstream_rows()
+        if self.anomalies is not None:
+            self.export_data['anomalias'] = self.anomalies.get_rows()
+        if self.retries is not None:
+            self.export_data['reintentos_endpoints'] = self.retries.get_endpoint_rows()
+            self.export_data['reintentos_horario'] = self.retries.get_hourly_rows()
+        if self.slo is not None:
+            self.export_data['slo'] = self.slo.get_rows()
+            self.export_data['slo_alertas'] = self.slo.get_alert_rows()
+        if self.group_by is not None:
+            self.export_data.update(self.group_by.get_export_sheets(self.thresholds))
+        if self.sampler is not None:
+            self.export_data['estimacion_muestreo'] = self.get_sampling_estimates()
+            self.export_data['estimacion_endpoints'] = self.get_sampling_endpoint_estimates()
+        if self.colos.cells:
+            self.export_data['cloudflare_colos'] = self.colos.get_colo_rows(self.threshold)
+            self.export_data['cloudflare_colos_horario'] = self.colos.get_hourly_rows(self.threshold)
+        if self.bandwidth is not None and self.bandwidth.overall.count:
+            self.export_data['ancho_banda_endpoints'] = self.bandwidth.get_endpoint_rows()
+            self.export_data['ancho_banda_horario'] = self.bandwidth.get_hourly_rows()
+            self.export_data['ancho_banda_cloudflare'] = self.bandwidth.get_cloudflare_rows()
+            self.export_data['bytes_vs_latencia'] = self.bandwidth.get_latency_rows(self.threshold)
+        if self.concurrency is not None:
+            self.export_data['concurrencia_minuto'] = self.concurrency.get_minute_rows(self.threshold)
+            self.export_data['concurrencia_endpoints'] = self.concurrency.get_endpoint_rows()
+
+    def _get_general_stats(self):
+        """Prepara estadísticas generales para exportación"""
+        total_requests = sum(self.status_codes.values())
+        if total_requests == 0:
+            return []
+
+        slow_count = self.count_slow()
+        errors_499 = self.status_codes.get(499, 0)
+        cloudflare_count = self.cloudflare_stats['cloudflare']
+        direct_count = self.cloudflare_stats['direct']
+
+        # Calcular tiempos promedio
+        avg_time_total = self.get_mean_time('cf')
+        p95 = self.global_quantile(20, 19) if total_requests >= 20 else 0
+        p99 = self.global_quantile(100, 99) if total_requests >= 100 else 0
+
+        avg_time_cf = self.get_mean_time('cf', True)
+        avg_time_direct = self.get_mean_time('cf', False)
+
+        # Añadir estadísticas de procesamiento
+        return [
+            {
+                'Metrica': 'Total Requests',
+                'Valor': total_requests,
+                'Porcentaje': '100%'
+            }, {
+                'Metrica': 'Requests Lentos',
+                'Valor': slow_count,
+                'Porcentaje': f"{(slow_count/total_requests*100):.1f}%"
+            }, {
+                'Metrica': 'Errores 499',
+                'Valor': errors_499,
+                'Porcentaje': f"{(errors_499/total_requests*100):.1f}%"
+            }, {
+                'Metrica': 'Cloudflare Requests',
+                'Valor': cloudflare_count,
+                'Porcentaje': f"{(cloudflare_count/total_requests*100):.1f}%"
+            }, {
+                'Metrica': 'Direct Requests',
+                'Valor': direct_count,
+                'Porcentaje': f"{(direct_count/total_requests*100):.1f}%"
+            }, {
+                'Metrica': 'Tiempo Promedio Total',
+                'Valor': f"{avg_time_total:.3f}s",
+                'Porcentaje': '-'
+            }, {
+                'Metrica': 'Percentil 95',
+                'Valor': f"{p95:.3f}s",
+                'Porcentaje': '-'
+            }, {
+                'Metrica': 'Percentil 99',
+                'Valor': f"{p99:.3f}s",
+                'Porcentaje': '-'
+            }, {
+                'Metrica': 'Tiempo Promedio Cloudflare',
+                'Valor': f"{avg_time_cf:.3f}s",
+                'Porcentaje': '-'
+            }, {
+                'Metrica': 'Tiempo Promedio Directo',
+                'Valor': f"{avg_time_direct:.3f}s",
+                'Porcentaje': '-'
+            }
+        ]
+
+    def _get_processing_stats(self):
+        """Prepara estadísticas de procesamiento para exportación"""
+        total_lines = self.total_lines
+        parsed_lines = self.parsed_lines
+
+        stats = [
+            {
+                'Metrica': 'Lineas totales en archivo',
+                'Valor': total_lines,
+                'Porcentaje': '100%'
+            }, {
+                'Metrica': 'Lineas parseadas correctamente',
+                'Valor': parsed_lines,
+                'Porcentaje': f"{(parsed_lines/total_lines*100):.1f}%" if total_lines > 0 else "0%"
+            }, {
+                'Metrica': 'Endpoints unicos encontrados',
+                'Valor': len(self.endpoints),
+                'Porcentaje': '-'
+            }, {
+                'Metrica': 'Umbral para requests lentos',
+                'Valor': ", ".join(f"{t}s" for t in self.thresholds),
+                'Porcentaje': '-'
+            }, {
+                'Metrica': 'Rango de fechas - Inicio',
+                'Valor': self.format_timestamp(self.first_timestamp) if self.first_timestamp else 'No disponible',
+                'Porcentaje': '-'
+            }, {
+                'Metrica': 'Rango de fechas - Fin',
+                'Valor': self.format_timestamp(self.last_timestamp) if self.last_timestamp else 'No disponible',
+                'Porcentaje': '-'
+            }
+        ]
+        if self.sampler is not None:
+            stats.insert(1, {
+                'Metrica': 'Lineas muestreadas (modo aproximado)',
+                'Valor': self.sampled_lines,
+                'Porcentaje': f"{self.sample_rate:.2%}"
+            })
+        # Calidad del parseo justo después de las líneas parseadas
+        position = next(i for i, row in enumerate(stats) if row['Metrica'] == 'Lineas parseadas correctamente') + 1
+        # Misma base que la consola: con muestreo, las líneas muestreadas
+        stats[position:position] = self.quality.get_summary_rows(self.examined_lines)
+        return stats
+
+    def _get_http_distribution(self):
+        """Prepara distribución HTTP para exportación"""
+        data = []
+        total_requests = sum(self.status_codes.values())
+
+        if total_requests == 0:
+            return data
+
+        for code in sorted(self.status_codes.keys()):
+            count = self.status_codes[code]
+            percentage = (count / total_requests) * 100
+
+            data.append({
+                'Codigo_HTTP': code,
+                'Descripcion': self.get_http_code_description(code),
+                'Total_Requests': count,
+                'Porcentaje': f"{percentage:.1f}%",
+                'Porcentaje_Numero': percentage
+            })
+
+        return data
+
+    def _get_cloudflare_stats(self):
+        """Prepara stats Cloudflare vs Directo para exportación"""
+        cf_total = self.cloudflare_stats['cloudflare']
+        direct_total = self.cloudflare_stats['direct']
+        total = cf_total + direct_total
+
+        if total == 0:
+            return []
+
+        return [{
+            'Metrica': 'Total Requests',
+            'Cloudflare': cf_total,
+            'Directo': direct_total,
+            'Diferencia': cf_total - direct_total,
+            'Porcentaje_CF': f"{(cf_total/total*100):.1f}%",
+            'Porcentaje_DIR': f"{(direct_total/total*100):.1f}%"
+        }]
+
+    def _export_rows(self, factory):
+        """Lista de filas; con --max-memory, filas que se generan al exportarlas (storage.LazyRows)"""
+        if self.endpoints.max_memory:
+            return LazyRows(factory)
+        return list(factory())
+
+    def _get_endpoints_by_code(self):
+        """Prepara endpoints por código HTTP para exportación"""
+        return self._export_rows(self._endpoints_by_code_rows)
+
+    def _endpoints_by_code_rows(self):
+        important_codes = [200, 202, 400, 404, 499, 500]
+        details = self.get_endpoint_details()
+
+        for code in important_codes:
+            if code in self.status_codes:
+                for endpoint, detail in details.items():
+                    count = detail['status_dist'].get(code)
+                    if not count:
+                        continue
+                    # Calcular tiempo promedio para este endpoint y código
+                    avg_time = detail['status_time'][code] / count
+
+                    yield {
+                        'Codigo_HTTP': code,
+                        'Descripcion': self.get_http_code_description(code),
+                        'Endpoint': endpoint,
+                        'Total_Requests': count,
+                        'Tiempo_Promedio': avg_time
+                    }
+
+    def _get_top_endpoints(self):
+        """Prepara top endpoints para exportación"""
+        data = []
+
+        for endpoint, detail in heapq.nlargest(50, self.get_endpoint_details().items(),
+                                               key=lambda x: x[1]['total']):
+            total = detail['total']
+            data.append({
+                'Endpoint': endpoint,
+                'Total_Requests': total,
+                'Cloudflare_Requests': detail['cf_count'],
+                'Direct_Requests': detail['direct_count'],
+                'Tiempo_Promedio': detail['avg_time'],
+                'Tiempo_Maximo': detail['max_time'],
+                'Errores_499': detail['errors_499'],
+                'Requests_Lentos': detail['slow'][self.threshold],
+                'Porcentaje_Lentos': (detail['slow'][self.threshold] / total) * 100 if total > 0 else 0
+            })
+
+        return data
+
+    def _get_hourly_analysis(self):
+        """Prepara análisis horario para exportación"""
+        data = []
+
+        for hour in sorted(self.hourly_stats.keys()):
+            stats = self.hourly_stats[hour]
+            total = stats['total']
+            cf = stats.get('cloudflare', 0)
+            direct = stats.get('direct', 0)
+            slow = self.count_slow('hour', hour)
+            errors_499 = stats.get('error_499', 0)
+
+            data.append({
+                'Hora': hour,
+                'Total_Requests': total,
+                'Cloudflare_Requests': cf,
+                'Direct_Requests': direct,
+                'Requests_Lentos': slow,
+                'Errores_499': errors_499,
+                'Porcentaje_Lentos': (slow / total * 100) if total > 0 else 0,
+                'Porcentaje_Errores': (errors_499 / total * 100) if total > 0 else 0
+            })
+
+        return data
+
+    def _get_slow_endpoints(self):
+        """Prepara endpoints lentos para exportación"""
+        data = []
+
+        endpoint_stats = ({
+            'endpoint': endpoint,
+            'total': detail['total'],
+            'avg_time': detail['avg_time'],
+            'max_time': detail['max_time'],
+            'slow_count': detail['slow'][self.threshold]
+        } for endpoint, detail in self.get_endpoint_details().items()
+            if detail['total'] >= 5)  # Mínimo 5 requests
+
+        for ep in heapq.nlargest(50, endpoint_stats, key=lambda x: x['avg_time']):
+            data.append({
+                'Endpoint': ep['endpoint'],
+                'Total_Requests': ep['total'],
+                'Tiempo_Promedio': ep['avg_time'],
+                'Tiempo_Maximo': ep['max_time'],
+                'Requests_Lentos': ep['slow_count'],
+                'Porcentaje_Lentos': (ep['slow_count'] / ep['total'] * 100) if ep['total'] > 0 else 0
+            })
+
+        return data
+
+    def _get_detailed_endpoints(self):
+        """Prepara detalle completo de endpoints para exportación"""
+        return self._export_rows(self._detailed_endpoint_rows)
+
+    def _detailed_endpoint_rows(self):
+        for endpoint, detail in self.get_endpoint_details().items():
+            status_dist = detail['status_dist']
+
+            # Status más común
+            most_common_status = max(status_dist.items(), key=lambda x: x[1])[
+                0] if status_dist else 0
+
+            yield {
+                'Endpoint': endpoint,
+                'Metodo': endpoint.split(' ')[0],
+                'URL': endpoint.split(' ')[1] if ' ' in endpoint else endpoint,
+                'Total_Requests': detail['total'],
+                'Tiempo_Promedio': detail['avg_time'],
+                'Tiempo_Maximo': detail['max_time'],
+                'Tiempo_Minimo': detail['min_time'],
+                'Status_Mas_Comun': most_common_status,
+                'Errores_499': status_dist.get(499, 0),
+                'Requests_200': status_dist.get(200, 0),
+                'Requests_Lentos': detail['slow'][self.threshold],
+                'Cloudflare_Requests': detail['cf_count'],
+                'Direct_Requests': detail['direct_count']
+            }
+
+    def _get_threshold_analysis(self):
+        """Prepara requests lentos por umbral y por hora para exportación"""
+        data = []
+        by_hour = self.get_histogram('hour')
+
+        for threshold in self.thresholds:
+            overall = self.get_histogram()
+            data.append({
+                'Umbral': threshold,
+                'Hora': 'Total',
+                'Total_Requests': overall.total,
+                'Requests_Lentos': overall.count_above(threshold),
+                'Porcentaje_Lentos': (overall.count_above(threshold) / overall.total * 100) if overall.total else 0
+            })
+            for hour in sorted(h for h in by_hour if h != "unknown"):
+                hist = by_hour[hour]
+                data.append({
+                    'Umbral': threshold,
+                    'Hora': hour,
+                    'Total_Requests': hist.total,
+                    'Requests_Lentos': hist.count_above(threshold),
+                    'Porcentaje_Lentos': (hist.count_above(threshold) / hist.total * 100) if hist.total else 0
+                })
+
+        return data
+
+    def _get_apdex(self):
+        """Prepara Apdex por endpoint y hora para exportación"""
+        return self._export_rows(self._apdex_rows)
+
+    def _apdex_rows(self):
+        t = self.threshold
+        details = self.get_endpoint_details()
+
+        for endpoint in sorted(details):
+            for hour, (total, slow, frustrated) in details[endpoint]['hour_apdex'].items():
+                yield {
+                    'Endpoint': endpoint,
+                    'Hora': hour,
+                    'Total_Requests': total,
+                    'Satisfechos': total - slow,
+                    'Tolerados': slow - frustrated,
+                    'Frustrados': frustrated,
+                    'Apdex_T': t,
+                    'Apdex': apdex_score(total, slow, frustrated)
+                }
+
+    def output_base_name(self):
+        """Ruta base para los archivos exportados: sin extensión ni .gz ('stdin' para '-')"""
+        log_file = self.log_file or 'access_log'
+        if log_file == '-':
+            return 'stdin'
+        if log_file.endswith('.gz'):
+            log_file = log_file[:-3]
+        return os.path.splitext(log_file)[0]
+
+    def export_to_excel(self, filename=None):
+        """Exporta todos los datos a un archivo Excel (openpyxl arma el libro completo en memoria)"""
+        if not filename:
+            base_name = self.output_base_name()
+            filename = f"{base_name}_analysis.xlsx"
+
+        try:
+            # pandas/openpyxl solo se cargan cuando se exporta a Excel
+            import pandas as pd
+        except ImportError as e:
+            print(f"❌ Dependencia faltante: {e}")
+            print("Instala con: pip install pandas openpyxl")
+            return False
+
+        try:
+            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+                # Crear cada hoja del Excel (los nombres truncados no deben colisionar)
+                sheet_names = excel_sheet_names(name for name, data in self.export_data.items() if data)
+                for sheet_name, data in self.export_data.items():
+                    if data:  # Solo crear hoja si hay datos
+                        df = pd.DataFrame(list(data))
+                        df.to_excel(
+                            writer, sheet_name=sheet_names[sheet_name], index=False)
+
+                        # Autoajustar columnas
+                        worksheet = writer.sheets[sheet_names[sheet_name]]
+                        for column in worksheet.columns:
+                            max_length = 0
+                            column_letter = column[0].column_letter
+                            for cell in column:
+                                try:
+                                    if len(str(cell.value)) > max_length:
+                                        max_length = len(str(cell.value))
+                                except BaseException:
+                                    pass
+                            adjusted_width = min(max_length + 2, 50)
+                            worksheet.column_dimensions[column_letter].width = adjusted_width
+
+            print(f"✅ Archivo Excel exportado: {filename}")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error exportando a Excel: {e}")
+            return False
+
+    def export_to_csv(self, directory=None):
+        """Exporta todos los datos a archivos CSV individuales (fila por fila)"""
+        if not directory:
+            directory = os.path.dirname(self.output_base_name()) or "."
+
+        base_name = os.path.basename(self.output_base_name())
+
+        try:
+            for sheet_name, data in self.export_data.items():
+                if data:
+                    filename = os.path.join(
+                        directory, f"{base_name}_{sheet_name}.csv")
+                    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+                        # Las columnas salen de la primera fila; el resto se escribe sin listarlo
+                        rows = iter(data)
+                        first = next(rows)
+                        writer = csv.DictWriter(
+                            csvfile, fieldnames=first.keys())
+                        writer.writeheader()
+                        writer.writerow(first)
+                        writer.writerows(rows)
+                    print(f"✅ CSV exportado: {filename}")
+
+            return True
+
+        except Exception as e:
+            print(f"❌ Error exportando a CSV: {e}")
+            return False
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Detección de anomalías de latencia por endpoint y minuto, en streaming.
+
+Por endpoint se acumula el minuto en curso (cantidad, lentos, 499 e
+histograma de latencia) y al cerrarlo se comparan su p99, % de lentos y %
+de 499 contra una línea base EWMA (media y varianza exponenciales). Un
+minuto es anómalo si supera la base por z-score y por ratio; los minutos
+anómalos consecutivos se unen en ventanas. El estado por endpoint es de
+tamaño fijo y la cantidad de endpoints está acotada, así que la memoria no
+depende del largo del log.
+
+En el pipeline cada lote junta sus minutos por endpoint (AnomalyBatch) y el
+proceso principal los evalúa en orden con merge(), con el mismo resultado que
+la corrida secuencial.
+"""
+
+import math
+from collections import defaultdict
+
+from .concurrency import format_minute
+from .histogram import LatencyHistogram
+
+# (métrica, unidad) en el orden de reportes y exportación
+METRICS = (('p99', 's'), ('lentos', '%'), ('499', '%'))
+
+
+class _Baseline:
+    """Media y varianza exponenciales de una métrica"""
+
+    __slots__ = ('mean', 'var', 'n')
+
+    def __init__(self):
+        self.mean = 0.0
+        self.var = 0.0
+        self.n = 0
+
+    def update(self, value, alpha, limit=None):
+        self.n += 1
+        # Winsorizado: un valor extremo aporta a la varianza pero no arrastra la base
+        if limit is not None and value > limit:
+            value = limit
+        # Durante el calentamiento es un promedio acumulado
+        alpha = max(alpha, 1.0 / self.n)
+        delta = value - self.mean
+        self.mean += alpha * delta
+        self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+
+
+class _EndpointState:
+    """Minuto en curso, líneas base y ventanas abiertas de un endpoint"""
+
+    __slots__ = ('minute', 'count', 'slow', 'errors_499', 'buckets', 'baselines', 'open')
+
+    def __init__(self, minute):
+        self.minute = minute
+        self.count = 0
+        self.slow = 0
+        self.errors_499 = 0
+        self.buckets = defaultdict(int)
+        self.baselines = {metric: _Baseline() for metric, _ in METRICS}
+        # métrica -> ventana anómala abierta
+        self.open = {}
+
+
+class AnomalyBatch:
+    """Minutos por endpoint de un lote del pipeline, en el orden en que aparecen.
+
+    Igual que en el detector, una línea atrasada se cuenta en el minuto en
+    curso del endpoint; cada celda es [minuto, cantidad, 499, buckets].
+    """
+
+    def __init__(self):
+        self.cells = {}
+
+    def add(self, epoch, endpoint, status, response_time):
+        minute = epoch // 60
+        cells = self.cells.get(endpoint)
+        if cells is None:
+            cells = self.cells[endpoint] = []
+        if not cells or minute > cells[-1][0]:
+            cells.append([minute, 0, 0, defaultdict(int)])
+        cell = cells[-1]
+        cell[1] += 1
+        if status == 499:
+            cell[2] += 1
+        cell[3][LatencyHistogram.bucket_upper(response_time)] += 1
+
+
+class AnomalyDetector:
+    """Ventanas de minutos anómalos por endpoint y métrica.
+
+    `slow_threshold` es el corte de "lento" usado en streaming (con umbral
+    automático, el mínimo posible). Un minuto se evalúa si tiene al menos
+    `min_requests` requests; las tasas además necesitan `min_events` eventos.
+    Solo se reportan ventanas de al menos `min_minutes` minutos seguidos: un
+    minuto aislado con pocos requests es ruido del p99.
+    """
+
+    def __init__(self, slow_threshold, z_score=3.0, ratio=2.0, alpha=0.1, warmup=10,
+                 min_requests=10, min_events=3, min_minutes=2, max_endpoints=2000):
+        self.slow_threshold = slow_threshold
+        self.z_score = z_score
+        self.ratio = ratio
+        self.alpha = alpha
+        self.warmup = warmup
+        self.min_requests = min_requests
+        self.min_events = min_events
+        self.min_minutes = min_minutes
+        self.max_endpoints = max_endpoints
+        self.states = {}
+        self.anomalies = []
+        self.evaluated_minutes = 0
+        self.ignored_requests = 0
+        self._slow_bucket = LatencyHistogram.bucket_upper(slow_threshold)
+
+    def batch(self):
+        """Acumulador de un lote del pipeline (ver merge)"""
+        return AnomalyBatch()
+
+    def add(self, epoch, endpoint, status, response_time):
+        minute = epoch // 60
+        state = self.states.get(endpoint)
+        if state is None:
+            if len(self.states) >= self.max_endpoints:
+                self.ignored_requests += 1
+                return
+            state = self.states[endpoint] = _EndpointState(minute)
+        elif minute > state.minute:
+            self._close_minute(endpoint, state)
+            state.minute = minute
+        # Las líneas que llegan tarde se cuentan en el minuto en curso
+
+        bucket = LatencyHistogram.bucket_upper(response_time)
+        state.count += 1
+        state.buckets[bucket] += 1
+        if bucket > self._slow_bucket:
+            state.slow += 1
+        if status == 499:
+            state.errors_499 += 1
+
+    def merge(self, batch):
+        """Evalúa en orden los minutos de un lote posterior (AnomalyBatch)"""
+        for endpoint, cells in batch.cells.items():
+            state = self.states.get(endpoint)
+            if state is None:
+                if len(self.states) >= self.max_endpoints:
+                    self.ignored_requests += sum(cell[1] for cell in cells)
+                    continue
+                state = self.states[endpoint] = _EndpointState(cells[0][0])
+            for minute, count, errors_499, buckets in cells:
+                if minute > state.minute:
+                    self._close_minute(endpoint, state)
+                    state.minute = minute
+                state.count += count
+                state.errors_499 += errors_499
+                for bucket, bucket_count in buckets.items():
+                    state.buckets[bucket] += bucket_count
+                    if bucket > self._slow_bucket:
+                        state.slow += bucket_count
+
+    def flush(self):
+        """Evalúa los minutos en curso y cierra las ventanas abiertas"""
+        for endpoint, state in self.states.items():
+            self._close_minute(endpoint, state)
+            for metric in list(state.open):
+                self._end_window(endpoint, state, metric)
+
+    def _close_minute(self, endpoint, state):
+        count = state.count
+        if count >= self.min_requests:
+            self.evaluated_minutes += 1
+            observed = {
+                'p99': self._quantile(state.buckets, count, 0.99),
+                'lentos': state.slow / count,
+                '499': state.errors_499 / count
+            }
+            events = {'p99': count, 'lentos': state.slow, '499': state.errors_499}
+            for metric, _ in METRICS:
+                baseline = state.baselines[metric]
+                value = observed[metric]
+                z, std = self._z(metric, baseline, value, count)
+                if (baseline.n >= self.warmup and events[metric] >= self.min_events
+                        and z >= self.z_score and value >= baseline.mean * self.ratio):
+                    self._extend_window(endpoint, state, metric, value, z, count)
+                elif metric in state.open:
+                    self._end_window(endpoint, state, metric)
+                # Un cambio sostenido termina entrando a la base (a lo más z desviaciones por minuto)
+                limit = baseline.mean + self.z_score * std if baseline.n >= self.warmup else None
+                baseline.update(value, self.alpha, limit)
+
+        state.count = 0
+        state.slow = 0
+        state.errors_499 = 0
+        state.buckets = defaultdict(int)
+
+    @staticmethod
+    def _quantile(buckets, count, q):
+        rank = max(1, math.ceil(q * count))
+        seen = 0
+        for upper in sorted(buckets):
+            seen += buckets[upper]
+            if seen >= rank:
+                return upper / 1000
+        return 0.0
+
+    @staticmethod
+    def _z(metric, baseline, value, count):
+        """Desviación en unidades de la dispersión esperada (con piso por métrica)"""
+        std = math.sqrt(baseline.var)
+        if metric == 'p99':
+            # Piso: 10% de la base o 10ms
+            std = max(std, baseline.mean * 0.1, 0.01)
+        else:
+            # Piso: error de muestreo binomial de una tasa con `count` requests
+            p = max(baseline.mean, 0.5 / count)
+            std = max(std, math.sqrt(p * (1 - p) / count))
+        return (value - baseline.mean) / std, std
+
+    def _extend_window(self, endpoint, state, metric, value, z, count):
+        window = state.open.get(metric)
+        # Un hueco de más de un minuto sin datos separa las ventanas
+        if window is not None and window['end'] < state.minute - 1:
+            self._end_window(endpoint, state, metric)
+            window = None
+        if window is None:
+            window = state.open[metric] = {
+                'start': state.minute, 'end': state.minute, 'baseline': state.baselines[metric].mean,
+                'peak': value, 'z': z, 'requests': 0
+            }
+        window['end'] = state.minute
+        window['requests'] += count
+        if z > window['z']:
+            window['peak'], window['z'] = value, z
+
+    def _end_window(self, endpoint, state, metric):
+        window = state.open.pop(metric)
+        if window['end'] - window['start'] + 1 >= self.min_minutes:
+            self.anomalies.append((endpoint, metric, window))
+
+    # RESULTADOS
+    def get_rows(self):
+        """Ventanas anómalas en orden cronológico"""
+        units = dict(METRICS)
+        rows = []
+        for endpoint, metric, window in sorted(self.anomalies, key=lambda x: (x[2]['start'], x[0], x[1])):
+            scale = 100 if units[metric] == '%' else 1
+            baseline = window['baseline']
+            rows.append({
+                'Inicio': format_minute(window['start']),
+                'Fin': format_minute(window['end']),
+                'Minutos': window['end'] - window['start'] + 1,
+                'Endpoint': endpoint,
+                'Metrica': metric,
+                'Unidad': units[metric],
+                'Base': round(baseline * scale, 3),
+                'Observado': round(window['peak'] * scale, 3),
+                'Ratio': round(window['peak'] / baseline, 2) if baseline else '∞',
+                'Z': round(window['z'], 1),
+                'Requests': window['requests']
+            })
+        return rows
+
+    def print_report(self, threshold=None, top=30):
+        """Ventanas anómalas más fuertes, en orden cronológico (`threshold`: umbral final del reporte)"""
+        print(f"\n{'='*120}")
+        print("🚨 ANOMALÍAS DE LATENCIA POR ENDPOINT Y MINUTO")
+        print(f"{'='*120}")
+        print(f"📐 Base EWMA (alpha={self.alpha}) de p99, % lentos (> {self.slow_threshold}s) y % 499; "
+              f"anómalo si z ≥ {self.z_score} y ≥ x{self.ratio} la base durante ≥ {self.min_minutes} minutos")
+        if threshold is not None and threshold != self.slow_threshold:
+            print(f"⚠️  % lentos usa > {self.slow_threshold}s (corte en streaming), no el umbral del reporte "
+                  f"({threshold}s): el umbral automático se conoce al final; usa -t para alinearlos")
+        print(f"🔬 Minutos evaluados: {self.evaluated_minutes:,} en {len(self.states):,} endpoints")
+        if self.ignored_requests:
+            print(f"⚠️  Límite de {self.max_endpoints:,} endpoints: "
+                  f"{self.ignored_requests:,} requests sin evaluar")
+
+        rows = self.get_rows()
+        if not rows:
+            print("✅ No se detectaron anomalías")
+            return
+
+        by_metric = defaultdict(int)
+        for row in rows:
+            by_metric[row['Metrica']] += 1
+        print(f"🚨 Ventanas anómalas: {len(rows):,} (" +
+              ", ".join(f"{by_metric[m]:,} {m}" for m, _ in METRICS if by_metric[m]) + ")")
+
+        shown = sorted(sorted(rows, key=lambda r: -r['Z'])[:top], key=lambda r: (r['Inicio'], r['Endpoint']))
+        print(f"\n{'INICIO':<17} {'FIN':<6} {'MIN':>4} {'ENDPOINT':<40} {'MÉTRICA':<7} {'BASE':>9} "
+              f"{'OBSERVADO':>10} {'RATIO':>7} {'Z':>6}")
+        print(f"{'-'*120}")
+        for row in shown:
+            display_ep = row['Endpoint'][:38] + ".." if len(row['Endpoint']) > 40 else row['Endpoint']
+            unit = row['Unidad']
+            ratio = row['Ratio'] if isinstance(row['Ratio'], str) else f"x{row['Ratio']:.1f}"
+            print(f"{row['Inicio']:<17} {row['Fin'][-5:]:<6} {row['Minutos']:>4} {display_ep:<40} "
+                  f"{row['Metrica']:<7} {row['Base']:>8.3g}{unit} {row['Observado']:>9.3g}{unit} "
+                  f"{ratio:>7} {row['Z']:>6.1f}")
+        if len(rows) > top:
+            print(f"... y {len(rows) - top:,} ventanas más en la exportación (anomalias)")
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Ancho de banda y tamaño de respuesta a partir de `$body_bytes_sent`.
+
+Todo se acumula en la misma pasada del parseo: totales, promedio y p95 de
+tamaño por endpoint, hora y Cloudflare/directo; egreso por segundo con una
+ventana acotada (igual que los RPS de concurrencia) y, por endpoint, la
+relación entre bytes y latencia para identificar endpoints cuyo tiempo de
+respuesta depende del tamaño del payload.
+"""
+
+import math
+from collections import defaultdict
+
+from .concurrency import _RateCounter, timestamp_to_epoch
+from .histogram import LatencyHistogram
+
+# Buckets logarítmicos de tamaño: cada uno es 2% mayor que el anterior
+SIZE_BUCKET_RATIO = 1.02
+_LOG_RATIO = math.log(SIZE_BUCKET_RATIO)
+
+# Criterio para marcar un endpoint como limitado por payload
+PAYLOAD_MIN_CORRELATION = 0.5
+PAYLOAD_MIN_RATIO = 1.5
+
+
+def format_bytes(value):
+    """1536 -> '1.5 KB'"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024 or unit == 'GB':
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+class _SizeStats:
+    """Cantidad, suma, máximo e histograma logarítmico de tamaños"""
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = defaultdict(int)
+
+    @staticmethod
+    def bucket(size):
+        # Bucket -1 para respuestas vacías
+        return math.ceil(math.log(size) / _LOG_RATIO - 1e-9) if size > 0 else -1
+
+    def add(self, size, bucket=None):
+        self.count += 1
+        self.total += size
+        if size > self.max:
+            self.max = size
+        self.buckets[self.bucket(size) if bucket is None else bucket] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] += count
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Cuantil aproximado (±2%): límite superior del bucket que lo contiene"""
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return 0 if bucket < 0 else min(int(round(SIZE_BUCKET_RATIO ** bucket)), self.max)
+        return self.max
+
+
+class _BytesLatency:
+    """Sumas para la correlación bytes vs latencia y bytes por bucket de latencia"""
+
+    __slots__ = ('n', 'sx', 'sy', 'sxx', 'syy', 'sxy', 'latency')
+
+    def __init__(self):
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.syy = self.sxy = 0.0
+        # bucket de LatencyHistogram (límite superior en ms) -> [requests, bytes]
+        self.latency = {}
+
+    def add(self, size, response_time):
+        kb = size / 1024
+        self.n += 1
+        self.sx += kb
+        self.sy += response_time
+        self.sxx += kb * kb
+        self.syy += response_time * response_time
+        self.sxy += kb * response_time
+        bucket = LatencyHistogram.bucket_upper(response_time)
+        cell = self.latency.get(bucket)
+        if cell is None:
+            cell = self.latency[bucket] = [0, 0]
+        cell[0] += 1
+        cell[1] += size
+
+    def merge(self, other):
+        self.n += other.n
+        self.sx += other.sx
+        self.sy += other.sy
+        self.sxx += other.sxx
+        self.syy += other.syy
+        self.sxy += other.sxy
+        for bucket, (count, size) in other.latency.items():
+            cell = self.latency.setdefault(bucket, [0, 0])
+            cell[0] += count
+            cell[1] += size
+
+    def correlation(self):
+        """Pearson entre KB y rt (None si no hay varianza)"""
+        if self.n < 3:
+            return None
+        var_x = self.n * self.sxx - self.sx * self.sx
+        var_y = self.n * self.syy - self.sy * self.sy
+        if var_x <= 0 or var_y <= 0:
+            return None
+        return (self.n * self.sxy - self.sx * self.sy) / math.sqrt(var_x * var_y)
+
+    def slope(self):
+        """Segundos adicionales por KB (regresión lineal rt ~ KB)"""
+        var_x = self.n * self.sxx - self.sx * self.sx
+        if self.n < 3 or var_x <= 0:
+            return None
+        return (self.n * self.sxy - self.sx * self.sy) / var_x
+
+    def split(self, threshold):
+        """(requests, bytes) lentos y rápidos, con el mismo corte que LatencyHistogram.count_above"""
+        limit = threshold * 1000 + 1e-9
+        slow = [0, 0]
+        fast = [0, 0]
+        for bucket, (count, size) in self.latency.items():
+            target = slow if bucket > limit else fast
+            target[0] += count
+            target[1] += size
+        return slow, fast
+
+
+class BandwidthTracker:
+    """Bytes enviados por endpoint, hora y Cloudflare/directo, y egreso por segundo.
+
+    Con `horizon=None` no se cierran segundos (lotes del pipeline: los conteos
+    por segundo se suman al unirlos y los picos se calculan en el total).
+    Se siguen a lo sumo `max_endpoints` endpoints (los primeros en aparecer,
+    None = sin límite); el resto cuenta en los totales, por hora y Cloudflare,
+    pero no por endpoint.
+    """
+
+    def __init__(self, horizon=300, max_endpoints=2000):
+        self.horizon = horizon
+        self.max_endpoints = max_endpoints
+        self.ignored_requests = 0
+        self.overall = _SizeStats()
+        self.endpoints = defaultdict(_SizeStats)
+        self.hours = defaultdict(_SizeStats)
+        self.cloudflare = defaultdict(_SizeStats)
+        self.bytes_latency = defaultdict(_BytesLatency)
+
+        self.egress = _RateCounter()
+        self.hour_peaks = defaultdict(int)
+        # Horas de reloj observadas por hora del día (para el egreso promedio)
+        self.hour_slots = defaultdict(set)
+        self.max_second = None
+        self._pruned_at = None
+        self._last_timestamp = None
+        self._last_epoch = None
+
+    def add(self, endpoint, hour, is_cloudflare, size, response_time, timestamp):
+        # El bucket se calcula una vez y se comparte entre los agregados
+        bucket = _SizeStats.bucket(size)
+        self.overall.add(size, bucket)
+        self.hours[hour].add(size, bucket)
+        self.cloudflare[is_cloudflare].add(size, bucket)
+        if self._tracks(endpoint):
+            self.endpoints[endpoint].add(size, bucket)
+            self.bytes_latency[endpoint].add(size, response_time)
+        else:
+            self.ignored_requests += 1
+
+        if not timestamp:
+            return
+        if timestamp != self._last_timestamp:
+            self._last_timestamp = timestamp
+            self._last_epoch = timestamp_to_epoch(timestamp)
+        epoch = self._last_epoch
+        self.egress.add(epoch, size)
+        self.hour_slots[hour].add(epoch // 3600)
+
+        if self.max_second is None or epoch > self.max_second:
+            self.max_second = epoch
+            self._prune(epoch)
+
+    def _tracks(self, endpoint):
+        return (endpoint in self.endpoints or self.max_endpoints is None
+                or len(self.endpoints) < self.max_endpoints)
+
+    def _prune(self, epoch):
+        # Cerrar segundos fuera del horizonte una vez por minuto de log
+        if self.horizon is not None and (self._pruned_at is None or epoch - self._pruned_at >= 60):
+            self._pruned_at = epoch
+            self.egress.prune(epoch - self.horizon, self._on_second)
+
+    def merge(self, other):
+        """Suma los agregados de otro tracker (lote posterior del mismo log)"""
+        self.overall.merge(other.overall)
+        for target, source in ((self.hours, other.hours), (self.cloudflare, other.cloudflare)):
+            for key, stats in source.items():
+                target[key].merge(stats)
+        self.ignored_requests += other.ignored_requests
+        for endpoint, stats in other.endpoints.items():
+            if self._tracks(endpoint):
+                self.endpoints[endpoint].merge(stats)
+                self.bytes_latency[endpoint].merge(other.bytes_latency[endpoint])
+            else:
+                self.ignored_requests += stats.count
+        for hour, slots in other.hour_slots.items():
+            self.hour_slots[hour].update(slots)
+        for second, size in other.egress.counts.items():
+            self.egress.add(second, size)
+        if other.max_second is not None and (self.max_second is None or other.max_second > self.max_second):
+            self.max_second = other.max_second
+            self._prune(other.max_second)
+
+    def _on_second(self, second, size):
+        hour = f"{(second // 3600) % 24:02d}:00"
+        if size > self.hour_peaks[hour]:
+            self.hour_peaks[hour] = size
+
+    def flush(self):
+        """Cierra los segundos pendientes (fin del log)"""
+        if self.max_second is not None:
+            self.egress.prune(self.max_second + 1, self._on_second)
+
+    # RESULTADOS
+    def get_endpoint_rows(self):
+        rows = []
+        for endpoint, stats in self.endpoints.items():
+            rows.append({
+                'Endpoint': endpoint,
+                'Requests': stats.count,
+                'Bytes_Totales': stats.total,
+                'MB_Totales': round(stats.total / 1024 ** 2, 2),
+                'Bytes_Promedio': round(stats.mean, 1),
+                'Bytes_P95': stats.quantile(0.95),
+                'Bytes_Maximo': stats.max,
+                'Porcentaje_Egreso': (stats.total / self.overall.total * 100) if self.overall.total else 0
+            })
+        rows.sort(key=lambda x: x['Bytes_Totales'], reverse=True)
+        return rows
+
+    def get_hourly_rows(self):
+        rows = []
+        for hour in sorted(self.hours):
+            stats = self.hours[hour]
+            slots = len(self.hour_slots.get(hour, ()))
+            rows.append({
+                'Hora': hour,
+                'Requests': stats.count,
+                'MB_Totales': round(stats.total / 1024 ** 2, 2),
+                'Bytes_Promedio': round(stats.mean, 1),
+                'Bytes_P95': stats.quantile(0.95),
+                'Egreso_Promedio_KBps': round(stats.total / (slots * 3600) / 1024, 2) if slots else 0,
+                'Egreso_Max_KBps': round(self.hour_peaks.get(hour, 0) / 1024, 2)
+            })
+        return rows
+
+    def get_cloudflare_rows(self):
+        rows = []
+        for is_cloudflare, label in ((True, 'Cloudflare'), (False, 'Directo')):
+            stats = self.cloudflare.get(is_cloudflare)
+            if stats is None:
+                continue
+            rows.append({
+                'Tipo': label,
+                'Requests': stats.count,
+                'MB_Totales': round(stats.total / 1024 ** 2, 2),
+                'Bytes_Promedio': round(stats.mean, 1),
+                'Bytes_P95': stats.quantile(0.95),
+                'Porcentaje_Egreso': (stats.total / self.overall.total * 100) if self.overall.total else 0
+            })
+        return rows
+
+    def get_latency_rows(self, threshold, min_requests=20):
+        """Bytes vs latencia por endpoint; marca los limitados por payload"""
+        rows = []
+        for endpoint, acc in self.bytes_latency.items():
+            if acc.n < min_requests:
+                continue
+            (slow, slow_bytes), (fast, fast_bytes) = acc.split(threshold)
+            slow_mean = slow_bytes / slow if slow else 0.0
+            fast_mean = fast_bytes / fast if fast else 0.0
+            ratio = slow_mean / fast_mean if slow and fast_mean else None
+            correlation = acc.correlation()
+            slope = acc.slope()
+            rows.append({
+                'Endpoint': endpoint,
+                'Requests': acc.n,
+                'Requests_Lentos': slow,
+                'Correlacion_Bytes_RT': round(correlation, 3) if correlation is not None else None,
+                'Ms_Por_100KB': round(slope * 100 * 1000, 1) if slope is not None else None,
+                'Bytes_Promedio_Lentos': round(slow_mean, 1),
+                'Bytes_Promedio_Rapidos': round(fast_mean, 1),
+                'Ratio_Bytes_Lentos': round(ratio, 2) if ratio is not None else None,
+                'Limitado_Por_Payload': 'Sí' if (
+                    slow and correlation is not None and correlation >= PAYLOAD_MIN_CORRELATION
+                    and ratio is not None and ratio >= PAYLOAD_MIN_RATIO) else 'No'
+            })
+        rows.sort(key=lambda x: (x['Requests_Lentos'], x['Requests']), reverse=True)
+        return rows
+
+    def print_report(self, threshold, top=15):
+        """Tablas de ancho de banda y bytes vs latencia"""
+        print(f"\n{'='*100}")
+        print("📦 ANCHO DE BANDA Y TAMAÑO DE RESPUESTA ($body_bytes_sent)")
+        print(f"{'='*100}")
+
+        if self.overall.count == 0:
+            print("No hay datos para mostrar")
+            return
+
+        print(f"📤 Egreso total: {format_bytes(self.overall.total)} en {self.overall.count:,} requests")
+        print(f"📏 Tamaño promedio: {format_bytes(self.overall.mean)} | "
+              f"p95: {format_bytes(self.overall.quantile(0.95))} | máximo: {format_bytes(self.overall.max)}")
+        if self.egress.peak_second is not None:
+            print(f"🚀 Pico de egreso: {format_bytes(self.egress.peak)}/s")
+        for row in self.get_cloudflare_rows():
+            print(f"{'☁️ ' if row['Tipo'] == 'Cloudflare' else '🔗'} {row['Tipo']}: {row['MB_Totales']:,.2f} MB "
+                  f"({row['Porcentaje_Egreso']:.1f}%), promedio {format_bytes(row['Bytes_Promedio'])}, "
+                  f"p95 {format_bytes(row['Bytes_P95'])}")
+
+        print(f"\n🏋️  TOP {top} ENDPOINTS POR EGRESO")
+        print(f"{'ENDPOINT':<60} {'REQS':>8} {'TOTAL':>10} {'PROM':>10} {'P95':>10} {'%EGRESO':>8}")
+        print(f"{'-'*110}")
+        for row in self.get_endpoint_rows()[:top]:
+            display_ep = row['Endpoint'][:58] + ".." if len(row['Endpoint']) > 60 else row['Endpoint']
+            print(f"{display_ep:<60} {row['Requests']:>8,} {format_bytes(row['Bytes_Totales']):>10} "
+                  f"{format_bytes(row['Bytes_Promedio']):>10} {format_bytes(row['Bytes_P95']):>10} "
+                  f"{row['Porcentaje_Egreso']:>7.1f}%")
+        if self.ignored_requests:
+            print(f"⚠️  Límite de {self.max_endpoints:,} endpoints: "
+                  f"{self.ignored_requests:,} requests sin desglose por endpoint")
+
+        print("\n🕐 EGRESO POR HORA")
+        print(f"{'HORA':<6} {'REQS':>8} {'TOTAL MB':>10} {'PROM':>10} {'P95':>10} {'KB/s PROM':>10} {'KB/s MAX':>10}")
+        print(f"{'-'*70}")
+        for row in self.get_hourly_rows():
+            print(f"{row['Hora']:<6} {row['Requests']:>8,} {row['MB_Totales']:>10,.2f} "
+                  f"{format_bytes(row['Bytes_Promedio']):>10} {format_bytes(row['Bytes_P95']):>10} "
+                  f"{row['Egreso_Promedio_KBps']:>10,.1f} {row['Egreso_Max_KBps']:>10,.1f}")
+
+        rows = [r for r in self.get_latency_rows(threshold) if r['Requests_Lentos']]
+        print(f"\n🔗 BYTES VS LATENCIA (endpoints con lentos > {threshold}s)")
+        print(f"{'ENDPOINT':<50} {'LENTOS':>7} {'CORR':>6} {'MS/100KB':>9} {'PROM LENTO':>11} "
+              f"{'PROM RÁPIDO':>11} {'PAYLOAD':>8}")
+        print(f"{'-'*110}")
+        if not rows:
+            print("Sin endpoints con requests lentos suficientes")
+        for row in rows[:top]:
+            display_ep = row['Endpoint'][:48] + ".." if len(row['Endpoint']) > 50 else row['Endpoint']
+            corr = f"{row['Correlacion_Bytes_RT']:+.2f}" if row['Correlacion_Bytes_RT'] is not None else "n/d"
+            slope = f"{row['Ms_Por_100KB']:.1f}" if row['Ms_Por_100KB'] is not None else "n/d"
+            flag = "⚠️ Sí" if row['Limitado_Por_Payload'] == 'Sí' else "No"
+            print(f"{display_ep:<50} {row['Requests_Lentos']:>7,} {corr:>6} {slope:>9} "
+                  f"{format_bytes(row['Bytes_Promedio_Lentos']):>11} "
+                  f"{format_bytes(row['Bytes_Promedio_Rapidos']):>11} {flag:>8}")
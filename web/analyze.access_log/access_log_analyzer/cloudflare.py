@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Detección de tráfico de Cloudflare por etiqueta (cf-node) o rango de IP
+"""
+
+import ipaddress
+from functools import lru_cache
+
+# Rangos publicados por Cloudflare (https://www.cloudflare.com/ips/)
+CF_RANGES = [
+    "173.245.48.0/20", "103.21.244.0/22", "103.22.200.0/22",
+    "103.31.4.0/22", "141.101.64.0/18", "108.162.192.0/18",
+    "190.93.240.0/20", "188.114.96.0/20", "197.234.240.0/22",
+    "198.41.128.0/17", "162.158.0.0/15", "104.16.0.0/13",
+    "172.64.0.0/13", "131.0.72.0/22",
+    "2400:cb00::/32", "2606:4700::/32", "2803:f800::/32",
+    "2405:b500::/32", "2405:8100::/32", "2a06:98c0::/29", "2c0f:f248::/32"
+]
+
+_networks = [ipaddress.ip_network(r, strict=False) for r in CF_RANGES]
+
+
+def refresh_cloudflare_ranges(timeout=5):
+    """Descarga los rangos vigentes de Cloudflare (una vez, antes de parsear).
+
+    `requests` se importa solo aquí para no cargarlo en cada ejecución.
+    Si no hay red o falla la descarga se conservan los rangos incluidos.
+    """
+    global _networks
+    try:
+        import requests
+        ipv4 = requests.get("https://www.cloudflare.com/ips-v4", timeout=timeout).text.splitlines()
+        ipv6 = requests.get("https://www.cloudflare.com/ips-v6", timeout=timeout).text.splitlines()
+        networks = [ipaddress.ip_network(r.strip(), strict=False) for r in (ipv4 + ipv6) if r.strip()]
+    except Exception:
+        return False
+
+    if networks:
+        _networks = networks
+        _ip_in_cloudflare.cache_clear()
+    return bool(networks)
+
+
+@lru_cache(maxsize=65536)
+def _ip_in_cloudflare(ip):
+    try:
+        ip_obj = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(ip_obj in network for network in _networks)
+
+
+def is_cloudflare_ip(line):
+    """Detecta si la línea viene de Cloudflare, verificando etiqueta o rango IP"""
+    # Detección rápida por texto cf-node
+    if "cf-node" in line:
+        return True
+
+    # IP inicial; el resultado se memoriza por IP
+    ip = line.split(' ', 1)[0].strip()
+    if not ip:
+        return False
+    return _ip_in_cloudflare(ip)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Latencia por data center (colo) de Cloudflare a partir de `cf_ray`.
+
+El sufijo de `cf_ray="8c1a2b3c4d000000-QRO"` es el código IATA del data
+center de Cloudflare que atendió el request. Por línea solo se busca el campo
+desde el final (está al final del formato apilog) y se actualiza una celda
+(colo, hora) con cantidad, tiempo, 499, 5xx e histograma de latencia; la
+tabla por colo y la matriz por hora se derivan de esas celdas al reportar.
+"""
+
+from collections import defaultdict
+
+from .histogram import LatencyHistogram
+
+CF_RAY_FIELD = 'cf_ray="'
+
+# Colos distintos; los nuevos a partir del límite se cuentan en OTHER_COLO
+MAX_COLOS = 500
+OTHER_COLO = '(otros)'
+
+
+def extract_colo(line):
+    """'...cf_ray="8c1a2b3c4d000000-QRO"' -> 'QRO' (None si no hay cf_ray)"""
+    start = line.rfind(CF_RAY_FIELD)
+    if start < 0:
+        return None
+    start += len(CF_RAY_FIELD)
+    end = line.find('"', start)
+    ray = line[start:end] if end >= 0 else line[start:]
+    dash = ray.rfind('-')
+    if dash < 0 or dash == len(ray) - 1:
+        return None
+    return ray[dash + 1:].upper()
+
+
+class _ColoCell:
+    """Cantidad, tiempo, errores e histograma de latencia de una celda"""
+
+    __slots__ = ('count', 'time', 'errors_499', 'errors_5xx', 'hist')
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.errors_499 = 0
+        self.errors_5xx = 0
+        self.hist = LatencyHistogram()
+
+    def add(self, status, response_time):
+        self.count += 1
+        self.time += response_time
+        if status == 499:
+            self.errors_499 += 1
+        elif status >= 500:
+            self.errors_5xx += 1
+        self.hist.add(response_time)
+
+    def merge(self, other):
+        self.count += other.count
+        self.time += other.time
+        self.errors_499 += other.errors_499
+        self.errors_5xx += other.errors_5xx
+        self.hist.merge(other.hist)
+
+
+class ColoTracker:
+    """Celdas (colo, hora) de los requests que traen cf_ray"""
+
+    def __init__(self, max_colos=MAX_COLOS):
+        self.max_colos = max_colos
+        self.cells = defaultdict(_ColoCell)
+        self.colos = set()
+        # Requests de Cloudflare sin cf_ray (o sin sufijo de colo)
+        self.missing = 0
+
+    def add(self, colo, hour, is_cloudflare, status, response_time):
+        if colo is None:
+            if is_cloudflare:
+                self.missing += 1
+            return
+        if colo not in self.colos:
+            if len(self.colos) >= self.max_colos:
+                colo = OTHER_COLO
+            self.colos.add(colo)
+        self.cells[(colo, hour)].add(status, response_time)
+
+    def merge(self, other):
+        """Suma las celdas de otro tracker (lote del pipeline)"""
+        for (colo, hour), cell in other.cells.items():
+            if colo not in self.colos:
+                if len(self.colos) >= self.max_colos:
+                    colo = OTHER_COLO
+                self.colos.add(colo)
+            self.cells[(colo, hour)].merge(cell)
+        self.missing += other.missing
+
+    def _by_colo(self):
+        totals = defaultdict(_ColoCell)
+        for (colo, _), cell in self.cells.items():
+            totals[colo].merge(cell)
+        return totals
+
+    @staticmethod
+    def _row(cell, threshold):
+        slow = cell.hist.count_above(threshold)
+        return {
+            'Requests': cell.count,
+            'Tiempo_Promedio': cell.time / cell.count,
+            'P95': cell.hist.quantile(0.95),
+            'P99': cell.hist.quantile(0.99),
+            'Requests_Lentos': slow,
+            'Porcentaje_Lentos': slow / cell.count * 100,
+            'Errores_499': cell.errors_499,
+            'Porcentaje_499': cell.errors_499 / cell.count * 100,
+            'Errores_5xx': cell.errors_5xx
+        }
+
+    # RESULTADOS
+    def get_colo_rows(self, threshold):
+        """Una fila por colo ordenada por requests; Delta_Promedio es contra el promedio de todos los colos"""
+        totals = self._by_colo()
+        requests = sum(cell.count for cell in totals.values())
+        mean = sum(cell.time for cell in totals.values()) / requests if requests else 0.0
+        rows = []
+        for colo, cell in sorted(totals.items(), key=lambda x: (-x[1].count, x[0])):
+            row = {'Colo': colo, 'Requests': cell.count, 'Porcentaje': cell.count / requests * 100}
+            row.update(self._row(cell, threshold))
+            row['Delta_Promedio'] = round(row['Tiempo_Promedio'] - mean, 4)
+            rows.append(row)
+        return rows
+
+    def get_hourly_rows(self, threshold):
+        """Matriz hora x colo en formato largo"""
+        rows = []
+        for (colo, hour), cell in sorted(self.cells.items(), key=lambda x: (x[0][1], -x[1].count, x[0][0])):
+            row = {'Hora': hour, 'Colo': colo}
+            row.update(self._row(cell, threshold))
+            rows.append(row)
+        return rows
+
+    def print_report(self, threshold, top=15, columns=8):
+        """Tabla por colo y matriz de p95 por hora para los colos con más tráfico"""
+        rows = self.get_colo_rows(threshold)
+        print(f"\n🌍 LATENCIA POR COLO DE CLOUDFLARE (sufijo de cf_ray): {len(rows):,} colos")
+        if self.missing:
+            print(f"⚠️  Requests de Cloudflare sin cf_ray: {self.missing:,}")
+        print(f"{'COLO':<8} {'REQUESTS':>10} {'%':>6} {'PROM':>8} {'Δ PROM':>8} {'P95':>8} {'P99':>8} "
+              f"{'%LENTO':>7} {'%499':>6} {'5XX':>6}")
+        print(f"{'-'*100}")
+        for row in rows[:top]:
+            print(f"{row['Colo']:<8} {row['Requests']:>10,} {row['Porcentaje']:>5.1f}% "
+                  f"{row['Tiempo_Promedio']:>7.3f}s {row['Delta_Promedio']:>+7.3f}s {row['P95']:>7.3f}s "
+                  f"{row['P99']:>7.3f}s {row['Porcentaje_Lentos']:>6.1f}% {row['Porcentaje_499']:>5.1f}% "
+                  f"{row['Errores_5xx']:>6,}")
+        if len(rows) > top:
+            print(f"... y {len(rows) - top:,} colos más en la exportación (cloudflare_colos)")
+
+        colos = [row['Colo'] for row in rows[:columns]]
+        hours = sorted({hour for _, hour in self.cells})
+        if len(colos) < 2 or len(hours) < 2:
+            return
+        print(f"\n🕐 P95 POR HORA Y COLO (los {len(colos)} colos con más requests)")
+        print(f"{'HORA':<8} " + ' '.join(f"{colo:>8}" for colo in colos))
+        print(f"{'-'*(9 + 9 * len(colos))}")
+        for hour in hours:
+            values = []
+            for colo in colos:
+                cell = self.cells.get((colo, hour))
+                values.append(f"{cell.hist.quantile(0.95):>7.3f}s" if cell else f"{'-':>8}")
+            print(f"{hour:<8} " + ' '.join(values))
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Modo compare: deltas por endpoint entre dos entradas (antes / después de un deploy)
+"""
+
+import json
+import math
+from datetime import datetime
+
+from .analyzer import ComprehensiveLogAnalyzer
+
+
+COMPARE_BUDGETS = {
+    # métrica: (descripción, tipo de delta)
+    'mean': ('Tiempo promedio', 'pct'),
+    'p95': ('Percentil 95', 'pct'),
+    'p99': ('Percentil 99', 'pct'),
+    'slow_rate': ('% lentos', 'pp'),
+    'rate_499': ('% 499', 'pp')
+}
+
+
+def parse_window(value):
+    """Convierte 'INICIO,FIN' en una tupla de datetimes (cualquiera puede ir vacío)"""
+    if not value:
+        return None, None
+    formats = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%d/%b/%Y:%H:%M:%S']
+    bounds = []
+    for part in value.split(','):
+        part = part.strip()
+        dt = None
+        for fmt in formats:
+            try:
+                dt = datetime.strptime(part, fmt)
+                break
+            except ValueError:
+                continue
+        if part and dt is None:
+            raise ValueError(f"Fecha inválida en ventana: '{part}'")
+        bounds.append(dt)
+    if len(bounds) != 2:
+        raise ValueError(f"La ventana debe tener el formato INICIO,FIN: '{value}'")
+    return bounds[0], bounds[1]
+
+
+def _read_snapshot(source, window=None):
+    if window:
+        raise ValueError(f"No se puede aplicar una ventana de tiempo a un snapshot: {source}")
+    with open(source, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load(source, threshold, window=None):
+    """(resúmenes, umbral usado); un log sin umbral usa el automático"""
+    if source.endswith('.json'):
+        snapshot = _read_snapshot(source, window)
+        if snapshot.get('threshold') != threshold:
+            print(f"⚠️  El snapshot {source} usa umbral {snapshot.get('threshold')}s "
+                  f"(comparando con {threshold}s)")
+        return snapshot['endpoints'], threshold
+
+    since, until = parse_window(window)
+    analyzer = ComprehensiveLogAnalyzer(source, threshold, since=since, until=until)
+    if not analyzer.parse_log():
+        raise ValueError(f"No se pudo procesar {source}")
+    return analyzer.get_endpoint_summaries(), analyzer.threshold
+
+
+def load_endpoint_summaries(source, threshold, window=None):
+    """Obtiene resúmenes por endpoint desde un snapshot JSON o un access.log"""
+    return _load(source, threshold, window)[0]
+
+
+def load_comparison(before, after, threshold=None, before_window=None, after_window=None):
+    """Resúmenes de las dos entradas con el mismo umbral de lentos: (antes, después, umbral).
+
+    Sin umbral se usa el de un snapshot (sus lentos ya están contados) o, entre
+    dos logs, el automático del log "antes".
+    """
+    if threshold is None:
+        for source, window in ((before, before_window), (after, after_window)):
+            if source.endswith('.json'):
+                threshold = _read_snapshot(source, window).get('threshold')
+                break
+    before_summaries, threshold = _load(before, threshold, before_window)
+    after_summaries, _ = _load(after, threshold, after_window)
+    return before_summaries, after_summaries, threshold
+
+
+def _z_mean(before, after):
+    """Estadístico z (Welch) del cambio en el tiempo promedio"""
+    se = math.sqrt(before['stdev'] ** 2 / before['total'] + after['stdev'] ** 2 / after['total'])
+    diff = after['mean'] - before['mean']
+    if se == 0:
+        return 0.0 if diff == 0 else math.copysign(99.0, diff)
+    return diff / se
+
+
+def _z_proportion(count_before, total_before, count_after, total_after):
+    """Estadístico z de dos proporciones (pooled) del cambio en una tasa"""
+    pooled = (count_before + count_after) / (total_before + total_after)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / total_before + 1 / total_after))
+    diff = count_after / total_after - count_before / total_before
+    if se == 0:
+        return 0.0
+    return diff / se
+
+
+def _pct_change(before, after):
+    """Cambio porcentual; 0 si el valor base es 0"""
+    return (after - before) / before * 100 if before > 0 else 0.0
+
+
+def compare_summaries(before, after, min_requests=10, min_score=3.0, budgets=None):
+    """Compara resúmenes por endpoint y devuelve filas ordenadas por score"""
+    budgets = budgets or {}
+    rows = []
+
+    for endpoint in set(before) & set(after):
+        b, a = before[endpoint], after[endpoint]
+        # Mismo criterio que print_slowest_endpoints: mínimo de muestras
+        if b['total'] < min_requests or a['total'] < min_requests:
+            continue
+
+        deltas = {
+            'mean': _pct_change(b['mean'], a['mean']),
+            'p95': _pct_change(b['p95'], a['p95']),
+            'p99': _pct_change(b['p99'], a['p99']),
+            'slow_rate': (a['slow'] / a['total'] - b['slow'] / b['total']) * 100,
+            'rate_499': (a['errors_499'] / a['total'] - b['errors_499'] / b['total']) * 100
+        }
+        score = max(
+            _z_mean(b, a),
+            _z_proportion(b['slow'], b['total'], a['slow'], a['total']),
+            _z_proportion(b['errors_499'], b['total'], a['errors_499'], a['total']),
+            0.0)
+
+        violations = []
+        if score >= min_score:
+            violations = [metric for metric, limit in budgets.items()
+                          if limit is not None and deltas[metric] > limit]
+
+        rows.append({
+            'endpoint': endpoint,
+            'before': b,
+            'after': a,
+            'deltas': deltas,
+            'score': score,
+            'significant': score >= min_score,
+            'violations': violations
+        })
+
+    rows.sort(key=lambda x: x['score'], reverse=True)
+    return rows
+
+
+def print_comparison(rows, before, after, min_requests, limit=30):
+    """Tabla de deltas por endpoint (antes vs después)"""
+    print(f"\n{'='*140}")
+    print(f"🔀 COMPARATIVA ANTES vs DESPUÉS (mínimo {min_requests} requests por lado)")
+    print(f"{'='*140}")
+    print(f"{'ENDPOINT':<50} {'N ANT':>7} {'N DESP':>7} {'AVG(s)':>14} {'ΔP95':>8} {'ΔP99':>8} "
+          f"{'Δ%LENTO':>8} {'Δ%499':>7} {'SCORE':>6}")
+    print(f"{'-'*140}")
+
+    for row in rows[:limit]:
+        b, a, d = row['before'], row['after'], row['deltas']
+        display_ep = row['endpoint'][:48] + \
+            ".." if len(row['endpoint']) > 50 else row['endpoint']
+        flag = " ⛔" if row['violations'] else (" ⚠️" if row['significant'] else "")
+        print(f"{display_ep:<50} {b['total']:>7} {a['total']:>7} "
+              f"{b['mean']:>6.3f}→{a['mean']:<6.3f} {d['p95']:>+7.1f}% {d['p99']:>+7.1f}% "
+              f"{d['slow_rate']:>+7.2f} {d['rate_499']:>+7.2f} {row['score']:>6.1f}{flag}")
+
+    new_endpoints = [ep for ep in set(after) - set(before) if after[ep]['total'] >= min_requests]
+    gone_endpoints = [ep for ep in set(before) - set(after) if before[ep]['total'] >= min_requests]
+    if new_endpoints:
+        print(f"\n🆕 Endpoints nuevos: {len(new_endpoints)}")
+        for ep in sorted(new_endpoints, key=lambda x: after[x]['total'], reverse=True)[:10]:
+            print(f"   {ep} ({after[ep]['total']:,} requests, {after[ep]['mean']:.3f}s)")
+    if gone_endpoints:
+        print(f"\n👋 Endpoints que desaparecieron: {len(gone_endpoints)}")
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+Reconstrucción de concurrencia y throughput por segundo a partir de timestamp y `rt`.
+
+nginx escribe la línea al terminar el request, así que cada request es el
+intervalo [fin - rt, fin]. Un sweep-line sobre los eventos de inicio y fin da
+los requests en vuelo en cada momento. Como el log viene (casi) ordenado por
+fin, solo se mantienen los eventos dentro de un horizonte de `horizon`
+segundos: todo lo anterior a la marca de agua ya es definitivo y se resume.
+
+En el pipeline cada lote acumula sus eventos por tick, conteos por segundo y
+agregados por minuto sin cerrar nada (`horizon=None`) y el proceso principal
+los une en orden con merge(): lo anterior a su cursor se recorta igual que en
+la corrida secuencial.
+"""
+
+import calendar
+import heapq
+import math
+import time
+from collections import Counter, defaultdict
+
+from .histogram import LatencyHistogram
+
+# Resolución del sweep: 100ms por tick
+TICKS_PER_SECOND = 10
+TICKS_PER_MINUTE = 60 * TICKS_PER_SECOND
+
+MONTHS = {m: i for i, m in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], 1)}
+
+
+def timestamp_to_epoch(timestamp):
+    """'25/Sep/2025:00:00:10 -0600' -> segundos (hora local del log, sin zona)"""
+    day, month, rest = timestamp.split('/', 2)
+    year, hh, mm, ss = rest.split(' ', 1)[0].split(':')
+    return calendar.timegm((int(year), MONTHS[month], int(day), int(hh), int(mm), int(ss[:2]), 0, 0, 0))
+
+
+def format_minute(minute):
+    """Índice de minuto -> 'YYYY-mm-dd HH:MM'"""
+    return time.strftime('%Y-%m-%d %H:%M', time.gmtime(minute * 60))
+
+
+def _level_percentile(levels, q):
+    """Percentil de un Counter {nivel: ticks}"""
+    total = sum(levels.values())
+    if total == 0:
+        return 0
+    rank = max(1, math.ceil(q * total))
+    seen = 0
+    for level in sorted(levels):
+        seen += levels[level]
+        if seen >= rank:
+            return level
+    return max(levels)
+
+
+def _pearson(xs, ys):
+    """Coeficiente de correlación de Pearson (None si no hay varianza)"""
+    n = len(xs)
+    if n < 3:
+        return None
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    if var_x == 0 or var_y == 0:
+        return None
+    return cov / math.sqrt(var_x * var_y)
+
+
+def _new_minute():
+    return {'levels': Counter(), 'max_arrivals': 0, 'max_completions': 0, 'total': 0,
+            'errors_499': 0, 'latency': LatencyHistogram()}
+
+
+class _Sweep:
+    """Sweep-line incremental sobre eventos +1/-1 en ticks.
+
+    Solo guarda los deltas aún no procesados; entre dos eventos la
+    concurrencia es constante, así que el costo es por evento y no por tick.
+    """
+
+    __slots__ = ('deltas', 'heap', 'running', 'cursor', 'levels', 'peak', 'peak_tick', 'on_segment')
+
+    def __init__(self, on_segment=None):
+        self.deltas = {}
+        self.heap = []
+        self.running = 0
+        self.cursor = None
+        self.levels = Counter()
+        self.peak = 0
+        self.peak_tick = None
+        self.on_segment = on_segment
+
+    def add(self, start, end):
+        """Agrega el intervalo [start, end); lo ya finalizado se recorta"""
+        if self.cursor is not None:
+            if end <= self.cursor:
+                return False
+            start = max(start, self.cursor)
+        for tick, delta in ((start, 1), (end, -1)):
+            if tick not in self.deltas:
+                self.deltas[tick] = 0
+                heapq.heappush(self.heap, tick)
+            self.deltas[tick] += delta
+        return True
+
+    def merge(self, other):
+        """Suma los eventos sin procesar de otro sweep (lote posterior).
+
+        Un tick anterior al cursor se mueve al cursor: el inicio de un request
+        en curso se recorta y un request ya terminado queda en +1/-1 sobre el
+        mismo tick, igual que si add() lo hubiera descartado.
+        """
+        cursor = self.cursor
+        for tick, delta in other.deltas.items():
+            if cursor is not None and tick < cursor:
+                tick = cursor
+            if tick not in self.deltas:
+                self.deltas[tick] = 0
+                heapq.heappush(self.heap, tick)
+            self.deltas[tick] += delta
+
+    def _segment(self, start, end):
+        if end <= start:
+            return
+        self.levels[self.running] += end - start
+        if self.running > self.peak:
+            self.peak = self.running
+            self.peak_tick = start
+        if self.on_segment:
+            self.on_segment(start, end, self.running)
+
+    def advance(self, watermark):
+        """Procesa todos los eventos anteriores a `watermark`"""
+        while self.heap and self.heap[0] < watermark:
+            tick = heapq.heappop(self.heap)
+            if self.cursor is None:
+                self.cursor = tick
+            self._segment(self.cursor, tick)
+            self.running += self.deltas.pop(tick)
+            self.cursor = tick
+        if self.cursor is not None and watermark > self.cursor:
+            self._segment(self.cursor, watermark)
+            self.cursor = watermark
+
+
+class _RateCounter:
+    """Conteo (o suma, ej. bytes) por segundo con ventana acotada; conserva el pico"""
+
+    __slots__ = ('counts', 'peak', 'peak_second')
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.peak = 0
+        self.peak_second = None
+
+    def add(self, second, amount=1):
+        self.counts[second] += amount
+
+    def merge(self, other):
+        for second, count in other.counts.items():
+            self.counts[second] += count
+
+    def prune(self, watermark, on_second=None):
+        """Cierra los segundos anteriores a `watermark`"""
+        for second in [s for s in self.counts if s < watermark]:
+            count = self.counts.pop(second)
+            if count > self.peak:
+                self.peak = count
+                self.peak_second = second
+            if on_second:
+                on_second(second, count)
+
+
+class ConcurrencyTracker:
+    """Concurrencia y RPS por segundo, global y por endpoint, en streaming.
+
+    - Llegadas por segundo: inicio del request (fin - rt)
+    - Terminaciones por segundo: timestamp de la línea
+    - Concurrencia: requests en vuelo (resolución de 100ms), máximo y p99 por minuto
+    - Por minuto también se cuentan terminaciones, 499 y un histograma de latencia
+      para correlacionar picos de concurrencia con lentos y 499
+
+    Con `horizon=None` no se procesa nada (lote del pipeline): se guardan los
+    eventos y los fines por tick para unirlos con merge().
+    """
+
+    def __init__(self, horizon=300):
+        self.horizon_ticks = horizon * TICKS_PER_SECOND if horizon is not None else None
+        self.max_end = None
+        self.late_requests = 0
+        # Fines por tick de un lote, para contar los atrasados al unirlo
+        self.ends = Counter()
+        self._endpoints_watermark = None
+        self._last_timestamp = None
+        self._last_epoch = None
+
+        self.overall = _Sweep(on_segment=self._on_overall_segment)
+        self.endpoints = defaultdict(_Sweep)
+        self.arrivals = _RateCounter()
+        self.completions = _RateCounter()
+        self.endpoint_arrivals = defaultdict(_RateCounter)
+
+        # Minuto -> acumuladores; se cierran al pasar la marca de agua
+        self._open_minutes = defaultdict(_new_minute)
+        self.minutes = {}
+
+    def batch(self):
+        """Tracker vacío para acumular un lote del pipeline (ver merge)"""
+        return ConcurrencyTracker(horizon=None)
+
+    def _epoch(self, timestamp):
+        # Las líneas consecutivas suelen compartir el mismo segundo
+        if timestamp != self._last_timestamp:
+            self._last_timestamp = timestamp
+            self._last_epoch = timestamp_to_epoch(timestamp)
+        return self._last_epoch
+
+    def add(self, timestamp, response_time, endpoint, status):
+        """Registra un request terminado en `timestamp` que tardó `response_time`"""
+        epoch = self._epoch(timestamp)
+        # El timestamp tiene resolución de segundo: se toma la mitad del segundo como fin
+        end = epoch * TICKS_PER_SECOND + TICKS_PER_SECOND // 2
+        start = end - int(round(response_time * TICKS_PER_SECOND))
+        # Todo request ocupa al menos un tick
+        end = max(end, start + 1)
+        start_second = start // TICKS_PER_SECOND
+
+        if not self.overall.add(start, end):
+            self.late_requests += 1
+        self.endpoints[endpoint].add(start, end)
+        self.arrivals.add(start_second)
+        self.completions.add(epoch)
+        self.endpoint_arrivals[endpoint].add(start_second)
+
+        minute = self._minute(epoch // 60)
+        minute['total'] += 1
+        if status == 499:
+            minute['errors_499'] += 1
+        minute['latency'].add(response_time)
+
+        if self.horizon_ticks is None:
+            self.ends[end] += 1
+            if self.max_end is None or end > self.max_end:
+                self.max_end = end
+        elif self.max_end is None or end > self.max_end:
+            self._move_watermark(end)
+
+    def _move_watermark(self, end):
+        self.max_end = end
+        self._advance(end - self.horizon_ticks)
+        # Los sweeps por endpoint se avanzan una vez por minuto de log
+        if self._endpoints_watermark is None:
+            self._endpoints_watermark = end
+        elif end - self._endpoints_watermark >= TICKS_PER_MINUTE:
+            self._endpoints_watermark = end
+            self.advance_endpoints()
+
+    def merge(self, other):
+        """Une un lote posterior acumulado con `horizon=None`.
+
+        El resultado es el de la corrida secuencial mientras el desorden del
+        log no supere el horizonte; un request más atrasado que eso se recorta
+        contra el cursor al unir el lote y no contra el de su línea.
+        """
+        cursor = self.overall.cursor
+        if cursor is not None:
+            self.late_requests += sum(count for tick, count in other.ends.items() if tick <= cursor)
+        self.overall.merge(other.overall)
+        for endpoint, sweep in other.endpoints.items():
+            self.endpoints[endpoint].merge(sweep)
+        self.arrivals.merge(other.arrivals)
+        self.completions.merge(other.completions)
+        for endpoint, counter in other.endpoint_arrivals.items():
+            self.endpoint_arrivals[endpoint].merge(counter)
+        for minute, stats in other._open_minutes.items():
+            mine = self._minute(minute)
+            mine['total'] += stats['total']
+            mine['errors_499'] += stats['errors_499']
+            mine['latency'].merge(stats['latency'])
+
+        if other.max_end is not None and (self.max_end is None or other.max_end > self.max_end):
+            self._move_watermark(other.max_end)
+
+    def _minute(self, minute):
+        # Un request atrasado puede caer en un minuto ya cerrado
+        if minute in self.minutes:
+            return self.minutes[minute]
+        return self._open_minutes[minute]
+
+    def _advance(self, watermark):
+        self.overall.advance(watermark)
+        second = watermark // TICKS_PER_SECOND
+        self.arrivals.prune(second, lambda s, c: self._on_rate(s, c, 'max_arrivals'))
+        self.completions.prune(second, lambda s, c: self._on_rate(s, c, 'max_completions'))
+        self._close_minutes(watermark // TICKS_PER_MINUTE)
+
+    def _on_overall_segment(self, start, end, level):
+        # Repartir el segmento entre los minutos que cruza
+        while start < end:
+            minute = start // TICKS_PER_MINUTE
+            cut = min(end, (minute + 1) * TICKS_PER_MINUTE)
+            self._open_minutes[minute]['levels'][level] += cut - start
+            start = cut
+
+    def _on_rate(self, second, count, field):
+        minute = self._minute(second // 60)
+        minute[field] = max(minute[field], count)
+
+    def _close_minutes(self, before_minute):
+        for minute in [m for m in self._open_minutes if m < before_minute]:
+            stats = self._open_minutes.pop(minute)
+            levels = stats.pop('levels')
+            ticks = sum(levels.values())
+            stats['max_concurrency'] = max(levels) if levels else 0
+            stats['p99_concurrency'] = _level_percentile(levels, 0.99)
+            stats['avg_concurrency'] = (sum(k * v for k, v in levels.items()) / ticks) if ticks else 0.0
+            self.minutes[minute] = stats
+
+    def flush(self):
+        """Cierra todo lo pendiente (fin del log)"""
+        if self.max_end is None:
+            return
+        final = self.max_end + 1 + self.horizon_ticks
+        self._advance(final)
+        for endpoint, sweep in self.endpoints.items():
+            sweep.advance(final)
+            self.endpoint_arrivals[endpoint].prune(final // TICKS_PER_SECOND)
+
+    def advance_endpoints(self):
+        """Avanza los sweeps por endpoint hasta la marca de agua global"""
+        if self.max_end is None:
+            return
+        watermark = self.max_end - self.horizon_ticks
+        for endpoint, sweep in self.endpoints.items():
+            sweep.advance(watermark)
+            self.endpoint_arrivals[endpoint].prune(watermark // TICKS_PER_SECOND)
+
+    # RESULTADOS
+    @staticmethod
+    def slow_in_minute(stats, threshold):
+        """Lentos (> threshold) de un minuto, con los mismos buckets que el resto de las tablas"""
+        return stats['latency'].count_above(threshold)
+
+    def get_minute_rows(self, threshold):
+        rows = []
+        for minute in sorted(self.minutes):
+            stats = self.minutes[minute]
+            total = stats['total']
+            slow = self.slow_in_minute(stats, threshold)
+            rows.append({
+                'Minuto': format_minute(minute),
+                'Requests': total,
+                'RPS_Llegadas_Max': stats['max_arrivals'],
+                'RPS_Terminados_Max': stats['max_completions'],
+                'Concurrencia_Promedio': round(stats['avg_concurrency'], 2),
+                'Concurrencia_P99': stats['p99_concurrency'],
+                'Concurrencia_Max': stats['max_concurrency'],
+                'Requests_Lentos': slow,
+                'Errores_499': stats['errors_499'],
+                'Porcentaje_Lentos': (slow / total * 100) if total else 0,
+                'Porcentaje_499': (stats['errors_499'] / total * 100) if total else 0
+            })
+        return rows
+
+    def get_endpoint_rows(self):
+        rows = []
+        for endpoint, sweep in self.endpoints.items():
+            arrivals = self.endpoint_arrivals[endpoint]
+            rows.append({
+                'Endpoint': endpoint,
+                'Concurrencia_Max': sweep.peak,
+                'Concurrencia_P99': _level_percentile(sweep.levels, 0.99),
+                'Momento_Pico': format_minute(sweep.peak_tick // TICKS_PER_MINUTE)
+                if sweep.peak_tick is not None else '-',
+                'RPS_Llegadas_Max': arrivals.peak
+            })
+        rows.sort(key=lambda x: x['Concurrencia_Max'], reverse=True)
+        return rows
+
+    def get_correlations(self, threshold):
+        """Correlación por minuto entre concurrencia p99 y % de lentos / % de 499"""
+        rows = [r for r in self.get_minute_rows(threshold) if r['Requests'] > 0]
+        concurrency = [r['Concurrencia_P99'] for r in rows]
+        return {
+            'lentos': _pearson(concurrency, [r['Porcentaje_Lentos'] for r in rows]),
+            '499': _pearson(concurrency, [r['Porcentaje_499'] for r in rows])
+        }
+
+    def print_report(self, threshold, top=10):
+        """Tablas de concurrencia y throughput"""
+        print(f"\n{'='*100}")
+        print("🚦 CONCURRENCIA Y THROUGHPUT (reconstruido con timestamp - rt)")
+        print(f"{'='*100}")
+
+        if not self.minutes:
+            print("No hay datos para mostrar")
+            return
+
+        overall_levels = self.overall.levels
+        peak_arrival = self.arrivals
+        peak_completion = self.completions
+        print(f"🚀 Pico de llegadas: {peak_arrival.peak:,} req/s "
+              f"({time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(peak_arrival.peak_second))})")
+        print(f"🏁 Pico de terminados: {peak_completion.peak:,} req/s "
+              f"({time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(peak_completion.peak_second))})")
+        print(f"🔝 Concurrencia máxima: {self.overall.peak:,} "
+              f"({format_minute(self.overall.peak_tick // TICKS_PER_MINUTE)})")
+        print(f"📊 Concurrencia p99: {_level_percentile(overall_levels, 0.99):,}")
+        if self.late_requests:
+            print(f"⚠️  Requests fuera de orden (fuera del horizonte): {self.late_requests:,}")
+
+        correlations = self.get_correlations(threshold)
+        for name, value in correlations.items():
+            label = f"{value:+.2f}" if value is not None else "n/d"
+            print(f"🔗 Correlación concurrencia p99 vs % {name} (por minuto): {label}")
+
+        minute_rows = self.get_minute_rows(threshold)
+        total = sum(r['Requests'] for r in minute_rows)
+        avg_slow = sum(r['Requests_Lentos'] for r in minute_rows) / total * 100 if total else 0
+        avg_499 = sum(r['Errores_499'] for r in minute_rows) / total * 100 if total else 0
+
+        print(f"\n🔥 TOP {top} MINUTOS CON MAYOR CONCURRENCIA "
+              f"(promedio general: {avg_slow:.1f}% lentos, {avg_499:.1f}% 499)")
+        print(f"{'MINUTO':<17} {'REQS':>7} {'RPS MAX':>8} {'CONC P99':>9} {'CONC MAX':>9} {'%LENTO':>7} {'%499':>6}")
+        print(f"{'-'*100}")
+        for row in sorted(minute_rows, key=lambda x: x['Concurrencia_Max'], reverse=True)[:top]:
+            print(f"{row['Minuto']:<17} {row['Requests']:>7} {row['RPS_Llegadas_Max']:>8} "
+                  f"{row['Concurrencia_P99']:>9} {row['Concurrencia_Max']:>9} "
+                  f"{row['Porcentaje_Lentos']:>6.1f}% {row['Porcentaje_499']:>5.1f}%")
+
+        print(f"\n{'ENDPOINT':<60} {'CONC MAX':>9} {'CONC P99':>9} {'RPS MAX':>8}")
+        print(f"{'-'*100}")
+        for row in self.get_endpoint_rows()[:15]:
+            display_ep = row['Endpoint'][:58] + ".." if len(row['Endpoint']) > 60 else row['Endpoint']
+            print(f"{display_ep:<60} {row['Concurrencia_Max']:>9} {row['Concurrencia_P99']:>9} "
+                  f"{row['RPS_Llegadas_Max']:>8}")
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+Correlación del error.log de nginx con los requests lentos, 499 y 5xx.
+
+El error.log (mucho más chico que el access.log) se indexa primero por
+minuto, endpoint, causa y upstream. Durante el parseo del access.log solo se
+acumulan conteos para los minutos que tienen eventos de error, así que la
+memoria depende del error.log y no del tamaño del access.log. Al final se
+cruzan ambos por minuto y endpoint y se compara contra la tasa normal de
+cada endpoint (lift).
+"""
+
+import calendar
+import copy
+import gzip
+import re
+from collections import Counter, defaultdict
+
+from .concurrency import format_minute
+from .histogram import LatencyHistogram
+
+ERROR_LINE_RE = re.compile(
+    r'^(\d{4})/(\d{2})/(\d{2}) (\d{2}):(\d{2}):(\d{2}) \[(\w+)\] \d+#\d+: (?:\*\d+ )?(.*)$')
+ERROR_REQUEST_RE = re.compile(r'request: "(\w+) (\S+)')
+ERROR_UPSTREAM_RE = re.compile(r'upstream: "(?:\w+://)?([^/"]+)')
+
+# (texto en el mensaje, causa, tipo); gana la primera coincidencia
+ERROR_CAUSES = [
+    ('upstream timed out', 'upstream timed out', 'saturación backend'),
+    ('no live upstreams', 'no live upstreams', 'backend caído'),
+    ('connect() failed', 'connect() failed', 'backend caído'),
+    ('upstream prematurely closed', 'upstream prematurely closed', 'backend caído'),
+    ('worker_connections are not enough', 'worker_connections', 'saturación nginx'),
+    ('limiting requests', 'limit_req', 'saturación nginx'),
+    ('limiting connections', 'limit_conn', 'saturación nginx'),
+    ('connection reset by peer', 'connection reset', 'red'),
+    ('broken pipe', 'broken pipe', 'red'),
+    ('ssl_do_handshake() failed', 'SSL handshake', 'red'),
+    ('could not be resolved', 'DNS', 'red'),
+    ('host not found', 'DNS', 'red'),
+    ('network is unreachable', 'network unreachable', 'red'),
+    ('no route to host', 'no route to host', 'red'),
+    ('client prematurely closed', 'client closed', 'cliente'),
+    ('client intended to send too large', 'body too large', 'cliente'),
+    ('upstream sent too big header', 'header too big', 'backend'),
+    ('upstream sent invalid', 'invalid response', 'backend'),
+]
+
+# Endpoint para eventos sin request (afectan a todos los endpoints del minuto)
+ANY_ENDPOINT = '*'
+
+
+def classify_error(message):
+    """Mensaje de error.log -> (causa, tipo)"""
+    lowered = message.lower()
+    for needle, cause, kind in ERROR_CAUSES:
+        if needle in lowered:
+            return cause, kind
+    return 'otro', 'otro'
+
+
+def open_log(path):
+    """Abre un log de texto, comprimido con gzip o no"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='ignore')
+    return open(path, 'r', encoding='utf-8', errors='ignore')
+
+
+class _Cell:
+    """Requests de un (minuto, endpoint) del access.log"""
+
+    __slots__ = ('total', 'errors_499', 'errors_5xx', 'latency')
+
+    def __init__(self):
+        self.total = 0
+        self.errors_499 = 0
+        self.errors_5xx = 0
+        # Histograma de los requests por encima del mínimo de lentitud (mismos
+        # buckets que las tablas principales: los lentos coinciden para cualquier umbral)
+        self.latency = LatencyHistogram()
+
+    def merge(self, other):
+        self.total += other.total
+        self.errors_499 += other.errors_499
+        self.errors_5xx += other.errors_5xx
+        self.latency.merge(other.latency)
+
+
+class ErrorLogCorrelator:
+    """Índice del error.log y cruce con el access.log por minuto y endpoint.
+
+    Un evento del minuto m se cruza con los requests terminados en m y m+1
+    (el access.log escribe al terminar el request).
+    """
+
+    def __init__(self, min_slow=0.5, levels=('warn', 'error', 'crit', 'alert', 'emerg')):
+        self.min_slow = min_slow
+        self.levels = set(levels)
+        # (minuto, endpoint, causa, upstream) -> eventos
+        self.events = Counter()
+        self.kinds = {}
+        self.watched = set()
+        # minuto -> {endpoint: _Cell}
+        self.cells = defaultdict(dict)
+        self.total_events = 0
+        self.skipped_lines = 0
+
+    # ERROR.LOG
+    def load(self, lines):
+        """Indexa líneas del error.log"""
+        for line in lines:
+            match = ERROR_LINE_RE.match(line)
+            if not match:
+                # Continuaciones, líneas de otro formato o de otro nivel
+                self.skipped_lines += 1
+                continue
+            year, month, day, hh, mm, ss, level, message = match.groups()
+            if level not in self.levels:
+                self.skipped_lines += 1
+                continue
+
+            minute = calendar.timegm((int(year), int(month), int(day), int(hh), int(mm), int(ss), 0, 0, 0)) // 60
+            cause, kind = classify_error(message)
+            request = ERROR_REQUEST_RE.search(message)
+            endpoint = f"{request.group(1)} {request.group(2).split('?')[0]}" if request else ANY_ENDPOINT
+            upstream = ERROR_UPSTREAM_RE.search(message)
+            upstream = upstream.group(1) if upstream else '-'
+
+            self.events[(minute, endpoint, cause, upstream)] += 1
+            self.kinds[cause] = kind
+            self.watched.add(minute)
+            self.watched.add(minute + 1)
+            self.total_events += 1
+        return self
+
+    def load_file(self, path):
+        """Lee e indexa el error.log completo (no se intercala con el access.log)"""
+        with open_log(path) as f:
+            return self.load(f)
+
+    def fork(self):
+        """Copia que comparte el índice ya cargado y acumula sus propias celdas (lotes del pipeline)"""
+        clone = copy.copy(self)
+        clone.cells = defaultdict(dict)
+        return clone
+
+    def merge_cells(self, cells):
+        """Suma las celdas {minuto: {endpoint: _Cell}} de una copia"""
+        for minute, endpoints in cells.items():
+            mine = self.cells[minute]
+            for endpoint, cell in endpoints.items():
+                if endpoint in mine:
+                    mine[endpoint].merge(cell)
+                else:
+                    mine[endpoint] = cell
+
+    # ACCESS.LOG
+    def add(self, epoch, endpoint, status, response_time):
+        """Registra un request del access.log si cae en un minuto con errores"""
+        minute = epoch // 60
+        if minute not in self.watched:
+            return
+        cells = self.cells[minute]
+        cell = cells.get(endpoint)
+        if cell is None:
+            cell = cells[endpoint] = _Cell()
+        cell.total += 1
+        if status == 499:
+            cell.errors_499 += 1
+        elif 500 <= status <= 599:
+            cell.errors_5xx += 1
+        if response_time > self.min_slow:
+            cell.latency.add(response_time)
+
+    # CRUCE
+    def _window_stats(self, minutes, endpoint, threshold):
+        """[total, lentos, 499, 5xx] de un endpoint (o de todos) en un conjunto de minutos"""
+        stats = [0, 0, 0, 0]
+        for minute in minutes:
+            cells = self.cells.get(minute)
+            if not cells:
+                continue
+            if endpoint == ANY_ENDPOINT:
+                selected = cells.values()
+            else:
+                selected = [cells[endpoint]] if endpoint in cells else []
+            for cell in selected:
+                self._accumulate(stats, cell, threshold)
+        return stats
+
+    @staticmethod
+    def _accumulate(stats, cell, threshold):
+        stats[0] += cell.total
+        stats[1] += cell.latency.count_above(threshold)
+        stats[2] += cell.errors_499
+        stats[3] += cell.errors_5xx
+
+    @staticmethod
+    def _lift(hits, total, base_hits, base_total):
+        """Tasa en la ventana / tasa normal ('∞' si normalmente es cero)"""
+        if not total or not base_total:
+            return None
+        rate = hits / total
+        base = base_hits / base_total
+        if base == 0:
+            return None if rate == 0 else '∞'
+        return round(rate / base, 2)
+
+    def get_endpoint_rows(self, threshold, baselines):
+        """Por (causa, endpoint): eventos y cómo se comportó el endpoint en esos minutos.
+
+        `baselines` es {endpoint: (total, lentos, 499, 5xx)} del log completo;
+        si trae ANY_ENDPOINT se usa como base de todos los endpoints.
+        """
+        grouped = defaultdict(lambda: {'events': 0, 'minutes': set(), 'upstreams': Counter()})
+        for (minute, endpoint, cause, upstream), count in self.events.items():
+            group = grouped[(cause, endpoint)]
+            group['events'] += count
+            group['minutes'].add(minute)
+            group['upstreams'][upstream] += count
+
+        base_all = baselines.get(ANY_ENDPOINT) or [sum(values[i] for values in baselines.values()) for i in range(4)]
+        rows = []
+        for (cause, endpoint), group in grouped.items():
+            window = group['minutes'] | {minute + 1 for minute in group['minutes']}
+            total, slow, errors_499, errors_5xx = self._window_stats(window, endpoint, threshold)
+            base = baselines.get(endpoint, base_all) if endpoint != ANY_ENDPOINT else base_all
+            rows.append({
+                'Causa': cause,
+                'Tipo': self.kinds.get(cause, 'otro'),
+                'Endpoint': endpoint,
+                'Eventos': group['events'],
+                'Minutos': len(group['minutes']),
+                'Primer_Minuto': format_minute(min(group['minutes'])),
+                'Ultimo_Minuto': format_minute(max(group['minutes'])),
+                'Upstream_Principal': group['upstreams'].most_common(1)[0][0],
+                'Requests_En_Ventana': total,
+                'Porcentaje_Lentos': (slow / total * 100) if total else 0,
+                'Porcentaje_499': (errors_499 / total * 100) if total else 0,
+                'Porcentaje_5xx': (errors_5xx / total * 100) if total else 0,
+                'Lift_Lentos': self._lift(slow, total, base[1], base[0]),
+                'Lift_499': self._lift(errors_499, total, base[2], base[0]),
+                'Lift_5xx': self._lift(errors_5xx, total, base[3], base[0])
+            })
+        rows.sort(key=lambda x: x['Eventos'], reverse=True)
+        return rows
+
+    def get_cause_rows(self):
+        """Eventos por causa: tipo, minutos, endpoints y upstreams afectados"""
+        grouped = defaultdict(lambda: {'events': 0, 'minutes': set(), 'endpoints': set(), 'upstreams': Counter()})
+        for (minute, endpoint, cause, upstream), count in self.events.items():
+            group = grouped[cause]
+            group['events'] += count
+            group['minutes'].add(minute)
+            group['endpoints'].add(endpoint)
+            group['upstreams'][upstream] += count
+
+        rows = []
+        for cause, group in grouped.items():
+            rows.append({
+                'Causa': cause,
+                'Tipo': self.kinds.get(cause, 'otro'),
+                'Eventos': group['events'],
+                'Porcentaje': (group['events'] / self.total_events * 100) if self.total_events else 0,
+                'Minutos_Con_Eventos': len(group['minutes']),
+                'Endpoints_Afectados': len(group['endpoints'] - {ANY_ENDPOINT}),
+                'Upstreams': ", ".join(f"{u} ({c})" for u, c in group['upstreams'].most_common(3))
+            })
+        rows.sort(key=lambda x: x['Eventos'], reverse=True)
+        return rows
+
+    def get_upstream_rows(self):
+        """Eventos por upstream y causa"""
+        grouped = defaultdict(Counter)
+        for (_, _, cause, upstream), count in self.events.items():
+            grouped[upstream][cause] += count
+        rows = []
+        for upstream, causes in grouped.items():
+            total = sum(causes.values())
+            rows.append({
+                'Upstream': upstream,
+                'Eventos': total,
+                'Causa_Principal': causes.most_common(1)[0][0],
+                'Causas': ", ".join(f"{c} ({n})" for c, n in causes.most_common())
+            })
+        rows.sort(key=lambda x: x['Eventos'], reverse=True)
+        return rows
+
+    def print_report(self, threshold, baselines, top=20):
+        """Tablas de causas, upstreams y su cruce con los endpoints"""
+        print(f"\n{'='*120}")
+        print("🧯 CORRELACIÓN CON ERROR.LOG (causas vs endpoints lentos / 499 / 5xx)")
+        print(f"{'='*120}")
+
+        if not self.total_events:
+            print("No hay eventos de error en el rango analizado")
+            return
+
+        print(f"📕 Eventos de error indexados: {self.total_events:,} "
+              f"(líneas omitidas: {self.skipped_lines:,})")
+
+        print(f"\n{'CAUSA':<30} {'TIPO':<20} {'EVENTOS':>8} {'%':>6} {'MINUTOS':>8} {'ENDPOINTS':>9}  UPSTREAMS")
+        print(f"{'-'*120}")
+        for row in self.get_cause_rows():
+            print(f"{row['Causa']:<30} {row['Tipo']:<20} {row['Eventos']:>8,} {row['Porcentaje']:>5.1f}% "
+                  f"{row['Minutos_Con_Eventos']:>8,} {row['Endpoints_Afectados']:>9,}  {row['Upstreams']}")
+
+        def lift(value):
+            if value is None:
+                return "-"
+            return value if isinstance(value, str) else f"x{value:.1f}"
+
+        print(f"\n🔗 TOP {top} CAUSA × ENDPOINT (comportamiento del endpoint en los minutos con eventos)")
+        print(f"{'CAUSA':<26} {'ENDPOINT':<40} {'EVENT':>6} {'REQS':>7} {'%LENTO':>7} {'LIFT':>6} "
+              f"{'%499':>6} {'LIFT':>6} {'%5XX':>6} {'LIFT':>6}")
+        print(f"{'-'*120}")
+        for row in self.get_endpoint_rows(threshold, baselines)[:top]:
+            display_ep = row['Endpoint'][:38] + ".." if len(row['Endpoint']) > 40 else row['Endpoint']
+            print(f"{row['Causa'][:26]:<26} {display_ep:<40} {row['Eventos']:>6,} {row['Requests_En_Ventana']:>7,} "
+                  f"{row['Porcentaje_Lentos']:>6.1f}% {lift(row['Lift_Lentos']):>6} "
+                  f"{row['Porcentaje_499']:>5.1f}% {lift(row['Lift_499']):>6} "
+                  f"{row['Porcentaje_5xx']:>5.1f}% {lift(row['Lift_5xx']):>6}")
+
+        kinds = Counter()
+        for row in self.get_cause_rows():
+            kinds[row['Tipo']] += row['Eventos']
+        if kinds:
+            summary = ", ".join(f"{kind}: {count / self.total_events * 100:.0f}%"
+                                for kind, count in kinds.most_common())
+            print(f"\n💡 Eventos por tipo: {summary}")
+            main_kind = kinds.most_common(1)[0][0]
+            if main_kind.startswith('saturación'):
+                print("💡 Predominan timeouts / límites: apunta a saturación (backend o nginx), no a la red")
+            elif main_kind == 'red':
+                print("💡 Predominan resets / handshakes / DNS: apunta a problemas de red entre nginx y el upstream")
+            elif main_kind == 'backend caído':
+                print("💡 Predominan conexiones rechazadas / sin upstreams vivos: backend caído o reiniciándose")
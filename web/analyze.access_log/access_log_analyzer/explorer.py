@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Explorador interactivo en terminal (curses) sobre los agregados en memoria.
+
+Al abrirse se toman del almacén por endpoint las celdas (endpoint, status,
+hora) con cantidad, tiempos, errores e histograma de latencia, y con ellas se
+arman dos árboles ya sumados: endpoint -> status -> hora y
+status -> endpoint -> hora. Cada cambio de vista (ordenar, filtrar, entrar o
+volver, cambiar de umbral) solo ordena las filas de un nodo, cuyas métricas
+se calculan una vez por umbral, así que responde en milisegundos sin volver a
+recorrer los requests. El último nivel muestra los ejemplos guardados por el
+muestreo de lentos/499/5xx del endpoint.
+"""
+
+import sys
+import time
+from collections import defaultdict
+
+try:
+    import curses
+except ImportError:
+    # Windows sin el paquete windows-curses
+    curses = None
+
+from .histogram import LatencyHistogram
+
+# vista -> orden de las dimensiones al profundizar
+ORDERS = {
+    'endpoint': ('endpoint', 'status', 'hour'),
+    'status': ('status', 'endpoint', 'hour'),
+}
+DIMENSION_LABELS = {'endpoint': 'ENDPOINT', 'status': 'STATUS', 'hour': 'HORA'}
+# (métrica, encabezado) en el orden en que se recorren con 's'
+SORT_KEYS = (('requests', 'REQS'), ('avg', 'PROM'), ('p95', 'P95'), ('p99', 'P99'), ('max', 'MÁX'),
+             ('slow', '%LENTO'), ('499', '%499'), ('5xx', '%5XX'), ('key', 'CLAVE'))
+
+
+class _Stats:
+    """Cantidad, tiempo, máximo, errores e histograma de un nodo"""
+
+    __slots__ = ('count', 'time', 'max', 'errors_499', 'errors_5xx', 'hist')
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.max = 0.0
+        self.errors_499 = 0
+        self.errors_5xx = 0
+        self.hist = LatencyHistogram()
+
+    def merge(self, other):
+        self.count += other.count
+        self.time += other.time
+        self.max = max(self.max, other.max)
+        self.errors_499 += other.errors_499
+        self.errors_5xx += other.errors_5xx
+        self.hist.merge(other.hist)
+
+    def merge_cell(self, status, cell):
+        """Suma una celda (status, hora) del almacén (storage._Cell)"""
+        self.count += cell.count
+        self.time += cell.time
+        self.max = max(self.max, cell.max)
+        if status == 499:
+            self.errors_499 += cell.count
+        elif status >= 500:
+            self.errors_5xx += cell.count
+        self.hist.merge(cell.hist)
+
+
+class _Node:
+    """Nodo del árbol: agregados propios, hijos por valor y métricas por umbral"""
+
+    __slots__ = ('key', 'stats', 'children', 'metrics')
+
+    def __init__(self, key):
+        self.key = key
+        self.stats = _Stats()
+        self.children = {}
+        self.metrics = {}
+
+    def child(self, key):
+        node = self.children.get(key)
+        if node is None:
+            node = self.children[key] = _Node(key)
+        return node
+
+
+def _hour(timestamp):
+    """'25/Sep/2025:10:00:13 -0600' -> '10:00' (mismo criterio que el analizador)"""
+    try:
+        return f"{int(timestamp.split(':')[1]):02d}:00"
+    except (AttributeError, IndexError, ValueError):
+        return 'unknown'
+
+
+class ExplorerIndex:
+    """Árboles precalculados y ejemplos por endpoint; independiente de curses"""
+
+    def __init__(self, analyzer):
+        self.thresholds = list(analyzer.thresholds)
+        # Celdas hoja (endpoint, status, hora) tal cual las guarda el almacén
+        leaves = defaultdict(_Stats)
+        for endpoint, stats in analyzer.endpoints.items():
+            for (status, hour), cell in stats.cells.items():
+                leaves[(endpoint, status, hour)].merge_cell(status, cell)
+
+        # Árboles ya sumados: cada hoja se une a sus ancestros en cada vista
+        self.roots = {name: _Node(None) for name in ORDERS}
+        for (endpoint, status, hour), stats in leaves.items():
+            values = {'endpoint': endpoint, 'status': status, 'hour': hour}
+            for name, order in ORDERS.items():
+                node = self.roots[name]
+                node.stats.merge(stats)
+                for dimension in order:
+                    node = node.child(values[dimension])
+                    node.stats.merge(stats)
+
+        # Ejemplos del muestreo por endpoint, con la hora para filtrar
+        self.samples = defaultdict(list)
+        for row in analyzer.samples.get_rows(analyzer.threshold):
+            if not row['Tipo'].startswith('top_'):
+                self.samples[row['Endpoint']].append(dict(row, Hora=_hour(row['Timestamp'])))
+
+    def metrics(self, node, threshold):
+        """Métricas de un nodo (se calculan una vez por umbral)"""
+        cached = node.metrics.get(threshold)
+        if cached is None:
+            stats = node.stats
+            count = stats.count or 1
+            cached = node.metrics[threshold] = {
+                'key': str(node.key),
+                'requests': stats.count,
+                'avg': stats.time / count,
+                'p95': stats.hist.quantile(0.95),
+                'p99': stats.hist.quantile(0.99),
+                'max': stats.max,
+                'slow': stats.hist.count_above(threshold) / count * 100,
+                '499': stats.errors_499 / count * 100,
+                '5xx': stats.errors_5xx / count * 100
+            }
+        return cached
+
+    def rows(self, node, threshold, sort='requests', reverse=False, text=''):
+        """Hijos de un nodo como (nodo, métricas), filtrados por texto y ordenados"""
+        text = text.lower()
+        rows = [(child, self.metrics(child, threshold)) for child in node.children.values()
+                if not text or text in str(child.key).lower()]
+        if sort == 'key':
+            rows.sort(key=lambda r: r[1]['key'], reverse=reverse)
+        else:
+            # Descendente por defecto (lo más grande primero); el nombre desempata
+            rows.sort(key=lambda r: (-r[1][sort], r[1]['key']) if not reverse else (r[1][sort], r[1]['key']))
+        return rows
+
+    def sample_rows(self, endpoint, status=None, hour=None):
+        """(ejemplos del endpoint por status y hora, nota si hubo que relajar el filtro).
+
+        Solo se guardan ejemplos de lentos, 499 y 5xx: si no hay para esa hora
+        se muestran los del mismo status en otras horas, y si tampoco, todos
+        los del endpoint.
+        """
+        samples = self.samples.get(endpoint, [])
+        for note, check in (('', lambda r: r['Status'] == status and r['Hora'] == hour),
+                            ('de otras horas', lambda r: r['Status'] == status),
+                            ('de otros status', lambda r: True)):
+            matching = [row for row in samples if check(row)]
+            if matching:
+                return sorted(matching, key=lambda r: -r['RT']), note
+        return [], ''
+
+
+class _Frame:
+    """Un nivel de la navegación: nodo, valores elegidos, selección y filtro"""
+
+    __slots__ = ('node', 'path', 'selected', 'top', 'text')
+
+    def __init__(self, node, path):
+        self.node = node
+        self.path = path
+        self.selected = 0
+        self.top = 0
+        self.text = ''
+
+
+class Explorer:
+    """Interfaz curses: ↑↓ mover, Enter/→ entrar, ←/Backspace volver, s/r orden, / filtro, t umbral, v vista"""
+
+    HELP = "↑↓ mover  Enter/→ entrar  ←/Bksp volver  s orden  r invertir  / filtro  t umbral  v vista  q salir"
+
+    def __init__(self, index):
+        self.index = index
+        self.view = 'endpoint'
+        self.sort = 0
+        self.reverse = False
+        self.threshold = 0
+        self.stack = [_Frame(index.roots[self.view], ())]
+        self.elapsed = 0.0
+
+    @property
+    def order(self):
+        return ORDERS[self.view]
+
+    def _current_rows(self):
+        frame = self.stack[-1]
+        depth = len(self.stack) - 1
+        if depth < len(self.order):
+            return self.index.rows(frame.node, self.index.thresholds[self.threshold], SORT_KEYS[self.sort][0],
+                                   self.reverse, frame.text), ''
+        values = dict(zip(self.order, frame.path))
+        return self.index.sample_rows(values['endpoint'], values['status'], values['hour'])
+
+    def run(self, screen):
+        curses.curs_set(0)
+        screen.keypad(True)
+        while True:
+            started = time.perf_counter()
+            rows, note = self._current_rows()
+            self.elapsed = time.perf_counter() - started
+            self._draw(screen, rows, note)
+            key = screen.getch()
+            frame = self.stack[-1]
+            page = max(1, screen.getmaxyx()[0] - 6)
+            if key in (ord('q'), 27):
+                return
+            elif key in (curses.KEY_DOWN, ord('j')):
+                frame.selected = min(frame.selected + 1, max(len(rows) - 1, 0))
+            elif key in (curses.KEY_UP, ord('k')):
+                frame.selected = max(frame.selected - 1, 0)
+            elif key == curses.KEY_NPAGE:
+                frame.selected = min(frame.selected + page, max(len(rows) - 1, 0))
+            elif key == curses.KEY_PPAGE:
+                frame.selected = max(frame.selected - page, 0)
+            elif key == curses.KEY_HOME:
+                frame.selected = 0
+            elif key == curses.KEY_END:
+                frame.selected = max(len(rows) - 1, 0)
+            elif key in (curses.KEY_ENTER, 10, 13, curses.KEY_RIGHT, ord('l')):
+                depth = len(self.stack) - 1
+                if rows and depth < len(self.order):
+                    node = rows[frame.selected][0]
+                    self.stack.append(_Frame(node, frame.path + (node.key,)))
+            elif key in (curses.KEY_LEFT, curses.KEY_BACKSPACE, 127, 8, ord('h')):
+                if len(self.stack) > 1:
+                    self.stack.pop()
+            elif key == ord('s'):
+                self.sort = (self.sort + 1) % len(SORT_KEYS)
+                frame.selected = 0
+            elif key == ord('r'):
+                self.reverse = not self.reverse
+                frame.selected = 0
+            elif key == ord('t'):
+                self.threshold = (self.threshold + 1) % len(self.index.thresholds)
+            elif key == ord('v'):
+                self.view = 'status' if self.view == 'endpoint' else 'endpoint'
+                self.stack = [_Frame(self.index.roots[self.view], ())]
+            elif key == ord('/'):
+                frame.text = self._prompt(screen, "Filtro (vacío = todos): ", frame.text)
+                frame.selected = 0
+
+    def _prompt(self, screen, label, value):
+        height, width = screen.getmaxyx()
+        curses.curs_set(1)
+        try:
+            while True:
+                screen.move(height - 1, 0)
+                screen.clrtoeol()
+                screen.addnstr(height - 1, 0, label + value, width - 1)
+                key = screen.get_wch()
+                if key in ('\n', '\r', curses.KEY_ENTER):
+                    return value
+                if key == '\x1b':
+                    return ''
+                if key in (curses.KEY_BACKSPACE, '\x7f', '\b'):
+                    value = value[:-1]
+                elif isinstance(key, str) and key.isprintable():
+                    value += key
+        finally:
+            curses.curs_set(0)
+
+    def _draw(self, screen, rows, note):
+        screen.erase()
+        height, width = screen.getmaxyx()
+        frame = self.stack[-1]
+        depth = len(self.stack) - 1
+        threshold = self.index.thresholds[self.threshold]
+
+        def put(y, text, attr=0):
+            if 0 <= y < height:
+                screen.addnstr(y, 0, text.ljust(width - 1), width - 1, attr)
+
+        path = ' > '.join(f"{DIMENSION_LABELS[d]} {v}" for d, v in zip(self.order, frame.path)) or 'todos'
+        put(0, f"EXPLORADOR  {path}{f'  (sin ejemplos aquí: se muestran {note})' if note else ''}", curses.A_BOLD)
+        sort_key, sort_label = SORT_KEYS[self.sort]
+        put(1, f"vista: {' > '.join(DIMENSION_LABELS[d] for d in self.order)} | orden: {sort_label} "
+               f"{'asc' if self.reverse else 'desc'} | filtro: '{frame.text}' | umbral: {threshold}s | "
+               f"{len(rows):,} filas | {self.elapsed * 1000:.1f} ms")
+
+        body = height - (7 if depth == len(self.order) else 4)
+        if frame.selected >= len(rows):
+            frame.selected = max(len(rows) - 1, 0)
+        if frame.selected < frame.top:
+            frame.top = frame.selected
+        elif frame.selected >= frame.top + body:
+            frame.top = frame.selected - body + 1
+
+        if depth < len(self.order):
+            total = frame.node.stats.count or 1
+            name_width = max(12, width - 80)
+            put(2, f"{DIMENSION_LABELS[self.order[depth]]:<{name_width}} {'REQS':>9} {'%':>6} {'PROM':>8} "
+                   f"{'P95':>8} {'P99':>8} {'MÁX':>8} {'%LENTO':>7} {'%499':>6} {'%5XX':>6}", curses.A_UNDERLINE)
+            for i, (node, m) in enumerate(rows[frame.top:frame.top + body]):
+                key = m['key'] if len(m['key']) <= name_width else m['key'][:name_width - 2] + '..'
+                put(3 + i, f"{key:<{name_width}} {m['requests']:>9,} {m['requests'] / total * 100:>5.1f}% "
+                           f"{m['avg']:>7.3f}s {m['p95']:>7.3f}s {m['p99']:>7.3f}s {m['max']:>7.3f}s "
+                           f"{m['slow']:>6.1f}% {m['499']:>5.1f}% {m['5xx']:>5.1f}%",
+                    curses.A_REVERSE if frame.top + i == frame.selected else 0)
+        else:
+            put(2, f"{'RT':>8} {'STATUS':>6} {'TIPO':<6} {'TIMESTAMP':<27} {'REALIP':<16} {'CF_RAY':<22}",
+                curses.A_UNDERLINE)
+            if not rows:
+                put(3, "No hay ejemplos guardados para este endpoint")
+            for i, row in enumerate(rows[frame.top:frame.top + body]):
+                put(3 + i, f"{row['RT']:>7.3f}s {row['Status']:>6} {row['Tipo']:<6} {row['Timestamp']:<27} "
+                           f"{row['RealIP']:<16} {row['CF_Ray']:<22}",
+                    curses.A_REVERSE if frame.top + i == frame.selected else 0)
+            if rows:
+                # Línea cruda del ejemplo elegido, en hasta 3 renglones
+                line = rows[frame.selected]['Linea']
+                for i in range(3):
+                    put(height - 4 + i, line[i * (width - 1):(i + 1) * (width - 1)])
+        put(height - 1, self.HELP, curses.A_DIM)
+        screen.refresh()
+
+
+def explore(analyzer):
+    """Abre el explorador sobre un analizador ya finalizado; False si no se puede abrir"""
+    if curses is None:
+        print("❌ Dependencia faltante: curses")
+        print("En Windows instala con: pip install windows-curses")
+        return False
+    if not (sys.stdin.isatty() and sys.stdout.isatty()):
+        print("⚠️  --explore necesita una terminal interactiva; se omite")
+        return False
+
+    print("🔭 Preparando índices del explorador...")
+    started = time.perf_counter()
+    index = ExplorerIndex(analyzer)
+    print(f"🔭 Índices listos en {time.perf_counter() - started:.2f}s")
+    curses.wrapper(Explorer(index).run)
+    return True
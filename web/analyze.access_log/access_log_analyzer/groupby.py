@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Agrupaciones declarativas (--group-by) calculadas en la misma pasada.
+
+Cada dimensión es una función que obtiene un valor de los campos ya
+parseados de la línea (o, si hace falta, de la línea cruda). Una agrupación
+es una lista de dimensiones ('host,status_class'); su clave compuesta se arma
+una vez por línea y actualiza una sola celda con cantidad, tiempos, códigos,
+bytes e histograma de latencia. Un corte nuevo cuesta una actualización de
+diccionario, no otra pasada.
+"""
+
+import ipaddress
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+from .histogram import LatencyHistogram
+from .useragent import UA_RE, classify_user_agent
+
+HOST_RE = re.compile(r'url="[a-zA-Z][\w+.-]*://([^/:?"]+)')
+REALIP_RE = re.compile(r'realip=(\S+)')
+
+# Claves distintas por agrupación; las nuevas a partir del límite van a OTHER_KEY
+MAX_GROUP_KEYS = 10000
+OTHER_KEY = '(otros)'
+
+
+def _prefix(fields, depth):
+    segments = [s for s in fields['path'].split('/') if s][:depth]
+    return '/' + '/'.join(segments)
+
+
+@lru_cache(maxsize=65536)
+def _subnet(ip, bits):
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return '-'
+    # Para IPv6 el prefijo se escala (/24 -> /48 por defecto)
+    if address.version == 6:
+        bits = min(bits * 2, 128)
+    return str(ipaddress.ip_network(f"{ip}/{bits}", strict=False))
+
+
+def _realip(line):
+    match = REALIP_RE.search(line)
+    if match and match.group(1) != '-':
+        return match.group(1)
+    return line.split(' ', 1)[0]
+
+
+def _host(line):
+    match = HOST_RE.search(line)
+    return match.group(1).lower() if match else '-'
+
+
+def _ua_class(line):
+    match = UA_RE.search(line)
+    return classify_user_agent(match.group(1) if match else '')[2]
+
+
+# nombre -> (descripción, función(campos, argumento), argumento por defecto)
+DIMENSIONS = {
+    'endpoint': ("Método + ruta sin query", lambda f, _: f['endpoint'], None),
+    'method': ("Método HTTP", lambda f, _: f['method'], None),
+    'path': ("Ruta sin query", lambda f, _: f['path'], None),
+    'prefix': ("Primeros N segmentos de la ruta (prefix:N, por defecto 1)", _prefix, 1),
+    'host': ("Host del campo url=\"scheme://host...\"", lambda f, _: _host(f['line']), None),
+    'status': ("Código HTTP", lambda f, _: f['status'], None),
+    'status_class': ("Clase del código (2xx, 4xx, 5xx...)", lambda f, _: f"{f['status'] // 100}xx", None),
+    'hour': ("Hora del día", lambda f, _: f['hour'], None),
+    'cloudflare': ("Cloudflare o directo", lambda f, _: 'Cloudflare' if f['is_cloudflare'] else 'Directo', None),
+    'realip': ("IP real del cliente", lambda f, _: _realip(f['line']), None),
+    'subnet': ("Subred de la IP real (subnet:N, por defecto /24; /2N en IPv6)",
+               lambda f, bits: _subnet(_realip(f['line']), bits), 24),
+    'ua_class': ("Clase de user agent (bot, humano...)", lambda f, _: _ua_class(f['line']), None),
+}
+
+
+def parse_group_by(value):
+    """'host,status_class' o 'prefix:2,subnet:16' -> ((nombre, argumento), ...)"""
+    dimensions = []
+    for item in str(value).split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, arg = item.partition(':')
+        name = name.strip().lower()
+        if name not in DIMENSIONS:
+            raise ValueError(f"Dimensión desconocida: '{name}' (disponibles: {', '.join(DIMENSIONS)})")
+        default = DIMENSIONS[name][2]
+        if arg:
+            if default is None:
+                raise ValueError(f"La dimensión '{name}' no acepta argumento")
+            try:
+                arg = int(arg)
+            except ValueError:
+                raise ValueError(f"Argumento inválido en '{item}'")
+            if arg <= 0:
+                raise ValueError(f"Argumento inválido en '{item}'")
+        else:
+            arg = default
+        dimensions.append((name, arg))
+    if not dimensions:
+        raise ValueError("Agrupación vacía")
+    return tuple(dimensions)
+
+
+def group_label(dimensions):
+    """Nombre legible de una agrupación: prefix2_x_status_class"""
+    return '_x_'.join(f"{name}{arg}" if arg is not None else name for name, arg in dimensions)
+
+
+class _GroupCell:
+    """Agregados de una clave: cantidad, tiempos, códigos, bytes e histograma"""
+
+    __slots__ = ('count', 'time', 'max', 'errors_499', 'errors_4xx', 'errors_5xx', 'bytes', 'hist')
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.max = 0.0
+        self.errors_499 = 0
+        self.errors_4xx = 0
+        self.errors_5xx = 0
+        self.bytes = 0
+        self.hist = LatencyHistogram()
+
+    def add(self, status, response_time, bucket, body_bytes):
+        self.count += 1
+        self.time += response_time
+        if response_time > self.max:
+            self.max = response_time
+        if status >= 500:
+            self.errors_5xx += 1
+        elif status >= 400:
+            self.errors_4xx += 1
+            if status == 499:
+                self.errors_499 += 1
+        if body_bytes:
+            self.bytes += body_bytes
+        hist = self.hist
+        hist.counts[bucket] += 1
+        hist.total += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.time += other.time
+        self.max = max(self.max, other.max)
+        self.errors_499 += other.errors_499
+        self.errors_4xx += other.errors_4xx
+        self.errors_5xx += other.errors_5xx
+        self.bytes += other.bytes
+        self.hist.merge(other.hist)
+
+
+class GroupByAggregator:
+    """Celdas por clave compuesta para cada agrupación pedida"""
+
+    def __init__(self, groups, max_keys=MAX_GROUP_KEYS):
+        self.groups = [tuple(group) for group in groups]
+        # None = sin límite (lotes del pipeline: el límite se aplica al unir en orden)
+        self.max_keys = max_keys
+        self.cells = [defaultdict(_GroupCell) for _ in self.groups]
+        self.overflow = [0] * len(self.groups)
+        self._prepare()
+
+    def _prepare(self):
+        # Cada dimensión distinta se calcula una sola vez por línea aunque se repita
+        dimensions = sorted({dim for group in self.groups for dim in group})
+        self._getters = [(DIMENSIONS[name][1], arg) for name, arg in dimensions]
+        self._positions = [tuple(dimensions.index(dim) for dim in group) for group in self.groups]
+
+    def __getstate__(self):
+        # Las funciones de las dimensiones no se serializan (pipeline); se reconstruyen
+        state = dict(self.__dict__)
+        del state['_getters']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._prepare()
+
+    def merge(self, other):
+        """Suma las celdas de otro agregador con las mismas agrupaciones"""
+        for i, cells in enumerate(other.cells):
+            mine = self.cells[i]
+            for key, cell in cells.items():
+                if key not in mine and self.max_keys is not None and len(mine) >= self.max_keys:
+                    self.overflow[i] += cell.count
+                    key = (OTHER_KEY,) * len(self.groups[i])
+                mine[key].merge(cell)
+            self.overflow[i] += other.overflow[i]
+
+    def add(self, fields, status, response_time, body_bytes):
+        values = [getter(fields, arg) for getter, arg in self._getters]
+        bucket = LatencyHistogram.bucket_upper(response_time)
+        for i, (cells, positions) in enumerate(zip(self.cells, self._positions)):
+            key = tuple([values[p] for p in positions])
+            cell = cells.get(key)
+            if cell is None:
+                if self.max_keys is not None and len(cells) >= self.max_keys:
+                    self.overflow[i] += 1
+                    key = (OTHER_KEY,) * len(positions)
+                cell = cells[key]
+            cell.add(status, response_time, bucket, body_bytes)
+
+    # RESULTADOS
+    def get_rows(self, index, thresholds):
+        """Filas de una agrupación ordenadas por cantidad de requests"""
+        group = self.groups[index]
+        cells = self.cells[index]
+        total = sum(cell.count for cell in cells.values())
+        threshold = thresholds[0]
+        rows = []
+        for key, cell in sorted(cells.items(), key=lambda x: (-x[1].count, str(x[0]))):
+            row = {group_label([dim]): value for dim, value in zip(group, key)}
+            slow = cell.hist.count_above(threshold)
+            row.update({
+                'Requests': cell.count,
+                'Porcentaje': (cell.count / total * 100) if total else 0,
+                'Tiempo_Promedio': cell.time / cell.count,
+                'P95': cell.hist.quantile(0.95),
+                'P99': cell.hist.quantile(0.99),
+                'Tiempo_Maximo': cell.max,
+                'Tiempo_Total_Segundos': round(cell.time, 3),
+                'Requests_Lentos': slow,
+                'Porcentaje_Lentos': slow / cell.count * 100,
+                'Errores_499': cell.errors_499,
+                'Porcentaje_499': cell.errors_499 / cell.count * 100,
+                'Errores_4xx': cell.errors_4xx,
+                'Errores_5xx': cell.errors_5xx,
+                'Porcentaje_5xx': cell.errors_5xx / cell.count * 100,
+                'Bytes': cell.bytes,
+                'Apdex': round(cell.hist.apdex(threshold), 3)
+            })
+            for extra in thresholds[1:]:
+                row[f'Lentos_>{extra}s'] = cell.hist.count_above(extra)
+            rows.append(row)
+        return rows
+
+    def get_export_sheets(self, thresholds):
+        """{nombre_de_hoja: filas} con una hoja por agrupación"""
+        return {f'grupo_{group_label(group)}': self.get_rows(i, thresholds)
+                for i, group in enumerate(self.groups)}
+
+    def print_report(self, thresholds, top=20):
+        """Top de claves por agrupación"""
+        print(f"\n{'='*120}")
+        print("🧩 AGRUPACIONES PERSONALIZADAS (--group-by)")
+        print(f"{'='*120}")
+
+        for i, group in enumerate(self.groups):
+            rows = self.get_rows(i, thresholds)
+            columns = [group_label([dim]) for dim in group]
+            print(f"\n📂 {' × '.join(columns)}: {len(rows):,} claves")
+            if self.overflow[i]:
+                print(f"⚠️  Más de {self.max_keys:,} claves: {self.overflow[i]:,} requests agrupados en "
+                      f"'{OTHER_KEY}'")
+            if not rows:
+                print("No hay datos para mostrar")
+                continue
+
+            width = max(12, min(50, max(len(' | '.join(str(row[c]) for c in columns)) for row in rows[:top])))
+            print(f"{'CLAVE':<{width}} {'REQUESTS':>10} {'%':>6} {'PROM':>8} {'P95':>8} {'%LENTO':>7} "
+                  f"{'%499':>6} {'%5XX':>6} {'APDEX':>6}")
+            print(f"{'-'*(width + 70)}")
+            for row in rows[:top]:
+                key = ' | '.join(str(row[c]) for c in columns)
+                if len(key) > width:
+                    key = key[:width - 3] + '...'
+                print(f"{key:<{width}} {row['Requests']:>10,} {row['Porcentaje']:>5.1f}% "
+                      f"{row['Tiempo_Promedio']:>7.3f}s {row['P95']:>7.3f}s {row['Porcentaje_Lentos']:>6.1f}% "
+                      f"{row['Porcentaje_499']:>5.1f}% {row['Porcentaje_5xx']:>5.1f}% {row['Apdex']:>6.2f}")
+            if len(rows) > top:
+                print(f"... y {len(rows) - top:,} claves más en la exportación (grupo_{group_label(group)})")
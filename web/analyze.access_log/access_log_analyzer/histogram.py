@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Histogramas de latencia con buckets fijos y percentiles
+"""
+
+import math
+import statistics
+from collections import defaultdict
+
+
+def percentile(values, pct):
+    """Percentil (1-99) de una lista de valores, tolerante a listas pequeñas"""
+    if not values:
+        return 0.0
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100)[pct - 1]
+
+
+class LatencyHistogram:
+    """Histograma de latencias con límites de bucket fijos.
+
+    Los buckets son intervalos (inferior, superior] en milisegundos:
+    1ms hasta 1s, 10ms hasta 10s, 100ms hasta 100s y 1s en adelante.
+    Como nginx registra `rt` con resolución de milisegundos, los conteos
+    por encima de cualquier umbral que caiga en un límite de bucket
+    (ej. 0.3, 1, 2.5, 3) son exactos y se pueden recalcular sin reparsear.
+    """
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.total = 0
+
+    @staticmethod
+    def bucket_upper(seconds):
+        """Límite superior (ms) del bucket al que pertenece una latencia"""
+        ms = int(round(seconds * 1000))
+        if ms <= 1000:
+            return ms
+        if ms <= 10000:
+            return -(-ms // 10) * 10
+        if ms <= 100000:
+            return -(-ms // 100) * 100
+        return -(-ms // 1000) * 1000
+
+    @staticmethod
+    def bucket_lower(upper):
+        """Límite inferior (ms, exclusivo) de un bucket"""
+        if upper <= 1000:
+            return upper - 1
+        if upper <= 10000:
+            return upper - 10
+        if upper <= 100000:
+            return upper - 100
+        return upper - 1000
+
+    def add(self, seconds):
+        self.counts[self.bucket_upper(seconds)] += 1
+        self.total += 1
+
+    def merge(self, other):
+        for upper, count in other.counts.items():
+            self.counts[upper] += count
+        self.total += other.total
+        return self
+
+    def count_above(self, threshold):
+        """Requests con latencia > threshold (segundos)"""
+        limit = threshold * 1000
+        # Un bucket cuenta si su límite superior supera el umbral; es exacto
+        # cuando el umbral coincide con un límite de bucket
+        return sum(count for upper, count in self.counts.items() if upper > limit + 1e-9)
+
+    def quantile(self, q):
+        """Cuantil aproximado (segundos): límite superior del bucket que lo contiene"""
+        if self.total == 0:
+            return 0.0
+        rank = max(1, math.ceil(q * self.total))
+        seen = 0
+        for upper in sorted(self.counts):
+            seen += self.counts[upper]
+            if seen >= rank:
+                return upper / 1000
+        return max(self.counts) / 1000
+
+    def apdex(self, threshold):
+        """Apdex(T): (satisfechos + tolerados / 2) / total, con tolerados <= 4T"""
+        return apdex_score(self.total, self.count_above(threshold), self.count_above(threshold * 4))
+
+
+def apdex_score(total, slow, frustrated):
+    """Apdex a partir de requests totales, lentos (> T) y frustrados (> 4T)"""
+    if total == 0:
+        return None
+    satisfied = total - slow
+    tolerating = slow - frustrated
+    return (satisfied + tolerating / 2) / total
+
+
+def quantile_from_counts(counts, n, i, sorted_values=None):
+    """Punto de corte i de n (como statistics.quantiles, método 'exclusive')
+    calculado sobre un conteo {valor: repeticiones} sin expandirlo."""
+    values = sorted_values if sorted_values is not None else sorted(counts)
+    size = sum(counts[v] for v in values)
+    if size == 0:
+        return 0.0
+    if size == 1:
+        return values[0]
+
+    def order_stat(k):
+        seen = 0
+        for value in values:
+            seen += counts[value]
+            if seen > k:
+                return value
+        return values[-1]
+
+    m = size + 1
+    j = i * m // n
+    j = 1 if j < 1 else size - 1 if j > size - 1 else j
+    delta = i * m - j * n
+    return (order_stat(j - 1) * (n - delta) + order_stat(j) * delta) / n
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Parseo en paralelo por etapas para entradas sin seek (gzip, stdin) o grandes.
+
+    lector (descomprime y corta en lotes alineados a fin de línea)
+      -> ventana acotada de lotes en vuelo (contrapresión)
+      -> procesos que parsean cada lote con un analizador propio
+      -> unión de los agregados parciales en el proceso principal, en orden
+
+La descompresión, el parseo y la unión se solapan en distintos núcleos y la
+memoria queda acotada por `workers * 2` lotes. Los motores que dependen del
+orden de las líneas (concurrencia, anomalías, reintentos) acumulan en cada
+lote agregados parciales (eventos por tick, minutos por endpoint, primer
+request de cada cliente) y el proceso principal los une en orden con el
+merge() de cada motor, sin volver a recorrer los requests.
+"""
+
+import gzip
+import io
+import multiprocessing
+import sys
+import threading
+
+from .bandwidth import BandwidthTracker
+
+# Tamaño de cada lote (bytes de texto descomprimido)
+BATCH_SIZE = 4 * 1024 * 1024
+# Motores que necesitan las líneas en orden: cada lote usa el acumulador de
+# engine.batch() y el proceso principal lo une con engine.merge()
+ORDERED_ENGINES = ('concurrency', 'anomalies', 'retries')
+
+
+def is_stream(path):
+    """True si la entrada no admite seek ni división por rangos (stdin o .gz)"""
+    return path == '-' or path.endswith('.gz')
+
+
+def open_input(path, binary=True):
+    """Abre un log plano, comprimido con gzip o stdin ('-')"""
+    if path == '-':
+        f = sys.stdin.buffer
+    elif path.endswith('.gz'):
+        f = gzip.open(path, 'rb')
+    else:
+        f = open(path, 'rb')
+    if binary:
+        return f
+    return io.TextIOWrapper(f, encoding='utf-8', errors='ignore')
+
+
+def read_batches(f, batch_size=BATCH_SIZE):
+    """Corta un flujo binario en lotes de ~batch_size que terminan en fin de línea"""
+    rest = b''
+    while True:
+        chunk = f.read(batch_size)
+        if not chunk:
+            break
+        chunk = rest + chunk
+        cut = chunk.rfind(b'\n') + 1
+        if cut == 0:
+            rest = chunk
+            continue
+        yield chunk[:cut]
+        rest = chunk[cut:]
+    if rest:
+        yield rest
+
+
+# Estado de cada proceso del pool (se inicializa una vez por proceso)
+_worker = {}
+
+
+def _init_worker(analyzer_class, options, error_log, quarantine):
+    _worker.update(analyzer_class=analyzer_class, options=options, error_log=error_log, quarantine=quarantine)
+
+
+def _parse_batch(batch):
+    """Parsea un lote con un analizador nuevo y devuelve su estado parcial"""
+    analyzer = _worker['analyzer_class'](**_worker['options'])
+    # Los segundos de egreso no se cierran en el lote: se suman al unir. El lote es
+    # acotado, así que ancho de banda, ejemplos y agrupaciones no limitan claves: el
+    # límite se aplica al unir en orden
+    if analyzer.bandwidth is not None:
+        analyzer.bandwidth = BandwidthTracker(horizon=None, max_endpoints=None)
+    analyzer.samples.max_endpoints = None
+    if analyzer.group_by is not None:
+        analyzer.group_by.max_keys = None
+    for name in ORDERED_ENGINES:
+        engine = getattr(analyzer, name)
+        if engine is not None:
+            setattr(analyzer, name, engine.batch())
+    if _worker['error_log'] is not None:
+        analyzer.error_log = _worker['error_log'].fork()
+        analyzer._error_log_loaded = True
+    if _worker['quarantine']:
+        analyzer.quality.rejected_lines = []
+
+    if analyzer.sampler is not None or _worker['quarantine']:
+        # El muestreo decide sobre los bytes crudos de cada línea y la cuarentena los escribe tal cual
+        lines = batch.split(b'\n')
+    else:
+        lines = batch.decode('utf-8', errors='ignore').split('\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    analyzer.feed(lines)
+    return analyzer.get_partial()
+
+
+def run_pipeline(analyzer, f, workers, batch_size=BATCH_SIZE, progress=False):
+    """Parsea el flujo binario `f` en paralelo y une los parciales en `analyzer`"""
+    in_flight = threading.Semaphore(workers * 2)
+    stop = threading.Event()
+
+    def batches():
+        # Corre en el hilo que reparte tareas del pool: solo lee cuando hay lugar en la ventana
+        for batch in read_batches(f, batch_size):
+            in_flight.acquire()
+            if stop.is_set():
+                return
+            yield batch
+
+    initargs = (type(analyzer), analyzer.get_worker_options(), analyzer.error_log,
+                bool(analyzer.quality.quarantine_file))
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs)
+    try:
+        reported = 0
+        for partial in pool.imap(_parse_batch, batches()):
+            analyzer.merge_partial(partial)
+            in_flight.release()
+            if progress and analyzer.total_lines - reported >= 10000:
+                reported = analyzer.total_lines
+                print(f"📖 Líneas procesadas: {analyzer.total_lines:,}...")
+        pool.close()
+    finally:
+        # Destrabar al lector si se interrumpió la unión
+        stop.set()
+        for _ in range(workers * 2):
+            in_flight.release()
+        pool.terminate()
+        pool.join()
+    return analyzer
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Calidad del parseo: líneas rechazadas por motivo, sin imprimir por línea.
+
+Cada línea que no se puede usar se cuenta por motivo y se guardan los
+primeros N ejemplos de cada uno. Opcionalmente las líneas malformadas se
+escriben tal cual (los bytes crudos, sin decodificar) en un archivo de
+cuarentena para revisarlas o reprocesarlas con otro formato. Las advertencias (líneas usadas pero incompletas, ej. sin
+rt) se cuentan aparte.
+"""
+
+from collections import Counter, defaultdict
+
+# Motivo -> descripción (el orden es el de reportes y exportación)
+REJECT_REASONS = {
+    'linea_vacia': 'Línea vacía',
+    'sin_request': 'Sin método/URL ("METHOD /ruta")',
+    'sin_status': 'Sin status=NNN',
+    'fuera_de_ventana': 'Fuera de la ventana de tiempo (--since/--until)',
+    'sin_timestamp_en_ventana': 'Sin timestamp con ventana de tiempo activa',
+}
+WARNING_REASONS = {
+    'sin_rt': 'Sin rt= (se usa 0)',
+    'sin_timestamp': 'Sin timestamp (hora "unknown")',
+}
+# Motivos que no indican una línea malformada: no van a cuarentena
+NOT_MALFORMED = ('linea_vacia', 'fuera_de_ventana')
+
+
+class ParseQuality:
+    """Contadores por motivo, ejemplos y cuarentena opcional de líneas rechazadas"""
+
+    def __init__(self, examples=5, quarantine_file=None):
+        self.examples = examples
+        self.rejected = Counter()
+        self.warnings = Counter()
+        self.samples = defaultdict(list)
+        self.quarantine_file = quarantine_file
+        self.quarantined = 0
+        self._quarantine = None
+        # En los lotes del pipeline las líneas a cuarentena se guardan aquí y las escribe quien une
+        self.rejected_lines = None
+
+    def reject(self, reason, line, raw=None):
+        """Cuenta una línea rechazada; `raw` son sus bytes originales (si se leyó en binario)"""
+        self.rejected[reason] += 1
+        if len(self.samples[reason]) < self.examples:
+            self.samples[reason].append(line.rstrip('\r\n'))
+        if reason not in NOT_MALFORMED and (self.rejected_lines is not None or self.quarantine_file):
+            if raw is None:
+                raw = line.encode('utf-8')
+            if self.rejected_lines is not None:
+                self.rejected_lines.append(raw)
+            else:
+                self._write(raw)
+
+    def _write(self, raw):
+        if self._quarantine is None:
+            self._quarantine = open(self.quarantine_file, 'wb')
+        self._quarantine.write(raw if raw.endswith(b'\n') else raw + b'\n')
+        self.quarantined += 1
+
+    def warn(self, reason):
+        self.warnings[reason] += 1
+
+    def merge(self, other):
+        """Suma los contadores de otro lote y escribe sus líneas de cuarentena"""
+        self.rejected.update(other.rejected)
+        self.warnings.update(other.warnings)
+        for reason, lines in other.samples.items():
+            room = self.examples - len(self.samples[reason])
+            if room > 0:
+                self.samples[reason].extend(lines[:room])
+        if self.quarantine_file:
+            for line in other.rejected_lines or ():
+                self._write(line)
+
+    def close(self):
+        if self._quarantine is not None:
+            self._quarantine.close()
+            self._quarantine = None
+
+    @property
+    def total_rejected(self):
+        return sum(self.rejected.values())
+
+    @staticmethod
+    def describe(reason):
+        if reason.startswith('excepcion_'):
+            return f"Error inesperado ({reason[len('excepcion_'):]})"
+        return REJECT_REASONS.get(reason) or WARNING_REASONS.get(reason, reason)
+
+    def _ordered(self, counter, known):
+        order = list(known)
+        return sorted(counter.items(), key=lambda x: (order.index(x[0]) if x[0] in order else len(order), -x[1]))
+
+    # RESULTADOS
+    def get_summary_rows(self, total_lines):
+        """Filas para procesamiento_completado (Metrica / Valor / Porcentaje)"""
+        def pct(value):
+            return f"{(value / total_lines * 100):.1f}%" if total_lines > 0 else "0%"
+
+        rows = [{'Metrica': 'Lineas rechazadas', 'Valor': self.total_rejected, 'Porcentaje': pct(self.total_rejected)}]
+        for reason, count in self._ordered(self.rejected, REJECT_REASONS):
+            rows.append({'Metrica': f"Rechazadas - {self.describe(reason)}", 'Valor': count, 'Porcentaje': pct(count)})
+        for reason, count in self._ordered(self.warnings, WARNING_REASONS):
+            rows.append({'Metrica': f"Advertencia - {self.describe(reason)}", 'Valor': count, 'Porcentaje': pct(count)})
+        if self.quarantine_file:
+            rows.append({'Metrica': f"Lineas en cuarentena ({self.quarantine_file})", 'Valor': self.quarantined,
+                         'Porcentaje': pct(self.quarantined)})
+        return rows
+
+    def get_example_rows(self):
+        """Primeros ejemplos por motivo de rechazo"""
+        rows = []
+        for reason, _ in self._ordered(self.rejected, REJECT_REASONS):
+            for i, line in enumerate(self.samples[reason], 1):
+                rows.append({'Motivo': reason, 'Descripcion': self.describe(reason), 'Ejemplo': i, 'Linea': line})
+        return rows
+
+    def print_summary(self, total_lines):
+        """Resumen para el bloque de procesamiento completado (nada si no hubo problemas)"""
+        if not self.rejected and not self.warnings:
+            return
+        if self.rejected:
+            print(f"⚠️  Líneas rechazadas: {self.total_rejected:,} "
+                  f"({(self.total_rejected / total_lines * 100) if total_lines else 0:.1f}%)")
+            for reason, count in self._ordered(self.rejected, REJECT_REASONS):
+                print(f"   • {self.describe(reason)}: {count:,}")
+                if self.samples[reason] and reason not in NOT_MALFORMED:
+                    example = self.samples[reason][0]
+                    print(f"     ej.: {example[:110]}{'...' if len(example) > 110 else ''}")
+        for reason, count in self._ordered(self.warnings, WARNING_REASONS):
+            print(f"⚠️  {self.describe(reason)}: {count:,}")
+        if self.quarantined:
+            print(f"🧪 Cuarentena: {self.quarantined:,} líneas malformadas en {self.quarantine_file}")
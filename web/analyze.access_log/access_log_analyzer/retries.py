@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+Tormentas de reintentos: requests reenviados tras un 499, 5xx o respuesta lenta.
+
+La clave es (realip, endpoint). Solo se guarda estado para las claves cuya
+última respuesta falló: si el mismo cliente vuelve a pedir el endpoint y el
+request empieza (timestamp - rt) dentro de la ventana después de que terminó
+el fallido, cuenta como reintento. Una respuesta buena borra la clave. Una
+clave vence cuando su fallo quedó más de la ventana antes del último fallo
+visto; las vencidas se expulsan en orden de llegada, así que la memoria
+depende de los clientes fallando a la vez y no del largo del log.
+
+En el pipeline cada lote corre su propio detector (RetryBatch) y guarda el
+primer request de cada clave; al unirlo en orden, el proceso principal decide
+con sus claves pendientes si ese request era un reintento y corrige las
+cadenas que siguen.
+"""
+
+import re
+from collections import OrderedDict, defaultdict
+
+REALIP_RE = re.compile(r'realip=(\S+)')
+
+# Reintentos seguidos de un mismo cliente a partir de los que se cuenta una tormenta
+STORM_CHAIN = 3
+
+
+def client_ip(line):
+    """realip= si está presente; si no, la IP de conexión (primer campo)"""
+    match = REALIP_RE.search(line)
+    if match and match.group(1) != '-':
+        return match.group(1)
+    return line.split(' ', 1)[0]
+
+
+class _RetryStats:
+    """Requests, fallidos y reintentos de un endpoint u hora"""
+
+    __slots__ = ('requests', 'failures', 'retries', 'by_trigger', 'storms', 'max_chain')
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.by_trigger = defaultdict(int)
+        self.storms = 0
+        self.max_chain = 0
+
+    @property
+    def amplification(self):
+        """Requests por intento original: requests / (requests - reintentos)"""
+        originals = self.requests - self.retries
+        return self.requests / originals if originals > 0 else float(self.requests)
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.failures += other.failures
+        self.retries += other.retries
+        for trigger, count in other.by_trigger.items():
+            self.by_trigger[trigger] += count
+        self.storms += other.storms
+        self.max_chain = max(self.max_chain, other.max_chain)
+
+    def count_retry(self, trigger, chain):
+        self.retries += 1
+        self.by_trigger[trigger] += 1
+        if chain == STORM_CHAIN:
+            self.storms += 1
+        if chain > self.max_chain:
+            self.max_chain = chain
+
+
+class _Head:
+    """Primer request de una clave en un lote y los reintentos que lo siguen sin cortar la cadena"""
+
+    __slots__ = ('start', 'hour', 'evict_at', 'run', 'open')
+
+    def __init__(self, start, hour, evict_at):
+        self.start = start
+        self.hour = hour
+        # Último fallo del lote antes de este request (None si no hubo)
+        self.evict_at = evict_at
+        # Hora de cada reintento que sigue (cadena 1, 2, ... dentro del lote)
+        self.run = []
+        self.open = True
+
+
+class RetryDetector:
+    """Reintentos por (realip, endpoint) con ventana deslizante y expulsión por TTL"""
+
+    def __init__(self, slow_threshold, window=10, max_keys=100000):
+        self.slow_threshold = slow_threshold
+        self.window = window
+        self.max_keys = max_keys
+        # (realip, endpoint) -> [fin del request fallido, causa, reintentos seguidos]
+        self.pending = OrderedDict()
+        self.by_endpoint = defaultdict(_RetryStats)
+        self.by_hour = defaultdict(_RetryStats)
+        self.evicted = 0
+        self.peak_keys = 0
+        # Fin del último request fallido: marca el vencimiento de las claves
+        self.now = None
+
+    def _expired(self, failed_end, now):
+        return now is not None and failed_end < now - self.window - 1
+
+    def add(self, epoch, client, endpoint, hour, status, response_time):
+        key = (client, endpoint)
+        endpoint_stats = self.by_endpoint[endpoint]
+        hour_stats = self.by_hour[hour]
+        endpoint_stats.requests += 1
+        hour_stats.requests += 1
+
+        chain = 0
+        previous = self.pending.pop(key, None)
+        if previous is not None and not self._expired(previous[0], self.now):
+            failed_end, trigger, chain = previous
+            # El timestamp es el fin del request; se tolera 1s por la resolución del log
+            gap = epoch - response_time - failed_end
+            if -1 <= gap <= self.window:
+                chain += 1
+                endpoint_stats.count_retry(trigger, chain)
+                hour_stats.count_retry(trigger, chain)
+            else:
+                chain = 0
+
+        if status == 499:
+            trigger = '499'
+        elif 500 <= status <= 599:
+            trigger = '5xx'
+        elif response_time > self.slow_threshold:
+            trigger = 'lento'
+        else:
+            trigger = None
+
+        if trigger is not None:
+            endpoint_stats.failures += 1
+            hour_stats.failures += 1
+            self.pending[key] = [epoch, trigger, chain]
+            if self.now is None or epoch > self.now:
+                self.now = epoch
+            self._evict()
+        return chain
+
+    def batch(self):
+        """Detector para un lote del pipeline (ver merge)"""
+        return RetryBatch(self.slow_threshold, window=self.window, max_keys=self.max_keys)
+
+    def merge(self, batch):
+        """Une un lote posterior (RetryBatch).
+
+        El primer request de cada clave del lote no vio las claves pendientes
+        de los lotes anteriores: si era un reintento se cuenta aquí con la
+        cadena que traía la clave y se desplazan las cadenas que le siguen.
+        El máximo de claves en ventana es una cota inferior con varios lotes.
+        """
+        for endpoint, stats in batch.by_endpoint.items():
+            self.by_endpoint[endpoint].merge(stats)
+        for hour, stats in batch.by_hour.items():
+            self.by_hour[hour].merge(stats)
+
+        for key, head in batch.heads.items():
+            previous = self.pending.pop(key, None)
+            if previous is None:
+                continue
+            failed_end, trigger, chain = previous
+            now = self.now if head.evict_at is None else max(head.evict_at, self.now or head.evict_at)
+            if self._expired(failed_end, now) or not -1 <= head.start - failed_end <= self.window:
+                continue
+            offset = chain + 1
+            endpoint_stats = self.by_endpoint[key[1]]
+            endpoint_stats.count_retry(trigger, offset)
+            self.by_hour[head.hour].count_retry(trigger, offset)
+            for position, hour in enumerate(head.run, 1):
+                for stats in (endpoint_stats, self.by_hour[hour]):
+                    if position == STORM_CHAIN:
+                        stats.storms -= 1
+                    if offset + position == STORM_CHAIN:
+                        stats.storms += 1
+                    stats.max_chain = max(stats.max_chain, offset + position)
+            if head.open and key in batch.pending:
+                batch.pending[key][2] += offset
+
+        if batch.now is not None and (self.now is None or batch.now > self.now):
+            self.now = batch.now
+        self._evict()
+        self.peak_keys = max(self.peak_keys, batch.peak_keys + len(self.pending))
+        self.pending.update(batch.pending)
+        self.evicted += batch.evicted
+        self._evict()
+
+    def _evict(self):
+        """Expulsa las claves vencidas del frente (o las más viejas si hay demasiadas)"""
+        pending = self.pending
+        if len(pending) > self.peak_keys:
+            self.peak_keys = len(pending)
+        while pending:
+            key, (failed_end, _, _) = next(iter(pending.items()))
+            expired = self._expired(failed_end, self.now)
+            if not expired and len(pending) <= self.max_keys:
+                break
+            pending.popitem(last=False)
+            if not expired:
+                self.evicted += 1
+
+    # RESULTADOS
+    def _row(self, stats):
+        return {
+            'Requests': stats.requests,
+            'Fallidos': stats.failures,
+            'Reintentos': stats.retries,
+            'Porcentaje_Reintentos': (stats.retries / stats.requests * 100) if stats.requests else 0,
+            'Reintentos_Tras_499': stats.by_trigger.get('499', 0),
+            'Reintentos_Tras_5xx': stats.by_trigger.get('5xx', 0),
+            'Reintentos_Tras_Lento': stats.by_trigger.get('lento', 0),
+            'Reintento_Por_Fallido': (stats.retries / stats.failures) if stats.failures else 0,
+            'Amplificacion': round(stats.amplification, 3),
+            'Tormentas': stats.storms,
+            'Cadena_Maxima': stats.max_chain
+        }
+
+    def get_endpoint_rows(self):
+        rows = []
+        for endpoint, stats in sorted(self.by_endpoint.items(), key=lambda x: (-x[1].retries, x[0])):
+            row = {'Endpoint': endpoint}
+            row.update(self._row(stats))
+            rows.append(row)
+        return rows
+
+    def get_hourly_rows(self):
+        rows = []
+        for hour in sorted(self.by_hour):
+            row = {'Hora': hour}
+            row.update(self._row(self.by_hour[hour]))
+            rows.append(row)
+        return rows
+
+    def print_report(self, threshold=None, top=15):
+        """Amplificación por reintentos por endpoint y por hora (`threshold`: umbral final del reporte)"""
+        print(f"\n{'='*120}")
+        print("🔁 TORMENTAS DE REINTENTOS (mismo realip + endpoint tras 499 / 5xx / lento)")
+        print(f"{'='*120}")
+        print(f"📐 Reintento: el request empieza ≤ {self.window}s después de que terminó uno fallido del mismo "
+              f"cliente; lento = > {self.slow_threshold}s; tormenta = {STORM_CHAIN}+ reintentos seguidos")
+        if threshold is not None and threshold != self.slow_threshold:
+            print(f"⚠️  Los fallos por lento usan > {self.slow_threshold}s (corte en streaming), no el umbral del "
+                  f"reporte ({threshold}s): el umbral automático se conoce al final; usa -t para alinearlos")
+
+        total = _RetryStats()
+        for stats in self.by_endpoint.values():
+            total.requests += stats.requests
+            total.failures += stats.failures
+            total.retries += stats.retries
+            total.storms += stats.storms
+        if not total.requests:
+            print("No hay datos para mostrar")
+            return
+
+        print(f"🔁 Reintentos: {total.retries:,} de {total.requests:,} requests "
+              f"({total.retries / total.requests * 100:.1f}%), amplificación x{total.amplification:.3f}, "
+              f"tormentas: {total.storms:,}")
+        print(f"🧠 Claves en ventana: máximo {self.peak_keys:,} (límite {self.max_keys:,}"
+              f"{f', {self.evicted:,} expulsadas antes de tiempo' if self.evicted else ''})")
+        if not total.retries:
+            print("✅ No se detectaron reintentos")
+            return
+
+        print(f"\n{'ENDPOINT':<40} {'REQS':>9} {'FALLIDOS':>9} {'REINT':>8} {'%REINT':>7} {'499':>7} {'5XX':>7} "
+              f"{'LENTO':>7} {'AMPLIF':>7} {'TORM':>5} {'CADENA':>6}")
+        print(f"{'-'*120}")
+        for row in self.get_endpoint_rows()[:top]:
+            if not row['Reintentos']:
+                break
+            display_ep = row['Endpoint'][:38] + ".." if len(row['Endpoint']) > 40 else row['Endpoint']
+            print(f"{display_ep:<40} {row['Requests']:>9,} {row['Fallidos']:>9,} {row['Reintentos']:>8,} "
+                  f"{row['Porcentaje_Reintentos']:>6.1f}% {row['Reintentos_Tras_499']:>7,} "
+                  f"{row['Reintentos_Tras_5xx']:>7,} {row['Reintentos_Tras_Lento']:>7,} "
+                  f"{'x' + format(row['Amplificacion'], '.3f'):>7} {row['Tormentas']:>5,} {row['Cadena_Maxima']:>6}")
+
+        hourly = self.get_hourly_rows()
+        worst = max(hourly, key=lambda r: r['Amplificacion'])
+        print(f"\n🕐 AMPLIFICACIÓN POR HORA (peor: {worst['Hora']} x{worst['Amplificacion']:.3f})")
+        print(f"{'HORA':<8} {'REQS':>9} {'FALLIDOS':>9} {'REINT':>8} {'%REINT':>7} {'AMPLIF':>7} {'TORM':>5}")
+        print(f"{'-'*60}")
+        for row in hourly:
+            print(f"{row['Hora']:<8} {row['Requests']:>9,} {row['Fallidos']:>9,} {row['Reintentos']:>8,} "
+                  f"{row['Porcentaje_Reintentos']:>6.1f}% {'x' + format(row['Amplificacion'], '.3f'):>7} "
+                  f"{row['Tormentas']:>5,}")
+
+
+class RetryBatch(RetryDetector):
+    """Detector de un lote del pipeline: además guarda el primer request de cada clave"""
+
+    def __init__(self, slow_threshold, window=10, max_keys=100000):
+        super().__init__(slow_threshold, window=window, max_keys=max_keys)
+        self.heads = {}
+
+    def add(self, epoch, client, endpoint, hour, status, response_time):
+        key = (client, endpoint)
+        head = self.heads.get(key)
+        if head is None:
+            head = self.heads[key] = _Head(epoch - response_time, hour, self.now)
+            super().add(epoch, client, endpoint, hour, status, response_time)
+        else:
+            chain = super().add(epoch, client, endpoint, hour, status, response_time)
+            if head.open and chain:
+                head.run.append(hour)
+            elif head.open:
+                head.open = False
+        # La cadena del primer request sigue abierta mientras la clave quede pendiente
+        if head.open and key not in self.pending:
+            head.open = False
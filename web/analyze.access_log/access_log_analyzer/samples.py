@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Ejemplos de requests lentos y con error para drill-down.
+
+Por endpoint se conserva una muestra de tamaño fijo (reservoir sampling,
+algoritmo R) de las líneas crudas de requests lentos, 499 y 5xx; además un
+heap con los N requests más lentos de todo el log. La memoria no depende del
+tamaño del log: se muestrean a lo sumo `max_endpoints` endpoints (los primeros
+con un request lento, 499 o 5xx); el top global los incluye a todos. Los campos
+(realip, cf_ray, urt) solo se extraen de las líneas que quedan en la muestra,
+al generar el reporte.
+"""
+
+import bisect
+import heapq
+import random
+import re
+from collections import defaultdict
+
+REALIP_RE = re.compile(r'realip=(\S+)')
+URT_RE = re.compile(r'urt=([^ ]+(?:, [^ ]+)*)')
+CF_RAY_RE = re.compile(r'cf_ray="([^"]*)"')
+TIMESTAMP_RE = re.compile(r'(\d+/\w+/\d+:\d+:\d+:\d+ -\d+)')
+
+# Orden de las categorías en reportes y exportación
+CATEGORIES = ('lento', '499', '5xx')
+
+
+def describe_line(line):
+    """Campos de drill-down de una línea cruda"""
+    fields = {}
+    for name, regex in (('timestamp', TIMESTAMP_RE), ('realip', REALIP_RE),
+                        ('urt', URT_RE), ('cf_ray', CF_RAY_RE)):
+        match = regex.search(line)
+        fields[name] = match.group(1) if match else '-'
+    return fields
+
+
+class _Reservoir:
+    """Muestra uniforme de tamaño fijo sobre un flujo (algoritmo R)"""
+
+    __slots__ = ('items', 'seen')
+
+    def __init__(self):
+        self.items = []
+        self.seen = 0
+
+    def add(self, item, size, rng):
+        self.seen += 1
+        if len(self.items) < size:
+            self.items.append(item)
+        else:
+            j = rng.randrange(self.seen)
+            if j < size:
+                self.items[j] = item
+
+    def merge(self, other, size, rng):
+        """Une dos muestras uniformes tomando de cada una en proporción a lo que vio"""
+        if not other.seen:
+            return
+        mine, theirs = list(self.items), list(other.items)
+        rng.shuffle(mine)
+        rng.shuffle(theirs)
+        left_mine, left_theirs = self.seen, other.seen
+        merged = []
+        while len(merged) < size and (mine or theirs):
+            if theirs and (not mine or rng.random() * (left_mine + left_theirs) >= left_mine):
+                merged.append(theirs.pop())
+                left_theirs -= 1
+            else:
+                merged.append(mine.pop())
+                left_mine -= 1
+        self.items = merged
+        self.seen += other.seen
+
+
+class SlowRequestSampler:
+    """Reservoir por (endpoint, categoría) y top-N global de requests más lentos.
+
+    `slow_bands` son los límites (segundos) de las bandas de latencia de los
+    candidatos a "lento"; el primero es el mínimo. Cuando el umbral se calcula
+    al final, cada banda tiene su propio reservoir y al reportar se combinan
+    en proporción a los candidatos vistos por encima del umbral definitivo,
+    lo que da una muestra aproximadamente uniforme de los lentos.
+    """
+
+    def __init__(self, size=20, top=50, slow_bands=(0.5,), seed=0, max_endpoints=1000):
+        self.size = size
+        self.top = top
+        self.slow_bands = sorted(slow_bands)
+        # Endpoints con reservoirs (None = sin límite) y candidatos que quedaron fuera
+        self.max_endpoints = max_endpoints
+        self.endpoints = set()
+        self.ignored_requests = 0
+        self.reservoirs = defaultdict(_Reservoir)
+        # (endpoint, banda) -> reservoir de candidatos a lento
+        self.slow_reservoirs = defaultdict(_Reservoir)
+        self.slowest = []
+        self._seq = 0
+        # Semilla fija: la misma entrada produce los mismos ejemplos
+        self._rng = random.Random(seed)
+
+    def add(self, endpoint, status, response_time, line):
+        if self.top:
+            self._offer_slowest(endpoint, status, response_time, line)
+        if not (response_time > self.slow_bands[0] or status == 499 or 500 <= status <= 599):
+            return
+        if not self._tracks(endpoint):
+            self.ignored_requests += 1
+            return
+
+        if response_time > self.slow_bands[0]:
+            band = bisect.bisect_left(self.slow_bands, response_time) - 1
+            self.slow_reservoirs[(endpoint, band)].add(
+                (response_time, status, line.rstrip('\n')), self.size, self._rng)
+        if status == 499:
+            self._offer(endpoint, '499', status, response_time, line)
+        elif 500 <= status <= 599:
+            self._offer(endpoint, '5xx', status, response_time, line)
+
+    def _tracks(self, endpoint):
+        if endpoint in self.endpoints:
+            return True
+        if self.max_endpoints is not None and len(self.endpoints) >= self.max_endpoints:
+            return False
+        self.endpoints.add(endpoint)
+        return True
+
+    def _offer_slowest(self, endpoint, status, response_time, line):
+        if len(self.slowest) < self.top:
+            self._seq += 1
+            heapq.heappush(self.slowest, (response_time, -self._seq, endpoint, status, line.rstrip('\n')))
+        elif response_time > self.slowest[0][0]:
+            self._seq += 1
+            heapq.heapreplace(self.slowest, (response_time, -self._seq, endpoint, status, line.rstrip('\n')))
+
+    def _offer(self, endpoint, category, status, response_time, line):
+        reservoir = self.reservoirs[(endpoint, category)]
+        reservoir.add((response_time, status, line.rstrip('\n')), self.size, self._rng)
+
+    def merge(self, other):
+        """Une las muestras de otro sampler (lote posterior del mismo log)"""
+        self.ignored_requests += other.ignored_requests
+        for mine, theirs in ((self.reservoirs, other.reservoirs), (self.slow_reservoirs, other.slow_reservoirs)):
+            for key, reservoir in theirs.items():
+                if self._tracks(key[0]):
+                    mine[key].merge(reservoir, self.size, self._rng)
+                else:
+                    self.ignored_requests += reservoir.seen
+        if self.top:
+            # En su orden original, para que los empates los gane el request anterior
+            for response_time, _, endpoint, status, line in sorted(other.slowest, key=lambda x: -x[1]):
+                self._offer_slowest(endpoint, status, response_time, line)
+
+    # RESULTADOS
+    def get_slow_sample(self, endpoint, threshold):
+        """(muestra de lentos > threshold, candidatos estimados) de un endpoint"""
+        strata = []
+        for band in range(len(self.slow_bands)):
+            reservoir = self.slow_reservoirs.get((endpoint, band))
+            if reservoir is None or not reservoir.items:
+                continue
+            eligible = [item for item in reservoir.items if item[0] > threshold]
+            if eligible:
+                # Candidatos de la banda por encima del umbral (estimado con la muestra)
+                weight = reservoir.seen * len(eligible) / len(reservoir.items)
+                strata.append((weight, eligible))
+        if not strata:
+            return [], 0
+
+        total_weight = sum(weight for weight, _ in strata)
+        quotas = [min(len(eligible), int(round(self.size * weight / total_weight)))
+                  for weight, eligible in strata]
+        # Completar hasta `size` con las bandas que tengan ejemplos de sobra
+        for i in sorted(range(len(strata)), key=lambda i: -strata[i][0]):
+            spare = min(len(strata[i][1]) - quotas[i], self.size - sum(quotas))
+            if spare > 0:
+                quotas[i] += spare
+        sample = [item for (_, eligible), quota in zip(strata, quotas) for item in eligible[:quota]]
+        return sample, int(round(total_weight))
+
+    def get_rows(self, threshold):
+        """Filas de ejemplos: top global primero y luego por endpoint y categoría"""
+        rows = []
+        for rank, (response_time, _, endpoint, status, line) in enumerate(
+                sorted(self.slowest, key=lambda x: (-x[0], -x[1])), 1):
+            rows.append(self._row(f'top_{rank}', endpoint, status, response_time, line, None))
+
+        endpoints = {endpoint for endpoint, _ in self.reservoirs} | {endpoint for endpoint, _ in self.slow_reservoirs}
+        for endpoint in sorted(endpoints):
+            for category in CATEGORIES:
+                if category == 'lento':
+                    items, seen = self.get_slow_sample(endpoint, threshold)
+                else:
+                    reservoir = self.reservoirs.get((endpoint, category))
+                    if reservoir is None:
+                        continue
+                    items, seen = reservoir.items, reservoir.seen
+                for response_time, status, line in sorted(items, key=lambda x: -x[0]):
+                    rows.append(self._row(category, endpoint, status, response_time, line, seen))
+        return rows
+
+    @staticmethod
+    def _row(category, endpoint, status, response_time, line, seen):
+        fields = describe_line(line)
+        return {
+            'Tipo': category,
+            'Endpoint': endpoint,
+            'Timestamp': fields['timestamp'],
+            'Status': status,
+            'RT': response_time,
+            'URT': fields['urt'],
+            'RealIP': fields['realip'],
+            'CF_Ray': fields['cf_ray'],
+            # Candidatos vistos por el reservoir (para dimensionar la muestra)
+            'Candidatos': seen if seen is not None else '',
+            'Linea': line
+        }
+
+    def print_report(self, threshold, top=10):
+        """Los N requests más lentos con los datos para buscarlos en el log"""
+        print(f"\n{'='*120}")
+        print(f"🔎 EJEMPLOS: TOP {top} REQUESTS MÁS LENTOS")
+        print(f"{'='*120}")
+
+        if not self.slowest:
+            print("No hay datos para mostrar")
+            return
+
+        rows = self.get_rows(threshold)
+        print(f"{'RT':>8} {'STATUS':>6} {'TIMESTAMP':<27} {'REALIP':<16} {'CF_RAY':<22} {'ENDPOINT'}")
+        print(f"{'-'*120}")
+        for row in rows[:min(top, len(self.slowest))]:
+            print(f"{row['RT']:>7.3f}s {row['Status']:>6} {row['Timestamp']:<27} {row['RealIP']:<16} "
+                  f"{row['CF_Ray']:<22} {row['Endpoint']}")
+
+        counts = defaultdict(int)
+        for row in rows:
+            counts[row['Tipo']] += 1
+        summary = ", ".join(f"{counts[c]:,} {c}" for c in CATEGORIES if counts[c])
+        if summary:
+            print(f"\n💡 Muestras por endpoint en la exportación (ejemplos_lentos): {summary}")
+        if self.ignored_requests:
+            print(f"⚠️  Límite de {self.max_endpoints:,} endpoints con muestras: "
+                  f"{self.ignored_requests:,} candidatos sin muestrear")
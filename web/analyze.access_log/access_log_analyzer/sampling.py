@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Muestreo determinista de líneas (modo aproximado) e intervalos de confianza.
+
+Una línea se selecciona si crc32(bytes crudos) cae por debajo de RATE * 2^32.
+La decisión depende solo del contenido de la línea: dos corridas sobre la
+misma entrada eligen las mismas líneas y las muestras de varios nodos con la
+misma tasa se pueden unir. Solo las líneas seleccionadas se decodifican y
+parsean; el total de líneas es exacto, los conteos se estiman como fracción
+de ese total y porcentajes y percentiles se reportan con su margen de error
+(95% por defecto).
+"""
+
+import math
+import zlib
+
+from .histogram import quantile_from_counts
+
+Z_95 = 1.96
+
+
+def parse_rate(value):
+    """'0.01', '1%' -> 0.01"""
+    value = str(value).strip()
+    rate = float(value[:-1]) / 100 if value.endswith('%') else float(value)
+    if not 0 < rate <= 1:
+        raise ValueError(f"Tasa de muestreo fuera de rango (0, 1]: {value}")
+    return rate
+
+
+class LineSampler:
+    """Selección determinista por hash de los bytes de la línea"""
+
+    __slots__ = ('rate', 'cutoff')
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.cutoff = int(rate * 2 ** 32)
+
+    def selected(self, raw):
+        """True si la línea (bytes, sin fin de línea) entra en la muestra"""
+        return zlib.crc32(raw) < self.cutoff
+
+
+def proportion_interval(hits, sampled, rate, z=Z_95):
+    """(proporción, margen) con corrección por población finita (1 - rate)"""
+    if sampled == 0:
+        return 0.0, 0.0
+    p = hits / sampled
+    return p, z * math.sqrt(p * (1 - p) / sampled * (1 - rate))
+
+
+def scaled_interval(hits, sampled, total, rate, z=Z_95):
+    """(estimación, margen) de un conteo como fracción de un total exacto.
+
+    El total de líneas se cuenta al leer, así que solo la fracción
+    `hits / sampled` de la muestra es aleatoria: N̂ = total · p̂ y el margen es
+    el de p̂ escalado por el total.
+    """
+    p, margin = proportion_interval(hits, sampled, rate, z)
+    return total * p, total * margin
+
+
+def mean_interval(counts, rate, z=Z_95):
+    """(promedio, margen) sobre un conteo {valor: repeticiones}"""
+    n = sum(counts.values())
+    if n == 0:
+        return 0.0, 0.0
+    mean = sum(v * c for v, c in counts.items()) / n
+    if n < 2:
+        return mean, 0.0
+    variance = sum(c * (v - mean) ** 2 for v, c in counts.items()) / (n - 1)
+    return mean, z * math.sqrt(variance / n * (1 - rate))
+
+
+def quantile_interval(counts, q, z=Z_95):
+    """(cuantil, inferior, superior) sin supuestos de distribución.
+
+    El intervalo usa los estadísticos de orden en los rangos
+    n·q ± z·sqrt(n·q·(1-q)) de la muestra.
+    """
+    values = sorted(counts)
+    n = sum(counts[v] for v in values)
+    if n == 0:
+        return 0.0, 0.0, 0.0
+    estimate = quantile_from_counts(counts, 100, int(round(q * 100)), values)
+    spread = z * math.sqrt(n * q * (1 - q))
+    low_rank = max(0, int(math.floor(n * q - spread)) - 1)
+    high_rank = min(n - 1, int(math.ceil(n * q + spread)) - 1)
+
+    def order_stat(k):
+        seen = 0
+        for value in values:
+            seen += counts[value]
+            if seen > k:
+                return value
+        return values[-1]
+
+    return estimate, order_stat(low_rank), order_stat(max(high_rank, 0))
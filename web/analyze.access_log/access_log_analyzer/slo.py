@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+SLOs por endpoint: cumplimiento, presupuesto de error y burn rate multiventana.
+
+Los SLOs se definen en un archivo JSON::
+
+    {
+      "fast_burn": 14.4,
+      "slow_burn": 1,
+      "slos": [
+        {"name": "catalog-300ms", "endpoint": "GET /api/catalog*", "latency": 0.3, "objective": 99},
+        {"name": "api-disponible", "endpoint": ["* /api/*"], "objective": 99.9}
+      ]
+    }
+
+Un request que coincide con el patrón (fnmatch sobre "MÉTODO /ruta") es malo
+si es 499 o 5xx o, si el SLO tiene `latency`, si su rt la supera. Por línea
+solo se suman requests y malos por minuto; el cumplimiento, el presupuesto
+consumido y los burn rates de 5m/1h/6h/3d se calculan al reportar con sumas
+acumuladas sobre esa serie. Las alertas siguen el esquema multiventana: quema
+rápida si 1h y 5m superan `fast_burn`, lenta si 3d y 6h superan `slow_burn`.
+"""
+
+import json
+from collections import Counter
+from fnmatch import fnmatchcase
+
+from .concurrency import format_minute
+
+# (etiqueta, minutos)
+BURN_WINDOWS = (('5m', 5), ('1h', 60), ('6h', 360), ('3d', 4320))
+# alerta -> (ventana larga, ventana corta, clave del límite)
+BURN_ALERTS = {
+    'rapida': ('1h', '5m', 'fast_burn'),
+    'lenta': ('3d', '6h', 'slow_burn'),
+}
+ALERT_LABELS = {'rapida': 'quema rápida', 'lenta': 'quema lenta'}
+DEFAULT_FAST_BURN = 14.4
+DEFAULT_SLOW_BURN = 1.0
+
+
+class SLO:
+    """Un objetivo sobre los requests que coinciden con uno o más patrones de endpoint"""
+
+    def __init__(self, name, patterns, objective, latency=None):
+        self.name = name
+        self.patterns = tuple(patterns)
+        # Fracción de requests buenos (99.9 -> 0.999)
+        self.objective = objective / 100
+        self.latency = latency
+
+    def matches(self, endpoint):
+        return any(fnmatchcase(endpoint, pattern) for pattern in self.patterns)
+
+    @property
+    def kind(self):
+        return f"latencia ≤ {self.latency}s" if self.latency is not None else "disponibilidad"
+
+
+def _number(entry, key, name, low=0, high=None):
+    value = entry.get(key)
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= low or \
+            (high is not None and value >= high):
+        raise ValueError(f"SLO '{name}': '{key}' inválido ({value!r})")
+    return float(value)
+
+
+def parse_slo_config(config):
+    """dict del archivo -> {'slos': [SLO], 'fast_burn': x, 'slow_burn': y} (ValueError si es inválido)"""
+    if not isinstance(config, dict) or not isinstance(config.get('slos'), list) or not config['slos']:
+        raise ValueError("El archivo de SLOs debe tener una lista 'slos' no vacía")
+    slos = []
+    for i, entry in enumerate(config['slos'], 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"SLO #{i}: se esperaba un objeto")
+        name = str(entry.get('name') or f"slo_{i}")
+        patterns = entry.get('endpoint')
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        if not patterns or not all(isinstance(p, str) and p for p in patterns):
+            raise ValueError(f"SLO '{name}': 'endpoint' debe ser un patrón o una lista de patrones")
+        objective = _number(entry, 'objective', name, high=100)
+        latency = _number(entry, 'latency', name) if entry.get('latency') is not None else None
+        slos.append(SLO(name, patterns, objective, latency))
+    settings = {'slos': slos}
+    for key, default in (('fast_burn', DEFAULT_FAST_BURN), ('slow_burn', DEFAULT_SLOW_BURN)):
+        settings[key] = _number(config, key, key) if config.get(key) is not None else default
+    return settings
+
+
+def load_slo_config(path):
+    with open(path, encoding='utf-8') as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: JSON inválido ({e})")
+    return parse_slo_config(config)
+
+
+class SLOTracker:
+    """Requests y malos por minuto para cada SLO, más los malos por endpoint"""
+
+    def __init__(self, slos, fast_burn=DEFAULT_FAST_BURN, slow_burn=DEFAULT_SLOW_BURN):
+        self.slos = list(slos)
+        self.limits = {'fast_burn': fast_burn, 'slow_burn': slow_burn}
+        # Por SLO: minuto -> [requests, malos]
+        self.series = [{} for _ in self.slos]
+        self.bad_by_endpoint = [Counter() for _ in self.slos]
+        # endpoint -> índices de los SLOs que lo cubren (el fnmatch se evalúa una vez por endpoint)
+        self._matches = {}
+        self._results = None
+
+    def add(self, epoch, endpoint, status, response_time):
+        matches = self._matches.get(endpoint)
+        if matches is None:
+            matches = self._matches[endpoint] = tuple(
+                i for i, slo in enumerate(self.slos) if slo.matches(endpoint))
+        if not matches:
+            return
+        minute = epoch // 60
+        error = status == 499 or status >= 500
+        for i in matches:
+            latency = self.slos[i].latency
+            bad = error or (latency is not None and response_time > latency)
+            series = self.series[i]
+            cell = series.get(minute)
+            if cell is None:
+                cell = series[minute] = [0, 0]
+            cell[0] += 1
+            if bad:
+                cell[1] += 1
+                self.bad_by_endpoint[i][endpoint] += 1
+        self._results = None
+
+    def merge(self, other):
+        """Suma las series de otro tracker con los mismos SLOs (lote del pipeline)"""
+        for mine, theirs in zip(self.series, other.series):
+            for minute, (count, bad) in theirs.items():
+                cell = mine.get(minute)
+                if cell is None:
+                    mine[minute] = [count, bad]
+                else:
+                    cell[0] += count
+                    cell[1] += bad
+        for mine, theirs in zip(self.bad_by_endpoint, other.bad_by_endpoint):
+            mine.update(theirs)
+        self._results = None
+
+    # EVALUACIÓN
+    def _evaluate(self, index, first, last):
+        slo = self.slos[index]
+        series = self.series[index]
+        budget = 1 - slo.objective
+        # Sumas acumuladas densas por minuto desde el inicio del log
+        totals, bads = [0], [0]
+        for minute in range(first, last + 1):
+            count, bad = series.get(minute, (0, 0))
+            totals.append(totals[-1] + count)
+            bads.append(bads[-1] + bad)
+
+        def burn(end, minutes):
+            start = max(0, end - minutes)
+            count = totals[end] - totals[start]
+            return ((bads[end] - bads[start]) / count / budget) if count else 0.0
+
+        length = last - first + 1
+        firing = {alert: [] for alert in BURN_ALERTS}
+        peak = {label: 0.0 for label, _ in BURN_WINDOWS}
+        windows = dict(BURN_WINDOWS)
+        for i in range(1, length + 1):
+            rates = {label: burn(i, minutes) for label, minutes in BURN_WINDOWS}
+            for label, rate in rates.items():
+                if rate > peak[label]:
+                    peak[label] = rate
+            for alert, (long_window, short_window, limit) in BURN_ALERTS.items():
+                limit = self.limits[limit]
+                if rates[long_window] >= limit and rates[short_window] >= limit:
+                    episodes = firing[alert]
+                    minute = first + i - 1
+                    if episodes and episodes[-1]['end'] == minute - 1:
+                        episodes[-1]['end'] = minute
+                        episodes[-1]['peak'] = max(episodes[-1]['peak'], rates[long_window])
+                    else:
+                        episodes.append({'start': minute, 'end': minute, 'peak': rates[long_window]})
+
+        total, bad = totals[-1], bads[-1]
+        compliance = (1 - bad / total) if total else 1.0
+        active = {alert: bool(episodes) and episodes[-1]['end'] == last for alert, episodes in firing.items()}
+        if total and compliance < slo.objective:
+            status = 'INCUMPLE'
+        elif active['rapida']:
+            status = 'QUEMA RÁPIDA'
+        elif active['lenta']:
+            status = 'QUEMA LENTA'
+        else:
+            status = 'OK'
+        worst = self.bad_by_endpoint[index].most_common(1)
+        return {
+            'slo': slo,
+            'requests': total,
+            'bad': bad,
+            'compliance': compliance,
+            'budget_consumed': (bad / (budget * total)) if total else 0.0,
+            'burn': {label: burn(length, minutes) for label, minutes in windows.items()},
+            'peak': peak,
+            'episodes': firing,
+            'status': status,
+            'worst_endpoint': worst[0] if worst else None
+        }
+
+    def evaluate(self):
+        """Resultados por SLO; las ventanas de burn rate terminan en el último minuto del log"""
+        if self._results is not None:
+            return self._results
+        minutes = [minute for series in self.series for minute in series]
+        if not minutes:
+            self._results = []
+            return self._results
+        first, last = min(minutes), max(minutes)
+        self._results = [self._evaluate(i, first, last) for i in range(len(self.slos))]
+        return self._results
+
+    def violations(self):
+        """SLOs incumplidos o con una alerta de quema activa al final del log"""
+        return [result for result in self.evaluate() if result['status'] != 'OK']
+
+    # RESULTADOS
+    def get_rows(self):
+        rows = []
+        for result in self.evaluate():
+            slo = result['slo']
+            row = {
+                'SLO': slo.name,
+                'Endpoints': ', '.join(slo.patterns),
+                'Tipo': slo.kind,
+                'Objetivo': round(slo.objective * 100, 3),
+                'Requests': result['requests'],
+                'Malos': result['bad'],
+                'Cumplimiento': round(result['compliance'] * 100, 3),
+                'Presupuesto_Consumido': round(result['budget_consumed'] * 100, 1)
+            }
+            for label, _ in BURN_WINDOWS:
+                row[f'Burn_{label}'] = round(result['burn'][label], 2)
+            row['Pico_Burn_1h'] = round(result['peak']['1h'], 2)
+            for alert in BURN_ALERTS:
+                row[f'Minutos_Quema_{alert.capitalize()}'] = sum(
+                    e['end'] - e['start'] + 1 for e in result['episodes'][alert])
+            worst = result['worst_endpoint']
+            row['Endpoint_Mas_Malos'] = f"{worst[0]} ({worst[1]:,})" if worst else '-'
+            row['Estado'] = result['status']
+            rows.append(row)
+        return rows
+
+    def get_alert_rows(self):
+        """Episodios de quema rápida/lenta (minutos seguidos con la alerta activa)"""
+        rows = []
+        for result in self.evaluate():
+            for alert, (long_window, short_window, limit) in BURN_ALERTS.items():
+                for episode in result['episodes'][alert]:
+                    rows.append({
+                        'SLO': result['slo'].name,
+                        'Alerta': ALERT_LABELS[alert],
+                        'Ventanas': f"{long_window} y {short_window} ≥ {self.limits[limit]:g}",
+                        'Inicio': format_minute(episode['start']),
+                        'Fin': format_minute(episode['end']),
+                        'Minutos': episode['end'] - episode['start'] + 1,
+                        'Pico_Burn': round(episode['peak'], 2)
+                    })
+        return sorted(rows, key=lambda r: (r['Inicio'], r['SLO']))
+
+    def print_report(self):
+        """Tabla de SLOs con cumplimiento, presupuesto y burn rates al final del log"""
+        print(f"\n{'='*120}")
+        print("🎯 SLOs: CUMPLIMIENTO, PRESUPUESTO DE ERROR Y BURN RATE")
+        print(f"{'='*120}")
+        print(f"📐 Malo = 499, 5xx o rt > latencia del SLO; burn = tasa de malos / (1 - objetivo), ventanas al final "
+              f"del log; quema rápida: 1h y 5m ≥ {self.limits['fast_burn']:g}, lenta: 3d y 6h ≥ "
+              f"{self.limits['slow_burn']:g}")
+
+        rows = self.get_rows()
+        if not any(row['Requests'] for row in rows):
+            print("No hay requests que coincidan con los SLOs")
+            return
+
+        print(f"\n{'SLO':<24} {'TIPO':<18} {'OBJ':>7} {'REQS':>9} {'CUMPLE':>8} {'PRESUP':>7} "
+              + ' '.join(f"{'B' + label:>6}" for label, _ in BURN_WINDOWS) + f" {'ESTADO':<13}")
+        print(f"{'-'*120}")
+        for row in rows:
+            name = row['SLO'][:22] + ".." if len(row['SLO']) > 24 else row['SLO']
+            icon = '✅' if row['Estado'] == 'OK' else '⛔'
+            print(f"{name:<24} {row['Tipo'][:18]:<18} {row['Objetivo']:>6g}% {row['Requests']:>9,} "
+                  f"{row['Cumplimiento']:>7.3f}% {row['Presupuesto_Consumido']:>6.0f}% "
+                  + ' '.join(f"{row['Burn_' + label]:>6.2f}" for label, _ in BURN_WINDOWS)
+                  + f" {icon} {row['Estado']}")
+
+        for row in rows:
+            if row['Estado'] != 'OK' or row['Minutos_Quema_Rapida'] or row['Minutos_Quema_Lenta']:
+                print(f"   • {row['SLO']}: pico burn 1h x{row['Pico_Burn_1h']:.1f}, "
+                      f"{row['Minutos_Quema_Rapida']:,} min en quema rápida, "
+                      f"{row['Minutos_Quema_Lenta']:,} min en quema lenta; más malos: {row['Endpoint_Mas_Malos']}")
+
+        alerts = self.get_alert_rows()
+        if alerts:
+            print(f"\n🔥 EPISODIOS DE QUEMA ({len(alerts):,})")
+            for alert in alerts[:15]:
+                print(f"   {alert['Inicio']} → {alert['Fin'][-5:]} {alert['SLO']:<24} {alert['Alerta']:<12} "
+                      f"{alert['Minutos']:>5,} min, pico x{alert['Pico_Burn']:.1f}")
+            if len(alerts) > 15:
+                print(f"   ... y {len(alerts) - 15:,} episodios más en la exportación (slo_alertas)")
@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+"""
+Agregados exactos por endpoint, en memoria o con spill a disco.
+
+Por endpoint no se guardan los requests sino contadores exactos: repeticiones
+de cada valor de `rt` (resolución de ms), status, horas y celdas (status, hora)
+con cantidad, tiempo, máximo e histograma. De ahí salen sin aproximación el
+promedio, la desviación estándar, los percentiles y las distribuciones, y el
+tamaño de cada endpoint depende de sus valores distintos y no de sus requests:
+un endpoint que concentra todo el tráfico no crece con el largo del log.
+
+Con `max_memory` el almacén vigila el RSS del proceso durante todo el parseo;
+cada vez que lo supera (y creció desde el último volcado) escribe los
+agregados en memoria en archivos temporales particionados por hash del
+endpoint y los libera. Al generar los reportes se carga una partición a la vez
+y se suman los trozos de cada endpoint, de modo que los resultados son
+idénticos a los de una corrida en memoria. Las métricas por endpoint de los
+reportes tampoco se guardan todas en memoria: se escriben a un archivo
+temporal (DetailFile) y las tablas completas de la exportación se generan al
+recorrerlas (LazyRows).
+"""
+
+import atexit
+import json
+import math
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import zlib
+from array import array
+from collections import defaultdict
+from collections.abc import Mapping
+from fractions import Fraction
+
+from .histogram import LatencyHistogram
+
+# Fracción del presupuesto a partir de la cual se hace spill (deja margen
+# para los agregados globales y para la fase de reportes)
+SPILL_FRACTION = 0.75
+MIN_PARTITIONS = 16
+MAX_PARTITIONS = 1024
+# Cada cuántos requests agregados se revisa el RSS (leer /proc/self/statm es barato)
+CHECK_EVERY = 1000
+
+
+def parse_size(value):
+    """'512M', '2G', '1500000' -> bytes"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = str(value).strip().upper().rstrip('B')
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def current_rss():
+    """RSS actual del proceso en bytes (None si no se puede medir)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB, macOS bytes
+        return rss if sys.platform == 'darwin' else rss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def peak_rss():
+    """RSS máximo del proceso en bytes (VmHWM; None si no se puede medir)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+class _Cell:
+    """Cantidad, tiempo, máximo e histograma de los requests de un (status, hora).
+
+    El tiempo se suma en microsegundos enteros: la suma no depende del orden
+    en que se unen los trozos del spill o los lotes del pipeline.
+    """
+
+    __slots__ = ('count', 'time_us', 'max', 'hist')
+
+    def __init__(self):
+        self.count = 0
+        self.time_us = 0
+        self.max = 0.0
+        self.hist = LatencyHistogram()
+
+    @property
+    def time(self):
+        """Tiempo acumulado en segundos"""
+        return self.time_us / 1e6
+
+    def add(self, response_time):
+        self.count += 1
+        self.time_us += int(round(response_time * 1e6))
+        if response_time > self.max:
+            self.max = response_time
+        self.hist.add(response_time)
+
+    def merge(self, other):
+        self.count += other.count
+        self.time_us += other.time_us
+        self.max = max(self.max, other.max)
+        self.hist.merge(other.hist)
+
+
+class EndpointStats:
+    """Contadores exactos de un endpoint; se suman con merge() (spill o lotes del pipeline)"""
+
+    __slots__ = ('count', 'cloudflare', 'times', 'status', 'hours', 'cells')
+
+    def __init__(self):
+        self.count = 0
+        self.cloudflare = 0
+        # rt -> repeticiones (el rt de nginx tiene resolución de ms)
+        self.times = {}
+        self.status = {}
+        self.hours = {}
+        # (status, hora) -> _Cell, para el explorador
+        self.cells = {}
+
+    def add(self, status, response_time, hour, is_cloudflare):
+        self.count += 1
+        if is_cloudflare:
+            self.cloudflare += 1
+        times = self.times
+        times[response_time] = times.get(response_time, 0) + 1
+        self.status[status] = self.status.get(status, 0) + 1
+        self.hours[hour] = self.hours.get(hour, 0) + 1
+        cell = self.cells.get((status, hour))
+        if cell is None:
+            cell = self.cells[(status, hour)] = _Cell()
+        cell.add(response_time)
+
+    def merge(self, other):
+        self.count += other.count
+        self.cloudflare += other.cloudflare
+        for mine, theirs in ((self.times, other.times), (self.status, other.status), (self.hours, other.hours)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+        for key, cell in other.cells.items():
+            if key in self.cells:
+                self.cells[key].merge(cell)
+            else:
+                self.cells[key] = cell
+        return self
+
+    def moments(self):
+        """(promedio, desviación estándar muestral) exactos como statistics.mean / stdev"""
+        if not self.count:
+            return 0.0, 0.0
+        # Sumas exactas agrupadas por denominador (los float son fracciones binarias)
+        sx, sxx = defaultdict(int), defaultdict(int)
+        for value, count in self.times.items():
+            n, d = value.as_integer_ratio()
+            sx[d] += n * count
+            sxx[d * d] += n * n * count
+        total = sum(Fraction(n, d) for d, n in sx.items())
+        squares = sum(Fraction(n, d) for d, n in sxx.items())
+        mean = total / self.count
+        if self.count < 2:
+            return float(mean), 0.0
+        variance = (squares - total * mean) / (self.count - 1)
+        return float(mean), math.sqrt(variance)
+
+    # Serialización para el spill (una línea JSON por endpoint y volcado)
+    def dump(self, endpoint):
+        return json.dumps([
+            endpoint, self.count, self.cloudflare,
+            list(self.times.items()), list(self.status.items()), list(self.hours.items()),
+            [[status, hour, cell.count, cell.time_us, cell.max, list(cell.hist.counts.items())]
+             for (status, hour), cell in self.cells.items()]
+        ], ensure_ascii=False) + "\n"
+
+    @classmethod
+    def load(cls, line):
+        endpoint, count, cloudflare, times, status, hours, cells = json.loads(line)
+        stats = cls()
+        stats.count = count
+        stats.cloudflare = cloudflare
+        stats.times = dict(times)
+        stats.status = dict(status)
+        stats.hours = dict(hours)
+        for status_code, hour, cell_count, cell_time, cell_max, buckets in cells:
+            cell = stats.cells[(status_code, hour)] = _Cell()
+            cell.count = cell_count
+            cell.time_us = cell_time
+            cell.max = cell_max
+            for upper, bucket_count in buckets:
+                cell.hist.counts[upper] = bucket_count
+            cell.hist.total = cell_count
+        return endpoint, stats
+
+
+class RequestStore:
+    """Agregados por endpoint (interfaz tipo dict de EndpointStats)"""
+
+    def __init__(self, max_memory=None, tmp_dir=None):
+        self.max_memory = max_memory
+        self.tmp_dir = tmp_dir
+        self.buffer = {}
+        # Orden de aparición de cada endpoint (también da los endpoints únicos)
+        self.order = {}
+        # Requests agregados en total y desde el último volcado
+        self.records = 0
+        self.buffered = 0
+        self.spilled = 0
+        self.spills = 0
+        self.partitions = None
+        self.spill_dir = None
+        self.details = None
+        self.peak_rss = 0
+        # Estimación del total de requests (para dimensionar las particiones)
+        self.expected_records = None
+        self._rss_after_spill = 0
+        self._since_check = 0
+
+    def _stats(self, endpoint):
+        stats = self.buffer.get(endpoint)
+        if stats is None:
+            stats = self.buffer[endpoint] = EndpointStats()
+            if endpoint not in self.order:
+                self.order[endpoint] = len(self.order)
+        return stats
+
+    def add(self, endpoint, status, response_time, hour, is_cloudflare):
+        self._stats(endpoint).add(status, response_time, hour, is_cloudflare)
+        self.records += 1
+        self.buffered += 1
+
+        if self.max_memory:
+            self._since_check += 1
+            if self._since_check >= CHECK_EVERY:
+                self._since_check = 0
+                self.check_memory()
+
+    def merge(self, other):
+        """Suma los agregados en memoria de otro almacén (lote posterior del mismo log)"""
+        for endpoint, stats in other.buffer.items():
+            self._stats(endpoint).merge(stats)
+        self.records += other.records
+        self.buffered += other.records
+        if self.max_memory:
+            self.check_memory()
+        return self
+
+    def check_memory(self):
+        """Hace spill si el RSS supera el presupuesto y creció desde el último volcado"""
+        rss = current_rss()
+        if rss is None:
+            return
+        self.peak_rss = max(self.peak_rss, rss)
+        # La memoria liberada en un volcado no siempre vuelve al sistema: mientras el
+        # RSS no pase del nivel posterior al último volcado, se está reutilizando
+        if rss >= self.max_memory * SPILL_FRACTION and rss > self._rss_after_spill and self.buffer:
+            self.spill()
+            self._rss_after_spill = current_rss() or 0
+
+    def spill(self):
+        """Escribe los agregados en memoria a las particiones en disco"""
+        if not self.buffer:
+            return
+        if self.partitions is None:
+            self._open_spill_dir()
+
+        handles = {}
+        try:
+            for endpoint, stats in self.buffer.items():
+                partition = self._partition(endpoint)
+                if partition not in handles:
+                    handles[partition] = open(self._path(partition), 'a', encoding='utf-8')
+                handles[partition].write(stats.dump(endpoint))
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        self.spilled += self.buffered
+        self.spills += 1
+        self.buffer = {}
+        self.buffered = 0
+
+    def _open_spill_dir(self):
+        # Cada partición debe caber holgadamente en memoria al releerla: lo
+        # acumulado hasta ahora se reparte en MIN_PARTITIONS y se escala por el
+        # crecimiento esperado del log
+        growth = max((self.expected_records or 0) / max(self.records, 1), 1)
+        self.partitions = min(max(math.ceil(MIN_PARTITIONS * growth), MIN_PARTITIONS), MAX_PARTITIONS)
+        self._make_dir()
+
+    def _make_dir(self):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='access_log_spill_', dir=self.tmp_dir)
+            atexit.register(self.close)
+
+    def _partition(self, endpoint):
+        return zlib.crc32(endpoint.encode('utf-8')) % self.partitions
+
+    def _path(self, partition):
+        return os.path.join(self.spill_dir, f"part_{partition:04d}.jsonl")
+
+    def items(self):
+        """(endpoint, EndpointStats) de cada endpoint, una partición a la vez si hubo spill"""
+        if self.partitions is None:
+            yield from self.buffer.items()
+            return
+
+        pending = defaultdict(list)
+        for endpoint in self.buffer:
+            pending[self._partition(endpoint)].append(endpoint)
+
+        for partition in range(self.partitions):
+            groups = {}
+            path = self._path(partition)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        endpoint, stats = EndpointStats.load(line)
+                        if endpoint in groups:
+                            groups[endpoint].merge(stats)
+                        else:
+                            groups[endpoint] = stats
+            # Lo que quedó en memoria es posterior a lo escrito en disco
+            for endpoint in pending.get(partition, []):
+                if endpoint in groups:
+                    groups[endpoint].merge(self.buffer[endpoint])
+                else:
+                    groups[endpoint] = self.buffer[endpoint]
+            if self.max_memory:
+                self.peak_rss = max(self.peak_rss, current_rss() or 0)
+            yield from groups.items()
+
+    def values(self):
+        for _, stats in self.items():
+            yield stats
+
+    def keys(self):
+        return self.order.keys()
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, endpoint):
+        return endpoint in self.order
+
+    def detail_file(self):
+        """DetailFile nuevo en el directorio temporal (reemplaza al anterior)"""
+        if self.details is not None:
+            self.details.close()
+        self._make_dir()
+        self.details = DetailFile(os.path.join(self.spill_dir, 'details.pickle'), self.order)
+        return self.details
+
+    def close(self):
+        """Elimina los archivos temporales del spill"""
+        if self.details is not None:
+            self.details.close()
+            self.details = None
+        if self.spill_dir and os.path.isdir(self.spill_dir):
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        self.spill_dir = None
+
+
+class DetailFile(Mapping):
+    """Métricas por endpoint en un archivo temporal, con interfaz de dict de solo lectura.
+
+    Se asigna una vez por endpoint (`details[endpoint] = valor`) y se recorre en
+    orden de aparición leyendo un valor a la vez: en memoria solo queda un
+    offset por endpoint.
+    """
+
+    def __init__(self, path, order):
+        self.path = path
+        self.order = order
+        self.offsets = array('q', [-1]) * len(order)
+        self._size = 0
+        self._file = open(path, 'w+b')
+
+    def __setitem__(self, endpoint, value):
+        position = self.order[endpoint]
+        if self.offsets[position] < 0:
+            self._size += 1
+        self._file.seek(0, os.SEEK_END)
+        self.offsets[position] = self._file.tell()
+        pickle.dump(value, self._file, pickle.HIGHEST_PROTOCOL)
+
+    def __getitem__(self, endpoint):
+        position = self.order.get(endpoint)
+        if position is None or position >= len(self.offsets) or self.offsets[position] < 0:
+            raise KeyError(endpoint)
+        self._file.seek(self.offsets[position])
+        return pickle.load(self._file)
+
+    def __iter__(self):
+        offsets = self.offsets
+        for endpoint, position in self.order.items():
+            if position < len(offsets) and offsets[position] >= 0:
+                yield endpoint
+
+    def __len__(self):
+        return self._size
+
+    def close(self):
+        self._file.close()
+
+
+class LazyRows:
+    """Filas de exportación que se generan cada vez que se recorren.
+
+    Con --max-memory las tablas con una fila por endpoint no se guardan en
+    `export_data`: se recalculan desde DetailFile al escribir el CSV o el Excel.
+    """
+
+    __hash__ = None
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    def __iter__(self):
+        return iter(self.factory())
+
+    def __bool__(self):
+        return next(iter(self), None) is not None
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
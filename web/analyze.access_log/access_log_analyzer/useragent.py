@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+"""
+Clasificación de user agents (familia, dispositivo, bot/humano) y desglose
+de carga y latencia por clase.
+
+Las reglas son locales (sin dependencias ni consultas externas). Como unos
+pocos UA concentran la mayoría de las líneas, el resultado se memoriza en un
+LRU acotado por el texto crudo del UA: el costo por línea es una búsqueda en
+un dict.
+"""
+
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+from .histogram import LatencyHistogram
+
+UA_RE = re.compile(r'ua="([^"]*)"')
+
+# Clases de UA, en el orden en que se reportan
+UA_CLASSES = ('humano', 'bot', 'monitor', 'herramienta', 'desconocido')
+# Clases que no son tráfico de personas
+AUTOMATED_CLASSES = ('bot', 'monitor', 'herramienta')
+
+# (subcadena en minúsculas o regex compilada, familia, clase); gana la primera
+# coincidencia
+UA_RULES = [
+    # Monitoreo y health checks
+    ('uptimerobot', 'UptimeRobot', 'monitor'),
+    ('pingdom', 'Pingdom', 'monitor'),
+    ('statuscake', 'StatusCake', 'monitor'),
+    ('site24x7', 'Site24x7', 'monitor'),
+    ('datadog', 'Datadog', 'monitor'),
+    ('newrelic', 'New Relic', 'monitor'),
+    ('better uptime', 'Better Uptime', 'monitor'),
+    ('kube-probe', 'kube-probe', 'monitor'),
+    ('elb-healthchecker', 'ELB HealthChecker', 'monitor'),
+    ('googlehc', 'Google HealthCheck', 'monitor'),
+    ('zabbix', 'Zabbix', 'monitor'),
+    ('nagios', 'Nagios', 'monitor'),
+    # Crawlers y bots conocidos
+    ('googlebot', 'Googlebot', 'bot'),
+    ('adsbot-google', 'Googlebot', 'bot'),
+    ('google-inspectiontool', 'Googlebot', 'bot'),
+    ('bingbot', 'Bingbot', 'bot'),
+    ('yandex', 'YandexBot', 'bot'),
+    ('baiduspider', 'Baiduspider', 'bot'),
+    ('duckduckbot', 'DuckDuckBot', 'bot'),
+    ('applebot', 'Applebot', 'bot'),
+    ('facebookexternalhit', 'Facebook', 'bot'),
+    ('meta-externalagent', 'Facebook', 'bot'),
+    ('twitterbot', 'Twitterbot', 'bot'),
+    ('linkedinbot', 'LinkedInBot', 'bot'),
+    ('slackbot', 'Slackbot', 'bot'),
+    ('whatsapp', 'WhatsApp', 'bot'),
+    ('telegrambot', 'TelegramBot', 'bot'),
+    ('discordbot', 'Discordbot', 'bot'),
+    ('ahrefsbot', 'AhrefsBot', 'bot'),
+    ('semrushbot', 'SemrushBot', 'bot'),
+    ('mj12bot', 'MJ12bot', 'bot'),
+    ('dotbot', 'DotBot', 'bot'),
+    ('petalbot', 'PetalBot', 'bot'),
+    ('bytespider', 'Bytespider', 'bot'),
+    ('gptbot', 'GPTBot', 'bot'),
+    ('chatgpt-user', 'ChatGPT', 'bot'),
+    ('claudebot', 'ClaudeBot', 'bot'),
+    ('ccbot', 'CCBot', 'bot'),
+    ('amazonbot', 'Amazonbot', 'bot'),
+    ('headlesschrome', 'HeadlessChrome', 'bot'),
+    ('phantomjs', 'PhantomJS', 'bot'),
+    # Clientes HTTP y scripts
+    ('curl/', 'curl', 'herramienta'),
+    ('wget/', 'Wget', 'herramienta'),
+    ('python-requests', 'python-requests', 'herramienta'),
+    ('python-urllib', 'Python urllib', 'herramienta'),
+    ('aiohttp', 'aiohttp', 'herramienta'),
+    ('httpx', 'httpx', 'herramienta'),
+    ('go-http-client', 'Go http', 'herramienta'),
+    ('axios', 'axios', 'herramienta'),
+    ('node-fetch', 'node-fetch', 'herramienta'),
+    ('undici', 'undici', 'herramienta'),
+    ('apache-httpclient', 'Apache HttpClient', 'herramienta'),
+    ('java/', 'Java', 'herramienta'),
+    ('libwww-perl', 'libwww-perl', 'herramienta'),
+    ('postmanruntime', 'Postman', 'herramienta'),
+    ('insomnia', 'Insomnia', 'herramienta'),
+    ('k6/', 'k6', 'herramienta'),
+    ('jmeter', 'JMeter', 'herramienta'),
+    ('locust', 'Locust', 'herramienta'),
+    # Genéricos (al final para no ocultar los anteriores)
+    # 'bot' como palabra o antes de '/' (SomeBot/1.0), no dentro de marcas como CUBOT
+    (re.compile(r'\bbot\b|bot/'), 'Otro bot', 'bot'),
+    ('crawler', 'Otro bot', 'bot'),
+    ('spider', 'Otro bot', 'bot'),
+    ('scraper', 'Otro bot', 'bot'),
+]
+
+# Clientes de apps móviles: tráfico de personas desde una app
+APP_RULES = [
+    ('okhttp', 'OkHttp'),
+    ('dart:io', 'Dart'),
+    ('cfnetwork', 'CFNetwork'),
+    ('alamofire', 'Alamofire'),
+    ('dalvik', 'Android'),
+]
+
+# Navegadores (el orden importa: Edge y Opera también dicen Chrome)
+BROWSER_RULES = [
+    ('edg/', 'Edge'),
+    ('opr/', 'Opera'),
+    ('samsungbrowser', 'Samsung Internet'),
+    ('firefox/', 'Firefox'),
+    ('fxios', 'Firefox'),
+    ('crios', 'Chrome'),
+    ('chrome/', 'Chrome'),
+    ('safari/', 'Safari'),
+    ('msie', 'Internet Explorer'),
+    ('trident/', 'Internet Explorer'),
+]
+
+
+def _device(lowered):
+    if 'ipad' in lowered or 'tablet' in lowered:
+        return 'tablet'
+    if 'mobile' in lowered or 'iphone' in lowered or 'android' in lowered:
+        return 'móvil'
+    return 'escritorio'
+
+
+@lru_cache(maxsize=4096)
+def classify_user_agent(ua):
+    """UA crudo -> (familia, dispositivo, clase)"""
+    if not ua or ua == '-':
+        return 'Vacío', 'otro', 'desconocido'
+
+    lowered = ua.lower()
+    for needle, family, ua_class in UA_RULES:
+        if needle in lowered if isinstance(needle, str) else needle.search(lowered):
+            return family, 'bot', ua_class
+    for needle, family in APP_RULES:
+        if needle in lowered:
+            return family, 'app', 'humano'
+    if lowered.startswith('mozilla/') or lowered.startswith('opera'):
+        for needle, family in BROWSER_RULES:
+            if needle in lowered:
+                return family, _device(lowered), 'humano'
+        return 'Otro navegador', _device(lowered), 'humano'
+    return 'Otro', 'otro', 'desconocido'
+
+
+class _ClassStats:
+    """Cantidad y suma de tiempos con su histograma"""
+
+    __slots__ = ('count', 'time', 'hist')
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.hist = LatencyHistogram()
+
+    def add(self, response_time, bucket):
+        self.count += 1
+        self.time += response_time
+        hist = self.hist
+        hist.counts[bucket] += 1
+        hist.total += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.time += other.time
+        self.hist.merge(other.hist)
+
+    @property
+    def mean(self):
+        return self.time / self.count if self.count else 0.0
+
+
+class UserAgentTracker:
+    """Desglose por clase de UA de las tablas principales (códigos, Cloudflare,
+    horas, endpoints, umbrales y Apdex) y ranking por familia"""
+
+    def __init__(self):
+        self.by_cloudflare = defaultdict(int)
+        self.by_status = defaultdict(int)
+        self.by_hour = defaultdict(_ClassStats)
+        self.by_endpoint = defaultdict(_ClassStats)
+        self.families = defaultdict(_ClassStats)
+        self._classes = None
+        # Aciertos y fallos de la caché de clasificación: los de este proceso
+        # desde que se creó el tracker, más los de los lotes unidos
+        self._cache_start = classify_user_agent.cache_info()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __getstate__(self):
+        # Un lote del pipeline viaja al proceso principal con sus conteos de caché fijos
+        state = dict(self.__dict__)
+        state['cache_hits'], state['cache_misses'] = self.cache_stats()
+        state['_cache_start'] = None
+        return state
+
+    def cache_stats(self):
+        """(aciertos, fallos) de classify_user_agent"""
+        hits, misses = self.cache_hits, self.cache_misses
+        if self._cache_start is not None:
+            info = classify_user_agent.cache_info()
+            hits += info.hits - self._cache_start.hits
+            misses += info.misses - self._cache_start.misses
+        return hits, misses
+
+    @staticmethod
+    def extract(line):
+        match = UA_RE.search(line)
+        return match.group(1) if match else ''
+
+    def add(self, ua, endpoint, hour, is_cloudflare, status, response_time):
+        family, device, ua_class = classify_user_agent(ua)
+        # Un solo cálculo de bucket por línea; los totales por clase se derivan de las horas
+        bucket = LatencyHistogram.bucket_upper(response_time)
+        self.by_cloudflare[(ua_class, is_cloudflare)] += 1
+        self.by_status[(ua_class, status)] += 1
+        self.by_hour[(hour, ua_class)].add(response_time, bucket)
+        self.by_endpoint[(endpoint, ua_class)].add(response_time, bucket)
+        self.families[(family, device, ua_class)].add(response_time, bucket)
+        self._classes = None
+
+    def merge(self, other):
+        """Suma los agregados de otro tracker (lote del pipeline)"""
+        for target, source in ((self.by_cloudflare, other.by_cloudflare), (self.by_status, other.by_status)):
+            for key, count in source.items():
+                target[key] += count
+        for target, source in ((self.by_hour, other.by_hour), (self.by_endpoint, other.by_endpoint),
+                               (self.families, other.families)):
+            for key, stats in source.items():
+                target[key].merge(stats)
+        hits, misses = other.cache_stats()
+        self.cache_hits += hits
+        self.cache_misses += misses
+        self._classes = None
+
+    @property
+    def classes(self):
+        """Totales por clase (combinando las horas)"""
+        if self._classes is None:
+            classes = defaultdict(_ClassStats)
+            for (_, ua_class), stats in self.by_hour.items():
+                merged = classes[ua_class]
+                merged.count += stats.count
+                merged.time += stats.time
+                merged.hist.merge(stats.hist)
+            self._classes = classes
+        return self._classes
+
+    def present_classes(self):
+        return [c for c in UA_CLASSES if c in self.classes]
+
+    # RESULTADOS
+    def get_class_rows(self, thresholds):
+        total = sum(stats.count for stats in self.classes.values())
+        threshold = thresholds[0]
+        rows = []
+        for ua_class in self.present_classes():
+            stats = self.classes[ua_class]
+            slow = stats.hist.count_above(threshold)
+            errors_499 = self.by_status.get((ua_class, 499), 0)
+            row = {
+                'Clase_UA': ua_class,
+                'Automatizado': 'Sí' if ua_class in AUTOMATED_CLASSES else 'No',
+                'Requests': stats.count,
+                'Porcentaje': (stats.count / total * 100) if total else 0,
+                'Cloudflare_Requests': self.by_cloudflare.get((ua_class, True), 0),
+                'Direct_Requests': self.by_cloudflare.get((ua_class, False), 0),
+                'Tiempo_Promedio': stats.mean,
+                'P95': stats.hist.quantile(0.95),
+                'Tiempo_Total_Segundos': round(stats.time, 3),
+                'Requests_Lentos': slow,
+                'Porcentaje_Lentos': (slow / stats.count * 100) if stats.count else 0,
+                'Errores_499': errors_499,
+                'Porcentaje_499': (errors_499 / stats.count * 100) if stats.count else 0,
+                'Apdex': round(stats.hist.apdex(threshold), 3) if stats.count else None
+            }
+            for extra in thresholds[1:]:
+                row[f'Lentos_>{extra}s'] = stats.hist.count_above(extra)
+            rows.append(row)
+        return rows
+
+    def get_status_rows(self):
+        classes = self.present_classes()
+        rows = []
+        for status in sorted({status for _, status in self.by_status}):
+            row = {'Codigo_HTTP': status}
+            for ua_class in classes:
+                row[ua_class] = self.by_status.get((ua_class, status), 0)
+            rows.append(row)
+        return rows
+
+    def get_hourly_rows(self, threshold):
+        classes = self.present_classes()
+        rows = []
+        for hour in sorted({hour for hour, _ in self.by_hour if hour != 'unknown'}):
+            row = {'Hora': hour}
+            for ua_class in classes:
+                stats = self.by_hour.get((hour, ua_class))
+                count = stats.count if stats else 0
+                slow = stats.hist.count_above(threshold) if stats else 0
+                row[f'Requests_{ua_class}'] = count
+                row[f'Porcentaje_Lentos_{ua_class}'] = (slow / count * 100) if count else 0
+            rows.append(row)
+        return rows
+
+    def get_endpoint_rows(self, threshold):
+        """Por endpoint: participación automatizada y lentitud de humanos vs automatizados"""
+        grouped = defaultdict(dict)
+        for (endpoint, ua_class), stats in self.by_endpoint.items():
+            grouped[endpoint][ua_class] = stats
+
+        rows = []
+        for endpoint, classes in grouped.items():
+            total = sum(stats.count for stats in classes.values())
+            human = classes.get('humano')
+            automated = [stats for ua_class, stats in classes.items() if ua_class in AUTOMATED_CLASSES]
+            automated_count = sum(stats.count for stats in automated)
+            automated_time = sum(stats.time for stats in automated)
+            automated_slow = sum(stats.hist.count_above(threshold) for stats in automated)
+            human_count = human.count if human else 0
+            human_slow = human.hist.count_above(threshold) if human else 0
+            rows.append({
+                'Endpoint': endpoint,
+                'Requests': total,
+                'Requests_Humanos': human_count,
+                'Requests_Automatizados': automated_count,
+                'Porcentaje_Automatizado': (automated_count / total * 100) if total else 0,
+                'Tiempo_Promedio_Humanos': human.mean if human else 0.0,
+                'Tiempo_Promedio_Automatizados': (automated_time / automated_count) if automated_count else 0.0,
+                'Porcentaje_Lentos_Humanos': (human_slow / human_count * 100) if human_count else 0,
+                'Porcentaje_Lentos_Automatizados': (automated_slow / automated_count * 100) if automated_count else 0
+            })
+        rows.sort(key=lambda x: x['Requests'], reverse=True)
+        return rows
+
+    def get_family_rows(self, threshold):
+        total = sum(stats.count for stats in self.families.values())
+        rows = []
+        for (family, device, ua_class), stats in self.families.items():
+            slow = stats.hist.count_above(threshold)
+            rows.append({
+                'Familia': family,
+                'Dispositivo': device,
+                'Clase_UA': ua_class,
+                'Requests': stats.count,
+                'Porcentaje': (stats.count / total * 100) if total else 0,
+                'Tiempo_Promedio': stats.mean,
+                'P95': stats.hist.quantile(0.95),
+                'Requests_Lentos': slow,
+                'Porcentaje_Lentos': (slow / stats.count * 100) if stats.count else 0
+            })
+        rows.sort(key=lambda x: x['Requests'], reverse=True)
+        return rows
+
+    def print_report(self, thresholds, top=15):
+        """Tablas principales desglosadas por clase de UA"""
+        threshold = thresholds[0]
+        print(f"\n{'='*110}")
+        print("🤖 DESGLOSE POR CLASE DE USER AGENT (bots vs humanos)")
+        print(f"{'='*110}")
+
+        class_rows = self.get_class_rows(thresholds)
+        if not class_rows:
+            print("No hay datos para mostrar")
+            return
+
+        hits, misses = self.cache_stats()
+        if hits + misses:
+            print(f"🧠 UA distintos clasificados: {misses:,} | aciertos de caché: "
+                  f"{hits / (hits + misses) * 100:.1f}% (LRU de {classify_user_agent.cache_info().maxsize:,})")
+
+        total_time = sum(row['Tiempo_Total_Segundos'] for row in class_rows)
+        automated = [row for row in class_rows if row['Automatizado'] == 'Sí']
+        if automated:
+            automated_requests = sum(row['Porcentaje'] for row in automated)
+            automated_time = sum(row['Tiempo_Total_Segundos'] for row in automated)
+            print(f"🤖 Tráfico automatizado: {automated_requests:.1f}% de los requests, "
+                  f"{(automated_time / total_time * 100) if total_time else 0:.1f}% del tiempo de servidor")
+
+        print(f"\n{'CLASE':<12} {'REQUESTS':>10} {'%':>6} {'CF':>9} {'DIRECTO':>9} {'PROM':>8} {'P95':>8} "
+              f"{'%LENTO':>7} {'%499':>6} {'APDEX':>6}")
+        print(f"{'-'*110}")
+        for row in class_rows:
+            apdex = f"{row['Apdex']:.2f}" if row['Apdex'] is not None else "-"
+            print(f"{row['Clase_UA']:<12} {row['Requests']:>10,} {row['Porcentaje']:>5.1f}% "
+                  f"{row['Cloudflare_Requests']:>9,} {row['Direct_Requests']:>9,} "
+                  f"{row['Tiempo_Promedio']:>7.3f}s {row['P95']:>7.3f}s {row['Porcentaje_Lentos']:>6.1f}% "
+                  f"{row['Porcentaje_499']:>5.1f}% {apdex:>6}")
+        if len(thresholds) > 1:
+            print(f"\n{'CLASE':<12} " + " ".join(f"{'> ' + str(t) + 's':>10}" for t in thresholds))
+            for row in class_rows:
+                stats = self.classes[row['Clase_UA']]
+                print(f"{row['Clase_UA']:<12} " + " ".join(
+                    f"{stats.hist.count_above(t):>10,}" for t in thresholds))
+
+        classes = self.present_classes()
+        print("\n🔢 CÓDIGOS HTTP POR CLASE")
+        print(f"{'CÓDIGO':<8} " + " ".join(f"{c:>12}" for c in classes))
+        print(f"{'-'*(9 + 13 * len(classes))}")
+        for row in self.get_status_rows():
+            print(f"{row['Codigo_HTTP']:<8} " + " ".join(f"{row[c]:>12,}" for c in classes))
+
+        print("\n🕐 REQUESTS Y % LENTOS POR HORA Y CLASE")
+        print(f"{'HORA':<6} " + " ".join(f"{c:>20}" for c in classes))
+        print(f"{'-'*(7 + 21 * len(classes))}")
+        for row in self.get_hourly_rows(threshold):
+            print(f"{row['Hora']:<6} " + " ".join(
+                f"{row[f'Requests_{c}']:>10,} ({row[f'Porcentaje_Lentos_{c}']:>5.1f}%)" for c in classes))
+
+        print(f"\n🌐 TOP {top} ENDPOINTS: HUMANOS VS AUTOMATIZADOS")
+        print(f"{'ENDPOINT':<50} {'REQS':>8} {'%AUTO':>6} {'PROM HUM':>9} {'PROM AUT':>9} "
+              f"{'%LENTO HUM':>11} {'%LENTO AUT':>11}")
+        print(f"{'-'*110}")
+        for row in self.get_endpoint_rows(threshold)[:top]:
+            display_ep = row['Endpoint'][:48] + ".." if len(row['Endpoint']) > 50 else row['Endpoint']
+            print(f"{display_ep:<50} {row['Requests']:>8,} {row['Porcentaje_Automatizado']:>5.1f}% "
+                  f"{row['Tiempo_Promedio_Humanos']:>8.3f}s {row['Tiempo_Promedio_Automatizados']:>8.3f}s "
+                  f"{row['Porcentaje_Lentos_Humanos']:>10.1f}% {row['Porcentaje_Lentos_Automatizados']:>10.1f}%")
+
+        print(f"\n👤 TOP {top} FAMILIAS DE USER AGENT")
+        print(f"{'FAMILIA':<22} {'DISPOSITIVO':<12} {'CLASE':<12} {'REQUESTS':>10} {'%':>6} {'PROM':>8} "
+              f"{'P95':>8} {'%LENTO':>7}")
+        print(f"{'-'*110}")
+        for row in self.get_family_rows(threshold)[:top]:
+            print(f"{row['Familia'][:22]:<22} {row['Dispositivo']:<12} {row['Clase_UA']:<12} "
+                  f"{row['Requests']:>10,} {row['Porcentaje']:>5.1f}% {row['Tiempo_Promedio']:>7.3f}s "
+                  f"{row['P95']:>7.3f}s {row['Porcentaje_Lentos']:>6.1f}%")
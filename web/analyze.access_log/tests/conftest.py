@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures compartidas: líneas sintéticas en formato apilog
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+# El paquete vive junto a los tests (web/analyze.access_log/access_log_analyzer)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = (('GET', '/api/catalog', 0.08), ('POST', '/api/checkout', 0.6), ('GET', '/api/search', 0.4))
+
+
+def make_line(second, method='GET', path='/api/catalog', status=200, rt=0.1, ip='187.1.1.1',
+              body_bytes=512, ua='okhttp/4.9.0', colo='MEX'):
+    """Una línea apilog que termina `second` segundos después de las 00:00:00"""
+    h, m, s = second // 3600, second // 60 % 60, second % 60
+    return (f'162.158.1.1 (cf-node) realip={ip} - 25/Sep/2025:{h:02d}:{m:02d}:{s:02d} -0600 '
+            f'"{method} {path} HTTP/1.1" status={status} {body_bytes} rt={rt:.3f} urt={rt:.3f} '
+            f'referer="-" ua="{ua}" url="https://api.example.com{path}" cf_ray="8c1a2b3c4d000000-{colo}"')
+
+
+def synthetic_log(count, seed=7, endpoints=ENDPOINTS, hours=4):
+    """`count` líneas ordenadas por tiempo con latencias log-normales, 499/5xx y reintentos"""
+    rng = random.Random(seed)
+    span = hours * 3600
+    lines = []
+    for i in range(count):
+        second = i * span // count
+        method, path, base = endpoints[rng.randrange(len(endpoints))]
+        status = rng.choices([200, 404, 499, 502], [88, 4, 4, 4])[0]
+        rt = round(rng.lognormvariate(0, 0.8) * base, 3)
+        lines.append(make_line(second, method, f"{path}?id={rng.randint(1, 50)}", status, rt,
+                               ip=f"187.1.{rng.randint(1, 4)}.{rng.randint(1, 30)}",
+                               body_bytes=rng.randint(100, 20000), colo=rng.choice(['MEX', 'QRO', 'LAX'])))
+    return lines
+
+
+@pytest.fixture
+def line():
+    return make_line
+
+
+@pytest.fixture(scope='session')
+def log_lines():
+    return synthetic_log(20000)
+
+
+@pytest.fixture
+def log_file(tmp_path, log_lines):
+    path = tmp_path / 'access.log'
+    path.write_text('\n'.join(log_lines) + '\n', encoding='utf-8')
+    return str(path)
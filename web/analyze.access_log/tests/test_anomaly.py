@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Anomalías por endpoint y minuto: base EWMA, winsorizado, calentamiento y límite de endpoints
+"""
+
+import pytest
+
+from access_log_analyzer.analyzer import AUTO_THRESHOLD_MIN, ComprehensiveLogAnalyzer
+from access_log_analyzer.anomaly import AnomalyDetector, _Baseline
+
+
+def feed(detector, minute, rt, count=20, endpoint='GET /a', status=200):
+    for second in range(count):
+        detector.add(minute * 60 + second % 60, endpoint, status, rt)
+
+
+def windows(detector):
+    return [(row['Metrica'], row['Minutos']) for row in detector.get_rows()]
+
+
+def test_baseline_warmup_is_cumulative_mean_then_ewma():
+    baseline = _Baseline()
+    for value in (1.0, 2.0, 3.0):
+        baseline.update(value, 0.1)
+    assert baseline.mean == pytest.approx(2.0)
+
+    baseline = _Baseline()
+    for _ in range(20):
+        baseline.update(1.0, 0.1)
+    baseline.update(2.0, 0.1)
+    assert baseline.mean == pytest.approx(1.1)
+
+
+def test_baseline_winsorizes_extreme_values():
+    baseline = _Baseline()
+    for _ in range(20):
+        baseline.update(1.0, 0.1)
+    baseline.update(100.0, 0.1, limit=1.5)
+    assert baseline.mean == pytest.approx(1.05)
+    assert baseline.n == 21
+
+
+def test_spike_opens_a_window_per_metric():
+    detector = AnomalyDetector(0.5)
+    for minute in range(20):
+        feed(detector, minute, 0.1)
+    for minute in (20, 21):
+        feed(detector, minute, 2.0)
+    for minute in range(22, 25):
+        feed(detector, minute, 0.1)
+    detector.flush()
+
+    assert sorted(windows(detector)) == [('lentos', 2), ('p99', 2)]
+    row = next(row for row in detector.get_rows() if row['Metrica'] == 'p99')
+    assert (row['Base'], row['Observado'], row['Requests']) == (0.1, 2.0, 40)
+
+
+def test_single_minute_spike_is_not_reported():
+    detector = AnomalyDetector(0.5)
+    for minute in range(20):
+        feed(detector, minute, 0.1)
+    feed(detector, 20, 2.0)
+    for minute in range(21, 24):
+        feed(detector, minute, 0.1)
+    detector.flush()
+    assert detector.get_rows() == []
+
+
+def test_outlier_does_not_drag_the_baseline():
+    detector = AnomalyDetector(0.5)
+    for minute in range(20):
+        feed(detector, minute, 0.1)
+    feed(detector, 20, 30.0)
+    # Sin winsorizado la base del p99 quedaría en ~3s y ocultaría el pico siguiente
+    assert detector.states['GET /a'].baselines['p99'].mean < 0.11
+
+    for minute in range(21, 25):
+        feed(detector, minute, 0.1)
+    for minute in (25, 26):
+        feed(detector, minute, 2.0)
+    feed(detector, 27, 0.1)
+    detector.flush()
+    assert ('p99', 2) in windows(detector)
+
+
+def test_warmup_and_gates():
+    detector = AnomalyDetector(0.5, warmup=10)
+    for minute in range(3):
+        feed(detector, minute, 0.1)
+    # Durante el calentamiento no se marca nada
+    for minute in (3, 4):
+        feed(detector, minute, 2.0)
+    for minute in range(5, 20):
+        feed(detector, minute, 0.1)
+    # Minutos con menos de min_requests no se evalúan
+    for minute in (20, 21):
+        feed(detector, minute, 2.0, count=5)
+    feed(detector, 22, 0.1)
+    detector.flush()
+
+    assert detector.get_rows() == []
+    assert detector.evaluated_minutes == 21
+
+
+def test_max_endpoints():
+    detector = AnomalyDetector(0.5, max_endpoints=2)
+    for i in range(4):
+        feed(detector, 0, 0.1, count=10, endpoint=f'GET /e{i}')
+    assert set(detector.states) == {'GET /e0', 'GET /e1'}
+    assert detector.ignored_requests == 20
+
+    batch = detector.batch()
+    for i in range(4):
+        batch.add(60, f'GET /e{i}', 200, 0.1)
+    detector.merge(batch)
+    assert detector.ignored_requests == 22
+
+
+def test_merge_matches_sequential():
+    sequential = AnomalyDetector(0.5)
+    merged = AnomalyDetector(0.5)
+    batches = [merged.batch(), merged.batch()]
+    for minute in range(30):
+        rt = 2.0 if minute in (20, 21, 22) else 0.1
+        for second in range(20):
+            args = (minute * 60 + second, 'GET /a', 499 if minute == 21 else 200, rt)
+            sequential.add(*args)
+            batches[minute >= 15].add(*args)
+    for batch in batches:
+        merged.merge(batch)
+    sequential.flush()
+    merged.flush()
+
+    assert sequential.get_rows() and merged.get_rows() == sequential.get_rows()
+
+
+def test_streaming_threshold(line, capsys):
+    lines = [line(i, rt=0.1) for i in range(600)]
+    fixed = ComprehensiveLogAnalyzer(threshold=[1.2, 2], anomalies=True)
+    assert fixed.anomalies.slow_threshold == 1.2
+
+    auto = ComprehensiveLogAnalyzer(anomalies=True)
+    auto.feed(lines).finalize()
+    assert auto.anomalies.slow_threshold == AUTO_THRESHOLD_MIN
+    auto.anomalies.print_report(auto.threshold)
+    assert '% lentos usa > 0.5s' not in capsys.readouterr().out
+    auto.anomalies.print_report(1.2)
+    assert '% lentos usa > 0.5s (corte en streaming), no el umbral del reporte (1.2s)' in capsys.readouterr().out
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Ancho de banda: bytes de lentos vs rápidos con el mismo corte que las tablas principales
+y límite de endpoints seguidos
+"""
+
+import random
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.bandwidth import BandwidthTracker
+
+
+@pytest.mark.parametrize('threshold', [0.25, 0.3, 0.75, 1])
+def test_slow_bytes_match_main_tables(line, threshold):
+    rng = random.Random(9)
+    requests = [(round(rng.uniform(0.05, 1.5), 3), rng.randint(100, 50000)) for _ in range(2000)]
+    lines = [line(i, path='/api/files', rt=rt, body_bytes=size) for i, (rt, size) in enumerate(requests)]
+    analyzer = ComprehensiveLogAnalyzer(threshold=threshold, bandwidth=True)
+    analyzer.feed(lines).finalize()
+
+    row, = analyzer.bandwidth.get_latency_rows(threshold)
+    slow = [size for rt, size in requests if rt > threshold]
+    fast = [size for rt, size in requests if rt <= threshold]
+    assert row['Requests_Lentos'] == len(slow) == analyzer.count_slow('endpoint', 'GET /api/files')
+    assert row['Bytes_Promedio_Lentos'] == round(sum(slow) / len(slow), 1)
+    assert row['Bytes_Promedio_Rapidos'] == round(sum(fast) / len(fast), 1)
+
+
+def test_size_totals(line):
+    lines = [line(i, body_bytes=size) for i, size in enumerate((0, 1024, 2048, 4096))]
+    analyzer = ComprehensiveLogAnalyzer(threshold=1, bandwidth=True)
+    analyzer.feed(lines).finalize()
+
+    overall = analyzer.bandwidth.overall
+    assert (overall.count, overall.total, overall.max) == (4, 7168, 4096)
+    assert overall.mean == 1792
+    assert overall.quantile(1.0) == 4096
+
+
+def test_opt_in(line):
+    analyzer = ComprehensiveLogAnalyzer(threshold=1)
+    analyzer.feed([line(0, body_bytes=100)]).finalize()
+    analyzer.prepare_export_data()
+
+    assert analyzer.bandwidth is None
+    assert 'ancho_banda_endpoints' not in analyzer.export_data
+
+
+def test_max_endpoints_keeps_totals():
+    tracker = BandwidthTracker(max_endpoints=2)
+    for endpoint in ('GET /a', 'GET /b', 'GET /c', 'GET /a', 'GET /d'):
+        tracker.add(endpoint, '00:00', False, 100, 0.1, None)
+    # Lote sin límite: sus endpoints nuevos también quedan fuera
+    batch = BandwidthTracker(horizon=None, max_endpoints=None)
+    for endpoint in ('GET /b', 'GET /e', 'GET /e'):
+        batch.add(endpoint, '01:00', True, 50, 0.2, None)
+    tracker.merge(batch)
+
+    assert list(tracker.endpoints) == ['GET /a', 'GET /b']
+    assert (tracker.endpoints['GET /a'].count, tracker.endpoints['GET /b'].count) == (2, 2)
+    assert tracker.ignored_requests == 4
+    assert (tracker.overall.count, tracker.overall.total) == (8, 650)
+    assert tracker.hours['01:00'].count == 3
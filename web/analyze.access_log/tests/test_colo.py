@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Colos de Cloudflare: extracción del sufijo de cf_ray y desborde a '(otros)'
+"""
+
+import pytest
+
+from access_log_analyzer.colo import MAX_COLOS, OTHER_COLO, ColoTracker, extract_colo
+
+
+@pytest.mark.parametrize('tail, expected', [
+    ('cf_ray="8c1a2b3c4d000000-qro"', 'QRO'),
+    ('cf_ray="8c1a2b3c4d000000-MEX" extra="x-y"', 'MEX'),
+    ('cf_ray="8c1a2b3c4d000000-DFW', 'DFW'),
+    ('ua="curl/8.0"', None),            # sin cf_ray
+    ('cf_ray="-"', None),               # cf_ray vacío de nginx
+    ('cf_ray=""', None),
+    ('cf_ray="8c1a2b3c4d000000"', None),  # sin sufijo de colo
+    ('cf_ray="8c1a2b3c4d000000-"', None),
+])
+def test_extract_colo(tail, expected):
+    assert extract_colo(f'1.1.1.1 - "GET / HTTP/1.1" status=200 rt=0.1 {tail}') == expected
+
+
+def test_extract_colo_from_log_line(line):
+    assert extract_colo(line(5, colo='GRU')) == 'GRU'
+
+
+def test_missing_colo_counts_only_cloudflare_requests():
+    tracker = ColoTracker()
+    tracker.add(None, '00:00', True, 200, 0.1)
+    tracker.add(None, '00:00', False, 200, 0.1)
+    assert tracker.missing == 1 and not tracker.cells
+
+
+def test_max_colos_overflow():
+    tracker = ColoTracker(max_colos=2)
+    for colo in ('MEX', 'QRO', 'DFW', 'LAX', 'MEX', 'DFW'):
+        tracker.add(colo, '00:00', True, 200, 0.2)
+
+    counts = {colo: cell.count for (colo, _), cell in tracker.cells.items()}
+    # Los colos ya vistos siguen con su celda; los nuevos van a '(otros)'
+    assert counts == {'MEX': 2, 'QRO': 1, OTHER_COLO: 3}
+    assert [row['Colo'] for row in tracker.get_colo_rows(1.0)] == [OTHER_COLO, 'MEX', 'QRO']
+    assert ColoTracker().max_colos == MAX_COLOS
+
+
+def test_max_colos_overflow_on_merge():
+    merged = ColoTracker(max_colos=2)
+    merged.add('MEX', '00:00', True, 200, 0.2)
+    batch = ColoTracker()
+    for colo, hour in (('QRO', '00:00'), ('DFW', '00:00'), ('LAX', '01:00'), ('MEX', '01:00')):
+        batch.add(colo, hour, True, 499, 0.2)
+    batch.add(None, '01:00', True, 200, 0.1)
+    merged.merge(batch)
+
+    counts = {key: cell.count for key, cell in merged.cells.items()}
+    assert counts == {('MEX', '00:00'): 1, ('QRO', '00:00'): 1, (OTHER_COLO, '00:00'): 1,
+                      (OTHER_COLO, '01:00'): 1, ('MEX', '01:00'): 1}
+    assert merged.missing == 1
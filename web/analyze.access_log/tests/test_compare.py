@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Modo compare: z-scores de Welch y de dos proporciones, presupuestos y filtros
+"""
+
+import json
+import math
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.compare import _z_mean, _z_proportion, compare_summaries, load_comparison, parse_window
+
+
+def summary(total, mean, stdev, p95=1.0, p99=2.0, slow=0, errors_499=0):
+    return {'total': total, 'mean': mean, 'stdev': stdev, 'p95': p95, 'p99': p99,
+            'slow': slow, 'errors_499': errors_499}
+
+
+def test_z_mean_is_welch_statistic():
+    before, after = summary(100, 0.5, 0.2), summary(400, 0.6, 0.3)
+    expected = 0.1 / math.sqrt(0.2 ** 2 / 100 + 0.3 ** 2 / 400)
+    assert _z_mean(before, after) == pytest.approx(expected)
+    assert _z_mean(after, before) == pytest.approx(-expected)
+
+
+def test_z_mean_without_variance():
+    assert _z_mean(summary(10, 0.5, 0.0), summary(10, 0.5, 0.0)) == 0.0
+    assert _z_mean(summary(10, 0.5, 0.0), summary(10, 0.7, 0.0)) == 99.0
+    assert _z_mean(summary(10, 0.5, 0.0), summary(10, 0.3, 0.0)) == -99.0
+
+
+def test_z_proportion_is_pooled_two_proportion_test():
+    # 10/200 -> 40/200: p = 50/400
+    pooled = 50 / 400
+    expected = (40 / 200 - 10 / 200) / math.sqrt(pooled * (1 - pooled) * (1 / 200 + 1 / 200))
+    assert _z_proportion(10, 200, 40, 200) == pytest.approx(expected)
+    assert _z_proportion(0, 100, 0, 100) == 0.0
+
+
+def test_budgets_only_fail_significant_changes():
+    before = {'GET /a': summary(1000, 0.20, 0.05, p95=0.3, p99=0.4, slow=10),
+              'GET /b': summary(1000, 0.20, 0.05, p95=0.3, p99=0.4, slow=10)}
+    after = {'GET /a': summary(1000, 0.40, 0.05, p95=0.6, p99=0.8, slow=200),
+             # +1% en el promedio: por encima del presupuesto pero sin significancia
+             'GET /b': summary(1000, 0.202, 0.05, p95=0.3, p99=0.4, slow=10)}
+    budgets = {'mean': 0.5, 'p95': 10, 'p99': None, 'slow_rate': 1, 'rate_499': 1}
+
+    rows = {row['endpoint']: row for row in compare_summaries(before, after, budgets=budgets)}
+
+    regressed = rows['GET /a']
+    assert regressed['significant']
+    assert regressed['deltas']['mean'] == pytest.approx(100.0)
+    assert regressed['deltas']['slow_rate'] == pytest.approx(19.0)
+    assert sorted(regressed['violations']) == ['mean', 'p95', 'slow_rate']
+
+    noise = rows['GET /b']
+    assert noise['deltas']['mean'] == pytest.approx(1.0)
+    assert not noise['significant']
+    assert noise['violations'] == []
+
+
+def test_rows_sorted_by_score_and_filtered_by_min_requests():
+    before = {'GET /a': summary(100, 0.2, 0.1), 'GET /b': summary(100, 0.2, 0.1), 'GET /c': summary(5, 0.2, 0.1)}
+    after = {'GET /a': summary(100, 0.25, 0.1), 'GET /b': summary(100, 0.5, 0.1), 'GET /c': summary(5, 9.0, 0.1)}
+
+    rows = compare_summaries(before, after, min_requests=10)
+
+    assert [row['endpoint'] for row in rows] == ['GET /b', 'GET /a']
+    assert rows[0]['score'] > rows[1]['score']
+
+
+def test_windows_split_one_log(line):
+    lines = [line(9 * 3600 + i, rt=0.1) for i in range(50)] + [line(11 * 3600 + i, rt=0.3) for i in range(50)]
+    since, until = parse_window('2025-09-25 00:00,2025-09-25 10:00')
+
+    analyzer = ComprehensiveLogAnalyzer(threshold=1.0, since=since, until=until)
+    analyzer.feed(lines).finalize()
+
+    summaries = analyzer.get_endpoint_summaries()
+    assert summaries['GET /api/catalog']['total'] == 50
+    assert summaries['GET /api/catalog']['mean'] == pytest.approx(0.1)
+    assert analyzer.quality.rejected['fuera_de_ventana'] == 50
+
+
+def write_log(path, lines):
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_comparison_without_threshold_uses_auto_threshold_of_before(tmp_path, line):
+    before_lines = [line(i, rt=0.2 if i % 10 else 1.2) for i in range(200)]
+    after_lines = [line(i, rt=0.2 if i % 4 else 1.2) for i in range(200)]
+    before_path = write_log(tmp_path / 'antes.log', before_lines)
+    after_path = write_log(tmp_path / 'despues.log', after_lines)
+    expected = ComprehensiveLogAnalyzer(threshold=None)
+    expected.feed(before_lines).finalize()
+
+    before, after, threshold = load_comparison(before_path, after_path)
+
+    assert threshold == expected.threshold != 1.0
+    assert before['GET /api/catalog']['slow'] == 20
+    assert after['GET /api/catalog']['slow'] == 50
+
+
+def test_comparison_without_threshold_uses_snapshot_threshold(tmp_path, line, capsys):
+    lines = [line(i, rt=0.2 if i % 10 else 0.7) for i in range(200)]
+    log_path = write_log(tmp_path / 'access.log', lines)
+    snapshot_path = str(tmp_path / 'antes.json')
+    analyzer = ComprehensiveLogAnalyzer(log_path, 0.25)
+    analyzer.parse_log()
+    analyzer.save_snapshot(snapshot_path)
+
+    before, after, threshold = load_comparison(snapshot_path, log_path)
+
+    assert threshold == 0.25
+    assert before['GET /api/catalog']['slow'] == after['GET /api/catalog']['slow'] == 20
+    assert json.loads((tmp_path / 'antes.json').read_text(encoding='utf-8'))['threshold'] == 0.25
+    assert 'usa umbral' not in capsys.readouterr().out
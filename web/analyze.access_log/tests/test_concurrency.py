@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrencia reconstruida: intervalos solapados y lentos por minuto
+"""
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.concurrency import ConcurrencyTracker
+
+
+def test_overlapping_requests():
+    tracker = ConcurrencyTracker()
+    # Tres requests que terminan en el mismo segundo y empiezan escalonados
+    for rt in (3.0, 2.0, 1.0):
+        tracker.add('25/Sep/2025:00:00:10 -0600', rt, 'GET /a', 200)
+    tracker.flush()
+
+    assert tracker.overall.peak == 3
+    assert tracker.endpoints['GET /a'].peak == 3
+    assert tracker.completions.peak == 3
+    assert tracker.arrivals.peak == 1
+
+
+@pytest.mark.parametrize('threshold', [0.25, 0.3, 0.75])
+def test_slow_per_minute_matches_main_tables(log_lines, threshold):
+    analyzer = ComprehensiveLogAnalyzer(threshold=threshold, concurrency=True)
+    analyzer.feed(log_lines).finalize()
+
+    rows = analyzer.concurrency.get_minute_rows(threshold)
+    assert sum(row['Requests'] for row in rows) == analyzer.parsed_lines
+    assert sum(row['Requests_Lentos'] for row in rows) == analyzer.count_slow()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+error.log: parseo e índice por minuto, cruce con el access.log y lift contra la tasa normal
+"""
+
+import calendar
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.errorlog import ANY_ENDPOINT, ErrorLogCorrelator, classify_error
+
+# 2025-09-25 06:00 (hora local del log, igual que el access.log)
+MINUTE = calendar.timegm((2025, 9, 25, 6, 0, 0, 0, 0, 0)) // 60
+
+
+def error_line(when='06:00:13', level='error', message='upstream timed out (110: Connection timed out)',
+               request='GET /api/pay?x=1', upstream='http://10.0.0.5:8080/api/pay'):
+    line = f"2025/09/25 {when} [{level}] 1234#0: *5678 {message} while reading response header, client: 1.2.3.4"
+    if request:
+        line += f', request: "{request} HTTP/1.1"'
+    if upstream:
+        line += f', upstream: "{upstream}"'
+    return line + ', host: "api.example.com"'
+
+
+def test_parser_indexes_events_by_minute_endpoint_cause_and_upstream():
+    correlator = ErrorLogCorrelator().load([
+        error_line(),
+        error_line('06:00:40'),
+        error_line('06:02:01', message='connect() failed (111: Connection refused)', request='POST /api/checkout'),
+        error_line('06:03:00', message='no live upstreams', request=None, upstream=None),
+        error_line('06:04:00', level='notice'),
+        'continuación de un mensaje largo',
+    ])
+
+    assert correlator.total_events == 4
+    assert correlator.skipped_lines == 2
+    assert correlator.events == {
+        (MINUTE, 'GET /api/pay', 'upstream timed out', '10.0.0.5:8080'): 2,
+        (MINUTE + 2, 'POST /api/checkout', 'connect() failed', '10.0.0.5:8080'): 1,
+        (MINUTE + 3, ANY_ENDPOINT, 'no live upstreams', '-'): 1,
+    }
+    # El access.log escribe al terminar: se vigila el minuto del evento y el siguiente
+    assert correlator.watched == {MINUTE, MINUTE + 1, MINUTE + 2, MINUTE + 3, MINUTE + 4}
+    assert correlator.kinds['connect() failed'] == 'backend caído'
+
+
+@pytest.mark.parametrize('message, expected', [
+    ('upstream timed out (110: Connection timed out)', ('upstream timed out', 'saturación backend')),
+    ('limiting requests, excess: 10.5 by zone "api"', ('limit_req', 'saturación nginx')),
+    ('recv() failed (104: Connection reset by peer)', ('connection reset', 'red')),
+    ('algo que no se reconoce', ('otro', 'otro')),
+])
+def test_classify_error(message, expected):
+    assert classify_error(message) == expected
+
+
+def feed(correlator, minute, endpoint, requests):
+    for status, rt in requests:
+        correlator.add(minute * 60 + 5, endpoint, status, rt)
+
+
+@pytest.mark.parametrize('threshold', [0.5, 0.75, 1.25])
+def test_window_slow_count_matches_main_cut(threshold):
+    correlator = ErrorLogCorrelator(min_slow=0.5).load([error_line()])
+    times = [0.3, 0.5, 0.501, 0.705, 0.75, 0.751, 0.8, 1.2, 1.25, 1.26, 3.0]
+    feed(correlator, MINUTE, 'GET /api/pay', [(200, rt) for rt in times])
+
+    total, slow, _, _ = correlator._window_stats({MINUTE, MINUTE + 1}, 'GET /api/pay', threshold)
+    assert total == len(times)
+    assert slow == sum(1 for rt in times if rt > threshold)
+
+
+def test_lift_against_endpoint_baseline():
+    correlator = ErrorLogCorrelator(min_slow=0.5).load([error_line(), error_line('06:00:50')])
+    # Minuto del evento y el siguiente: 10 requests, 4 lentos, 2 499, 1 502
+    feed(correlator, MINUTE, 'GET /api/pay', [(200, 1.0)] * 3 + [(499, 0.2)] * 2 + [(200, 0.1)] * 2)
+    feed(correlator, MINUTE + 1, 'GET /api/pay', [(502, 2.0), (200, 0.1), (200, 0.1)])
+    # Fuera de la ventana no cuenta
+    feed(correlator, MINUTE + 2, 'GET /api/pay', [(499, 3.0)] * 5)
+
+    baselines = {'GET /api/pay': (100, 10, 5, 0), ANY_ENDPOINT: (1000, 50, 10, 20)}
+    row, = correlator.get_endpoint_rows(1.0, baselines)
+
+    assert (row['Causa'], row['Endpoint'], row['Eventos'], row['Minutos']) == (
+        'upstream timed out', 'GET /api/pay', 2, 1)
+    assert row['Requests_En_Ventana'] == 10
+    assert row['Porcentaje_Lentos'] == pytest.approx(10)
+    assert row['Lift_Lentos'] == round(0.1 / 0.1, 2)
+    assert row['Lift_499'] == round(0.2 / 0.05, 2)
+    # Sin 5xx en la base del endpoint
+    assert row['Lift_5xx'] == '∞'
+
+
+def test_lift_edge_cases():
+    assert ErrorLogCorrelator._lift(0, 10, 0, 100) is None
+    assert ErrorLogCorrelator._lift(1, 10, 0, 100) == '∞'
+    assert ErrorLogCorrelator._lift(1, 0, 1, 100) is None
+    assert ErrorLogCorrelator._lift(3, 10, 5, 100) == 6.0
+
+
+def test_event_without_request_uses_global_baseline():
+    correlator = ErrorLogCorrelator(min_slow=0.5).load([error_line(request=None)])
+    feed(correlator, MINUTE, 'GET /a', [(200, 2.0), (200, 0.1)])
+    feed(correlator, MINUTE, 'GET /b', [(499, 0.1), (200, 0.1)])
+
+    row, = correlator.get_endpoint_rows(1.0, {'GET /a': (10, 1, 0, 0), ANY_ENDPOINT: (100, 5, 5, 0)})
+    assert row['Endpoint'] == ANY_ENDPOINT and row['Requests_En_Ventana'] == 4
+    assert row['Lift_Lentos'] == round(0.25 / 0.05, 2)
+    assert row['Lift_499'] == round(0.25 / 0.05, 2)
+
+
+def test_analyzer_correlates_with_error_log(tmp_path, line):
+    error_log = tmp_path / 'error.log'
+    error_log.write_text(error_line('00:01:30', request='GET /api/pay') + '\n', encoding='utf-8')
+    lines = [line(60 + i, path='/api/pay', rt=0.8 if i % 2 else 0.1) for i in range(40)]
+    lines += [line(3600 + i, path='/api/pay', rt=0.1) for i in range(60)]
+    analyzer = ComprehensiveLogAnalyzer(threshold=0.75, error_log=str(error_log))
+    analyzer.feed(lines).finalize()
+    analyzer.prepare_export_data()
+
+    row, = analyzer.export_data['errorlog_endpoints']
+    assert row['Requests_En_Ventana'] == 40
+    assert row['Porcentaje_Lentos'] == pytest.approx(50)
+    # 20 lentos de 100 en el log completo
+    assert row['Lift_Lentos'] == round(0.5 / 0.2, 2)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Índice del explorador: árboles armados desde stats.cells y totales iguales a las tablas planas
+"""
+
+from collections import defaultdict
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.explorer import ExplorerIndex
+
+
+@pytest.fixture(scope='module')
+def analyzed(log_lines):
+    analyzer = ComprehensiveLogAnalyzer(threshold=[0.5, 1.0])
+    analyzer.feed(log_lines).finalize()
+    analyzer.prepare_export_data()
+    return analyzer, ExplorerIndex(analyzer)
+
+
+def test_tree_from_store_cells(line):
+    analyzer = ComprehensiveLogAnalyzer(threshold=1.0)
+    analyzer.feed([line(10, rt=0.2), line(20, rt=1.5, status=499), line(3605, rt=0.4, status=502),
+                   line(3610, path='/api/pay', rt=2.0), line(3615, path='/api/pay', rt=0.1)]).finalize()
+    index = ExplorerIndex(analyzer)
+
+    by_endpoint, by_status = index.roots['endpoint'], index.roots['status']
+    assert by_endpoint.stats.count == by_status.stats.count == 5
+    assert set(by_endpoint.children) == {'GET /api/catalog', 'GET /api/pay'}
+    catalog = by_endpoint.children['GET /api/catalog']
+    assert {status: node.stats.count for status, node in catalog.children.items()} == {200: 1, 499: 1, 502: 1}
+    assert set(catalog.children[502].children) == {'01:00'}
+    assert (catalog.stats.errors_499, catalog.stats.errors_5xx, catalog.stats.max) == (1, 1, 1.5)
+
+    # Vista por status: mismas hojas en otro orden
+    ok = by_status.children[200]
+    assert {endpoint: node.stats.count for endpoint, node in ok.children.items()} == {
+        'GET /api/catalog': 1, 'GET /api/pay': 2}
+    assert set(ok.children['GET /api/pay'].children) == {'01:00'}
+
+    rows = index.rows(by_endpoint, 1.0, sort='slow')
+    assert [child.key for child, _ in rows] == ['GET /api/pay', 'GET /api/catalog']
+    assert rows[0][1]['slow'] == pytest.approx(50)
+    assert [child.key for child, _ in index.rows(by_endpoint, 1.0, text='PAY')] == ['GET /api/pay']
+
+
+def test_endpoint_nodes_match_detailed_endpoints(analyzed):
+    analyzer, index = analyzed
+    nodes = index.roots['endpoint'].children
+    rows = analyzer.export_data['detalle_endpoints']
+
+    assert set(nodes) == {row['Endpoint'] for row in rows}
+    for row in rows:
+        node = nodes[row['Endpoint']]
+        metrics = index.metrics(node, analyzer.threshold)
+        assert metrics['requests'] == row['Total_Requests']
+        assert metrics['avg'] == pytest.approx(row['Tiempo_Promedio'])
+        assert metrics['max'] == row['Tiempo_Maximo']
+        assert node.stats.errors_499 == row['Errores_499']
+        assert round(metrics['slow'] * metrics['requests'] / 100) == row['Requests_Lentos']
+
+
+def test_status_drill_down_matches_endpoints_by_code(analyzed):
+    analyzer, index = analyzed
+    rows = analyzer.export_data['endpoints_por_codigo']
+    assert rows
+    by_status = index.roots['status'].children
+    for row in rows:
+        node = index.roots['endpoint'].children[row['Endpoint']].children[row['Codigo_HTTP']]
+        assert node.stats.count == row['Total_Requests']
+        assert index.metrics(node, analyzer.threshold)['avg'] == pytest.approx(row['Tiempo_Promedio'])
+        assert by_status[row['Codigo_HTTP']].children[row['Endpoint']].stats.count == row['Total_Requests']
+
+    assert {status: node.stats.count for status, node in by_status.items()} == dict(analyzer.status_codes)
+
+
+def test_hour_leaves_add_up_to_hourly_analysis(analyzed):
+    analyzer, index = analyzed
+    totals, slow = defaultdict(int), defaultdict(int)
+    for endpoint in index.roots['endpoint'].children.values():
+        for status in endpoint.children.values():
+            for hour, node in status.children.items():
+                totals[hour] += node.stats.count
+                slow[hour] += node.stats.hist.count_above(analyzer.threshold)
+
+    rows = analyzer.export_data['analisis_horario']
+    assert dict(totals) == {row['Hora']: row['Total_Requests'] for row in rows}
+    assert dict(slow) == {row['Hora']: row['Requests_Lentos'] for row in rows}
+
+
+def test_sample_rows_relax_the_filter(analyzed):
+    analyzer, index = analyzed
+    endpoint, samples = next((ep, rows) for ep, rows in index.samples.items() if rows)
+    status, hour = samples[0]['Status'], samples[0]['Hora']
+
+    rows, note = index.sample_rows(endpoint, status, hour)
+    assert note == '' and all(r['Status'] == status and r['Hora'] == hour for r in rows)
+    assert [r['RT'] for r in rows] == sorted((r['RT'] for r in rows), reverse=True)
+    assert index.sample_rows(endpoint, status, 'no-existe')[1] == 'de otras horas'
+    assert index.sample_rows(endpoint, 999, hour)[1] == 'de otros status'
+    assert index.sample_rows('GET /no-existe') == ([], '')
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+--group-by: validación de dimensiones, claves compuestas, desborde a '(otros)' y merge tras pickle
+"""
+
+import pickle
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer, excel_sheet_names
+from access_log_analyzer.groupby import MAX_GROUP_KEYS, OTHER_KEY, GroupByAggregator, parse_group_by
+
+
+def test_parse_group_by():
+    assert parse_group_by('host, Status_Class') == (('host', None), ('status_class', None))
+    assert parse_group_by('prefix:2,subnet') == (('prefix', 2), ('subnet', 24))
+    assert parse_group_by('prefix,') == (('prefix', 1),)
+
+
+@pytest.mark.parametrize('value, message', [
+    ('host,pais', "Dimensión desconocida: 'pais'"),
+    ('host:2', "no acepta argumento"),
+    ('prefix:x', "Argumento inválido en 'prefix:x'"),
+    ('subnet:0', "Argumento inválido en 'subnet:0'"),
+    (' , ', "Agrupación vacía"),
+])
+def test_parse_group_by_rejects(value, message):
+    with pytest.raises(ValueError, match=message):
+        parse_group_by(value)
+
+
+def fields(line, method, path, status, hour='00:00'):
+    return {'line': line, 'endpoint': f'{method} {path}', 'method': method, 'path': path,
+            'status': status, 'hour': hour, 'is_cloudflare': True}
+
+
+def test_composite_keys(line):
+    aggregator = GroupByAggregator([parse_group_by('prefix:2,status_class'), parse_group_by('method')])
+    requests = [('GET', '/api/users/1', 200, 0.2), ('GET', '/api/users/2', 200, 1.2),
+                ('POST', '/api/users', 503, 0.4), ('GET', '/api/users/3', 499, 0.1), ('GET', '/health', 200, 0.01)]
+    for method, path, status, rt in requests:
+        aggregator.add(fields(line(5, method, path, status, rt), method, path, status), status, rt, 100)
+
+    rows = {(row['prefix2'], row['status_class']): row for row in aggregator.get_rows(0, [1.0])}
+    assert set(rows) == {('/api/users', '2xx'), ('/api/users', '5xx'), ('/api/users', '4xx'), ('/health', '2xx')}
+    users = rows[('/api/users', '2xx')]
+    assert (users['Requests'], users['Requests_Lentos'], users['Bytes']) == (2, 1, 200)
+    assert users['Porcentaje'] == pytest.approx(40)
+    assert rows[('/api/users', '4xx')]['Errores_499'] == 1
+    assert rows[('/api/users', '5xx')]['Errores_5xx'] == 1
+    assert {row['method']: row['Requests'] for row in aggregator.get_rows(1, [1.0])} == {'GET': 4, 'POST': 1}
+
+
+def test_overflow_goes_to_other_key(line):
+    aggregator = GroupByAggregator([parse_group_by('path,status')], max_keys=3)
+    for i in range(10):
+        path = f'/api/items/{i % 5}'
+        aggregator.add(fields(line(i, path=path), 'GET', path, 200), 200, 0.1, 0)
+
+    rows = aggregator.get_rows(0, [0.5])
+    keys = {(row['path'], row['status']): row['Requests'] for row in rows}
+    # Las claves ya vistas siguen sumando; solo las nuevas desbordan
+    assert keys == {('/api/items/0', 200): 2, ('/api/items/1', 200): 2, ('/api/items/2', 200): 2,
+                    (OTHER_KEY, OTHER_KEY): 4}
+    assert aggregator.overflow == [4]
+    assert MAX_GROUP_KEYS == GroupByAggregator([parse_group_by('host')]).max_keys
+
+
+def test_merge_after_pickle(line):
+    groups = [parse_group_by('endpoint'), parse_group_by('ua_class,status_class')]
+    single = GroupByAggregator(groups, max_keys=4)
+    # Los lotes del pipeline no limitan claves; el límite se aplica al unir en orden
+    first, second = GroupByAggregator(groups, max_keys=None), GroupByAggregator(groups, max_keys=None)
+    for i in range(12):
+        path = f'/api/e{i % 6}'
+        status = 500 if i % 4 == 0 else 200
+        args = (fields(line(i, path=path, status=status, ua='Googlebot/2.1' if i % 3 else 'okhttp/4.9.0'),
+                       'GET', path, status), status, 0.25 * (i % 8), 10)
+        single.add(*args)
+        (first if i < 4 else second).add(*args)
+
+    # Como en el pipeline: los parciales viajan serializados entre procesos
+    merged = GroupByAggregator(groups, max_keys=4)
+    for partial in (first, second):
+        merged.merge(pickle.loads(pickle.dumps(partial)))
+
+    for index in range(len(groups)):
+        assert merged.get_rows(index, [0.5]) == single.get_rows(index, [0.5])
+    assert merged.overflow == single.overflow == [4, 0]
+
+
+def test_excel_sheet_names_are_unique():
+    names = ['grupo_prefix2_x_status_class_x_host', 'grupo_prefix2_x_status_class_x_hour',
+             'grupo_prefix2_x_status_class_x_HOST_extra', 'resumen']
+    sheets = excel_sheet_names(names)
+
+    assert sheets['resumen'] == 'resumen'
+    assert sheets[names[0]] == names[0][:31]
+    assert sheets[names[1]] == names[1][:29] + '~2'
+    assert sheets[names[2]] == names[2][:29] + '~3'
+    assert all(len(sheet) <= 31 for sheet in sheets.values())
+
+
+def test_excel_export_keeps_every_group(tmp_path, log_lines):
+    pd = pytest.importorskip('pandas')
+    pytest.importorskip('openpyxl')
+    analyzer = ComprehensiveLogAnalyzer(
+        threshold=1.0, group_by=[parse_group_by('prefix:2,status_class,method'),
+                                 parse_group_by('prefix:2,status_class,hour')])
+    analyzer.feed(log_lines[:2000]).finalize()
+    analyzer.prepare_export_data()
+
+    filename = tmp_path / 'analysis.xlsx'
+    assert analyzer.export_to_excel(str(filename))
+    sheets = pd.read_excel(filename, sheet_name=None)
+    assert sum(1 for name in sheets if name.startswith('grupo_')) == 2
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Histogramas de latencia: percentiles exactos por conteo y conteos por umbral
+"""
+
+import random
+import statistics
+from collections import Counter
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.histogram import LatencyHistogram, percentile, quantile_from_counts
+
+
+@pytest.mark.parametrize('values', [
+    [0.5],
+    [0.1, 0.3],
+    [0.2, 0.2, 0.2, 0.9],
+    [round(random.Random(1).lognormvariate(-1, 1), 3) for _ in range(500)],
+    [round(random.Random(2).uniform(0, 5), 2) for _ in range(1001)],
+])
+def test_quantile_from_counts_matches_statistics(values):
+    counts = Counter(values)
+    for n in (4, 10, 100):
+        expected = statistics.quantiles(values, n=n) if len(values) > 1 else [values[0]] * (n - 1)
+        assert [quantile_from_counts(counts, n, i) for i in range(1, n)] == pytest.approx(expected, abs=1e-12)
+
+
+def test_quantile_from_counts_with_presorted_values():
+    counts = Counter({0.3: 5, 0.1: 2, 1.2: 1})
+    assert quantile_from_counts(counts, 100, 95, sorted_values=sorted(counts)) == \
+        quantile_from_counts(counts, 100, 95)
+    assert quantile_from_counts(Counter(), 100, 95) == 0.0
+
+
+def test_percentile_small_lists():
+    assert percentile([], 95) == 0.0
+    assert percentile([0.7], 95) == 0.7
+    assert percentile([0.1, 0.2, 0.3], 50) == statistics.quantiles([0.1, 0.2, 0.3], n=100)[49]
+
+
+@pytest.mark.parametrize('threshold', [0.25, 0.3, 0.75, 1, 2.5, 3])
+def test_count_above_is_exact_on_bucket_limits(threshold):
+    rng = random.Random(5)
+    values = [round(rng.lognormvariate(-0.5, 1.2), 3) for _ in range(5000)]
+    hist = LatencyHistogram()
+    for value in values:
+        hist.add(value)
+    assert hist.total == len(values)
+    assert hist.count_above(threshold) == sum(1 for value in values if value > threshold)
+
+
+def test_bucket_limits():
+    assert LatencyHistogram.bucket_upper(0.0004) == 0
+    assert LatencyHistogram.bucket_upper(0.999) == 999
+    assert LatencyHistogram.bucket_upper(1.001) == 1010
+    assert LatencyHistogram.bucket_upper(10.01) == 10100
+    assert LatencyHistogram.bucket_upper(100.2) == 101000
+    for upper in (999, 1010, 10100, 101000):
+        assert LatencyHistogram.bucket_upper((LatencyHistogram.bucket_lower(upper) + 1) / 1000) == upper
+
+
+def test_merge_and_apdex():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    for value in (0.1, 0.2, 0.6):
+        a.add(value)
+    for value in (1.5, 3.0):
+        b.add(value)
+    merged = LatencyHistogram().merge(a).merge(b)
+    assert merged.total == 5
+    assert merged.quantile(0.5) == 0.6
+    # T=0.5: 2 satisfechos, 2 tolerados (<= 2s), 1 frustrado
+    assert merged.apdex(0.5) == pytest.approx((2 + 2 / 2) / 5)
+    assert LatencyHistogram().apdex(0.5) is None
+
+
+def test_threshold_change_without_reparse(log_lines):
+    analyzer = ComprehensiveLogAnalyzer(threshold=[0.3, 1])
+    analyzer.feed(log_lines).finalize()
+    times = list(analyzer.response_time_counts.elements())
+
+    for threshold in (0.3, 1, 0.45):
+        assert analyzer.count_slow(threshold=threshold) == sum(1 for t in times if t > threshold)
+    assert analyzer.global_quantile(100, 95) == statistics.quantiles(times, n=100)[94]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+API de librería: feed() con iterables de str o bytes y get_aggregates()
+"""
+
+from access_log_analyzer import ComprehensiveLogAnalyzer
+
+
+def test_feed_str_and_bytes_give_same_aggregates(log_lines):
+    from_str = ComprehensiveLogAnalyzer(threshold=[0.5, 1])
+    # feed se puede llamar varias veces y acepta generadores
+    from_str.feed(log_lines[:7000]).feed(line for line in log_lines[7000:]).finalize()
+    from_bytes = ComprehensiveLogAnalyzer(threshold=[0.5, 1])
+    from_bytes.feed(line.encode('utf-8') + b'\n' for line in log_lines).finalize()
+
+    assert from_str.get_aggregates() == from_bytes.get_aggregates()
+
+
+def test_aggregates_match_the_fed_lines(line):
+    lines = [line(10, rt=0.2), line(20, rt=1.5, status=499), line(3600 + 5, path='/api/pay', rt=0.4, status=502),
+             'basura sin formato', '']
+    analyzer = ComprehensiveLogAnalyzer(threshold=1.0)
+    analyzer.feed(lines).finalize()
+
+    aggregates = analyzer.get_aggregates()
+    assert (aggregates['total_lines'], aggregates['parsed_lines']) == (5, 3)
+    assert aggregates['thresholds'] == [1.0]
+    assert aggregates['status_codes'] == {200: 1, 499: 1, 502: 1}
+    assert aggregates['cloudflare'] == {'cloudflare': 3, 'direct': 0}
+    assert aggregates['hourly']['00:00'] == {'total': 2, 'error_499': 1, 'cloudflare': 2, 'slow': 1}
+    assert aggregates['hourly']['01:00']['slow'] == 0
+    catalog = aggregates['endpoints']['GET /api/catalog']
+    assert (catalog['total'], catalog['slow'], catalog['errors_499']) == (2, 1, 1)
+    assert aggregates['endpoints_by_code'][502] == {'GET /api/pay': 1}
+    assert aggregates['first_timestamp'].startswith('25/Sep/2025:00:00:10')
+
+
+def test_auto_threshold_after_finalize(log_lines):
+    analyzer = ComprehensiveLogAnalyzer()
+    analyzer.feed(log_lines).finalize()
+
+    aggregates = analyzer.get_aggregates()
+    assert aggregates['thresholds'] == [analyzer.suggest_threshold()]
+    assert sum(hour['slow'] for hour in aggregates['hourly'].values()) == analyzer.count_slow()
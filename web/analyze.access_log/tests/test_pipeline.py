@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline por lotes (-j N): mismo resultado que la corrida secuencial
+"""
+
+import io
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.pipeline import read_batches, run_pipeline
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OPTIONS = dict(threshold=[0.5, 1], concurrency=True, anomalies=True, retries=True, user_agents=True,
+               bandwidth=True)
+
+
+def run_both(lines, batch_size=64 * 1024, workers=2):
+    serial = ComprehensiveLogAnalyzer(**OPTIONS)
+    serial.feed(lines).finalize()
+    parallel = ComprehensiveLogAnalyzer(workers=workers, **OPTIONS)
+    data = ('\n'.join(lines) + '\n').encode('utf-8')
+    run_pipeline(parallel, io.BytesIO(data), workers, batch_size=batch_size)
+    parallel.finalize()
+    return serial, parallel
+
+
+def assert_same_exports(serial, parallel):
+    serial.prepare_export_data()
+    parallel.prepare_export_data()
+    expected, actual = dict(serial.export_data), dict(parallel.export_data)
+    # Los ejemplos son un muestreo aleatorio por lote
+    expected.pop('ejemplos_lentos')
+    actual.pop('ejemplos_lentos')
+    assert actual.keys() == expected.keys()
+    assert {'concurrencia_minuto', 'anomalias', 'reintentos_endpoints', 'ua_clases',
+            'ancho_banda_endpoints'} <= expected.keys()
+    for name, rows in expected.items():
+        # Las sumas de tiempos se acumulan en otro orden: solo difieren en los últimos bits
+        assert actual[name] == [pytest.approx(row, rel=1e-12) for row in rows], name
+
+
+def test_read_batches_end_on_line_boundaries():
+    data = b''.join(b'line %d\n' % i for i in range(1000)) + b'tail'
+    batches = list(read_batches(io.BytesIO(data), batch_size=100))
+    assert len(batches) > 10
+    assert all(batch.endswith(b'\n') for batch in batches[:-1])
+    assert b''.join(batches) == data
+
+
+def test_parallel_matches_serial(log_lines):
+    serial, parallel = run_both(log_lines)
+
+    assert_same_exports(serial, parallel)
+    assert parallel.concurrency.late_requests == serial.concurrency.late_requests
+    assert parallel.concurrency.overall.peak == serial.concurrency.overall.peak
+    assert parallel.anomalies.evaluated_minutes == serial.anomalies.evaluated_minutes
+    assert parallel.retries.pending == serial.retries.pending
+    assert parallel.user_agents.cache_stats()[0] > 0
+
+
+def test_parallel_matches_serial_with_local_disorder(log_lines):
+    """nginx escribe al terminar: el log llega desordenado por unos segundos"""
+    rng = random.Random(4)
+    lines = list(log_lines)
+    for start in range(0, len(lines), 5):
+        window = lines[start:start + 5]
+        rng.shuffle(window)
+        lines[start:start + 5] = window
+    serial, parallel = run_both(lines, batch_size=32 * 1024, workers=3)
+
+    assert_same_exports(serial, parallel)
+    assert parallel.concurrency.late_requests == serial.concurrency.late_requests
+
+
+def test_retry_chain_across_batches(line):
+    """Una cadena de reintentos que cruza el corte de lote conserva su largo y su tormenta"""
+    lines = [line(i, path='/pay', status=200, rt=0.05, ip=f"10.0.0.{i % 200}") for i in range(400)]
+    for k in range(6):
+        lines.append(line(400 + 2 * k, path='/pay', status=502, rt=0.1, ip='10.9.9.9'))
+    lines.append(line(413, path='/pay', status=200, rt=0.1, ip='10.9.9.9'))
+    serial, parallel = run_both(lines, batch_size=len('\n'.join(lines[:403])))
+
+    rows = parallel.retries.get_endpoint_rows()
+    assert rows == serial.retries.get_endpoint_rows()
+    assert (rows[0]['Reintentos'], rows[0]['Tormentas'], rows[0]['Cadena_Maxima']) == (6, 1, 6)
+
+
+@pytest.mark.parametrize('workers', ['0', '-1', 'dos'])
+def test_cli_rejects_invalid_workers(log_file, workers):
+    result = subprocess.run([sys.executable, 'web.analyze.access_log.py', str(log_file), '-j', workers],
+                            cwd=PACKAGE_DIR, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert f"Cantidad de procesos inválida: '{workers}' (usa N >= 1)" in result.stderr
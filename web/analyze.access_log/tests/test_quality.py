@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Calidad del parseo: contadores por motivo, tope de ejemplos y cuarentena de bytes crudos
+"""
+
+import io
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.pipeline import run_pipeline
+from access_log_analyzer.quality import ParseQuality
+
+# Línea malformada con un byte que no es UTF-8 válido
+BROKEN = b'basura \xff\xfe sin formato'
+
+
+def mixed_lines(line):
+    lines = [line(i) for i in range(10)]
+    lines += ['sin request status=200 rt=0.1'] * 7
+    lines += ['"GET /api/x HTTP/1.1" rt=0.1'] * 3
+    lines += ['', '   ']
+    lines.append('"GET /api/y HTTP/1.1" status=200 ')
+    return lines
+
+
+def test_counters_per_reason(line):
+    analyzer = ComprehensiveLogAnalyzer(threshold=1.0)
+    analyzer.feed(mixed_lines(line)).finalize()
+
+    quality = analyzer.quality
+    assert quality.rejected == {'sin_request': 7, 'sin_status': 3, 'linea_vacia': 2}
+    assert quality.warnings['sin_rt'] == 1 and quality.warnings['sin_timestamp'] == 1
+    assert quality.total_rejected == 12
+    assert analyzer.parsed_lines == 11
+
+    rows = {row['Metrica']: row for row in quality.get_summary_rows(23)}
+    assert rows['Lineas rechazadas']['Valor'] == 12
+    assert rows['Rechazadas - Sin status=NNN']['Porcentaje'] == '13.0%'
+
+
+def test_examples_are_capped_per_reason():
+    quality = ParseQuality(examples=5)
+    for i in range(12):
+        quality.reject('sin_request', f'linea {i}\n')
+    quality.reject('sin_status', 'otra\r\n')
+
+    assert quality.samples['sin_request'] == [f'linea {i}' for i in range(5)]
+    rows = quality.get_example_rows()
+    assert [(row['Motivo'], row['Ejemplo']) for row in rows] == (
+        [('sin_request', i) for i in range(1, 6)] + [('sin_status', 1)])
+
+    other = ParseQuality(examples=5)
+    for i in range(3):
+        other.reject('sin_status', f'lote {i}')
+    quality.merge(other)
+    assert quality.samples['sin_status'] == ['otra', 'lote 0', 'lote 1', 'lote 2']
+    assert quality.rejected['sin_status'] == 4
+
+
+def test_quarantine_writes_raw_bytes(tmp_path, line):
+    log_file = tmp_path / 'access.log'
+    log_file.write_bytes(line(1).encode() + b'\n' + BROKEN + b'\n\n' + line(2).encode() + b'\n')
+    quarantine = tmp_path / 'cuarentena.log'
+
+    analyzer = ComprehensiveLogAnalyzer(log_file=str(log_file), threshold=1.0, quarantine_file=str(quarantine))
+    assert analyzer.parse_log()
+    analyzer.close()
+
+    # Solo las malformadas (no las vacías), con los bytes originales
+    assert quarantine.read_bytes() == BROKEN + b'\n'
+    assert analyzer.quality.quarantined == 1
+    assert analyzer.quality.samples['sin_request'] == ['basura  sin formato']
+
+
+def test_quarantine_from_pipeline(tmp_path, line):
+    lines = [line(i).encode() for i in range(2000)]
+    lines[500] = lines[1500] = BROKEN
+    quarantine = tmp_path / 'cuarentena.log'
+    analyzer = ComprehensiveLogAnalyzer(threshold=1.0, quarantine_file=str(quarantine), workers=2)
+    run_pipeline(analyzer, io.BytesIO(b'\n'.join(lines) + b'\n'), 2, batch_size=16 * 1024)
+    analyzer.close()
+
+    assert quarantine.read_bytes() == BROKEN + b'\n' + BROKEN + b'\n'
+    assert analyzer.quality.rejected == {'sin_request': 2}
+
+
+def test_sample_mode_uses_sampled_lines_as_denominator(line, capsys):
+    lines = [line(i) for i in range(4000)] + [f'sin request {i} status=200' for i in range(1000)]
+    analyzer = ComprehensiveLogAnalyzer(threshold=1.0, sample_rate=0.2)
+    analyzer.feed(lines).finalize()
+
+    rejected = analyzer.quality.total_rejected
+    assert 0 < rejected < 1000
+    expected = f"{rejected / analyzer.sampled_lines * 100:.1f}%"
+    assert analyzer.examined_lines == analyzer.sampled_lines < analyzer.total_lines
+    rows = {row['Metrica']: row for row in analyzer._get_processing_stats()}
+    assert rows['Lineas rechazadas']['Porcentaje'] == expected
+    analyzer.quality.print_summary(analyzer.examined_lines)
+    assert f"({expected})" in capsys.readouterr().out
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Reintentos por (realip, endpoint): bordes de la ventana, claves que se limpian, TTL y expulsión por max_keys
+"""
+
+import pytest
+
+from access_log_analyzer.analyzer import AUTO_THRESHOLD_MIN, ComprehensiveLogAnalyzer
+from access_log_analyzer.retries import STORM_CHAIN, RetryDetector
+
+EP = 'GET /api/pay'
+
+
+def fail(detector, epoch, client='1.1.1.1', status=502, rt=0.1):
+    return detector.add(epoch, client, EP, '00:00', status, rt)
+
+
+@pytest.mark.parametrize('start, is_retry', [
+    # El request empieza (timestamp - rt) respecto al fin del fallido, en 100
+    (99.0, True),     # gap = -1: tolerancia por la resolución de 1s
+    (98.5, False),    # gap < -1
+    (110.0, True),    # gap = window
+    (110.5, False),   # gap > window
+])
+def test_window_edges(start, is_retry):
+    detector = RetryDetector(1.0, window=10)
+    fail(detector, 100)
+    chain = detector.add(start + 0.5, '1.1.1.1', EP, '00:00', 200, 0.5)
+
+    assert chain == (1 if is_retry else 0)
+    assert detector.by_endpoint[EP].retries == (1 if is_retry else 0)
+
+
+def test_triggers_and_chain():
+    detector = RetryDetector(1.0, window=10)
+    assert fail(detector, 100, status=499) == 0
+    assert fail(detector, 102, status=503) == 1
+    assert fail(detector, 104, status=200, rt=1.5) == 2
+    assert fail(detector, 106, status=200, rt=0.1) == 3
+
+    stats = detector.by_endpoint[EP]
+    assert (stats.requests, stats.failures, stats.retries) == (4, 3, 3)
+    assert dict(stats.by_trigger) == {'499': 1, '5xx': 1, 'lento': 1}
+    assert stats.storms == 1 and stats.max_chain == STORM_CHAIN
+    assert stats.amplification == pytest.approx(4 / 1)
+
+
+def test_good_response_clears_the_key():
+    detector = RetryDetector(1.0, window=10)
+    fail(detector, 100)
+    assert fail(detector, 102, status=200) == 1
+    assert ('1.1.1.1', EP) not in detector.pending
+    # Sin fallo pendiente, el siguiente request no es reintento
+    assert fail(detector, 104, status=200) == 0
+    assert detector.by_endpoint[EP].retries == 1
+
+
+def test_ttl_expiry():
+    detector = RetryDetector(1.0, window=10)
+    fail(detector, 100, client='a')
+    fail(detector, 111, client='b')
+    assert list(detector.pending) == [('a', EP), ('b', EP)]
+    # El fallo de 'a' queda más de window + 1 antes del último fallo visto
+    fail(detector, 112, client='c')
+    assert list(detector.pending) == [('b', EP), ('c', EP)]
+    assert detector.evicted == 0
+
+    # Aunque llegue dentro de su propia ventana, la clave vencida ya no cuenta
+    assert detector.add(109.5, 'a', EP, '00:00', 200, 0.1) == 0
+
+
+def test_max_keys_eviction():
+    detector = RetryDetector(1.0, window=10, max_keys=3)
+    for i in range(5):
+        fail(detector, 100, client=f'c{i}')
+
+    # Las más viejas salen antes de vencer y se cuentan como expulsadas
+    assert list(detector.pending) == [(f'c{i}', EP) for i in (2, 3, 4)]
+    assert detector.evicted == 2
+    assert fail(detector, 102, client='c0', status=200) == 0
+    assert fail(detector, 102, client='c4', status=200) == 1
+
+
+def test_streaming_threshold(line, capsys):
+    fixed = ComprehensiveLogAnalyzer(threshold=[1.2, 2], retries=True)
+    assert fixed.retries.slow_threshold == 1.2
+
+    auto = ComprehensiveLogAnalyzer(retries=True)
+    auto.feed([line(i, rt=0.1, status=502 if i % 3 else 200) for i in range(300)]).finalize()
+    assert auto.retries.slow_threshold == AUTO_THRESHOLD_MIN
+    auto.retries.print_report(auto.threshold)
+    assert 'corte en streaming' not in capsys.readouterr().out
+    auto.retries.print_report(1.2)
+    assert 'usan > 0.5s (corte en streaming), no el umbral del reporte (1.2s)' in capsys.readouterr().out
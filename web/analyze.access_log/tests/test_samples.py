@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Ejemplos de requests lentos, 499 y 5xx: reservoirs por endpoint y top global
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from access_log_analyzer.samples import SlowRequestSampler, _Reservoir
+
+
+def test_max_endpoints_bounds_reservoirs():
+    sampler = SlowRequestSampler(size=5, top=3, slow_bands=[0.5], max_endpoints=2)
+    for i in range(10):
+        sampler.add(f'GET /api/users/{i}', 502, 1.0 + i / 10, f'linea {i}')
+    # Requests rápidos y sin error no cuentan contra el límite
+    sampler.add('GET /api/fast', 200, 0.1, 'rápida')
+
+    assert sampler.endpoints == {'GET /api/users/0', 'GET /api/users/1'}
+    assert {endpoint for endpoint, _ in sampler.reservoirs} == sampler.endpoints
+    assert sampler.ignored_requests == 8
+    # El top global sigue viendo todos los endpoints
+    assert [row['Endpoint'] for row in sampler.get_rows(0.5)[:3]] == [
+        'GET /api/users/9', 'GET /api/users/8', 'GET /api/users/7']
+
+
+def test_reservoir_size_and_uniformity():
+    rng = random.Random(5)
+    hits = Counter()
+    for _ in range(3000):
+        reservoir = _Reservoir()
+        for item in range(100):
+            reservoir.add(item, 10, rng)
+        assert len(reservoir.items) == 10 and reservoir.seen == 100
+        hits.update(reservoir.items)
+
+    # Cada elemento entra con probabilidad 10/100
+    assert set(hits) == set(range(100))
+    assert all(0.08 < count / 3000 < 0.12 for count in hits.values())
+
+    small = _Reservoir()
+    for item in range(3):
+        small.add(item, 10, rng)
+    assert small.items == [0, 1, 2]
+
+
+def test_reservoir_merge_in_proportion_to_seen():
+    rng = random.Random(6)
+    from_first = 0
+    for _ in range(2000):
+        first, second = _Reservoir(), _Reservoir()
+        for item in range(60):
+            first.add(('a', item), 10, rng)
+        for item in range(40):
+            second.add(('b', item), 10, rng)
+        first.merge(second, 10, rng)
+        assert len(first.items) == 10 and first.seen == 100
+        from_first += sum(1 for source, _ in first.items if source == 'a')
+
+    assert from_first / 20000 == pytest.approx(0.6, abs=0.02)
+
+
+def test_slow_bands_with_auto_threshold():
+    sampler = SlowRequestSampler(size=50, slow_bands=[0.5, 1.0, 1.5, 2.0, 3.0])
+    times = [0.2, 0.5, 0.7, 1.0, 1.2, 1.4, 1.6, 2.5, 4.0, 4.0]
+    for i, rt in enumerate(times):
+        sampler.add('GET /a', 200, rt, f'linea {i}')
+
+    # Candidatos: solo por encima de la primera banda
+    assert sum(r.seen for r in sampler.slow_reservoirs.values()) == 8
+    assert sorted(band for _, band in sampler.slow_reservoirs) == [0, 1, 2, 3, 4]
+    for threshold in (0.5, 1.2, 1.5, 3.0):
+        items, seen = sampler.get_slow_sample('GET /a', threshold)
+        expected = [rt for rt in times if rt > threshold]
+        assert sorted(rt for rt, _, _ in items) == expected
+        assert seen == len(expected)
+    assert sampler.get_slow_sample('GET /a', 5.0) == ([], 0)
+
+
+def test_slow_sample_is_capped_at_size():
+    sampler = SlowRequestSampler(size=10, slow_bands=[0.5, 1.0, 2.0])
+    for i in range(300):
+        sampler.add('GET /a', 200, 0.6 + (i % 30) / 10, f'linea {i}')
+
+    items, seen = sampler.get_slow_sample('GET /a', 0.5)
+    assert len(items) == 10 and seen == 300
+    rows = [row for row in sampler.get_rows(0.5) if row['Tipo'] == 'lento']
+    assert len(rows) == 10 and all(row['Candidatos'] == 300 for row in rows)
+
+
+def test_top_heap_keeps_slowest_in_order():
+    rng = random.Random(7)
+    times = [round(rng.uniform(0, 5), 3) for _ in range(500)]
+    sampler = SlowRequestSampler(top=50)
+    for i, rt in enumerate(times):
+        sampler.add(f'GET /e{i % 7}', 200, rt, f'linea {i}')
+
+    top = [row for row in sampler.get_rows(1.0) if row['Tipo'].startswith('top_')]
+    assert [row['Tipo'] for row in top] == [f'top_{rank}' for rank in range(1, 51)]
+    assert [row['RT'] for row in top] == sorted(times, reverse=True)[:50]
+
+
+def test_top_heap_ties_keep_earlier_request_and_merge():
+    single, first, second = (SlowRequestSampler(top=3) for _ in range(3))
+    requests = [(2.0, 'a'), (1.0, 'b'), (2.0, 'c'), (2.0, 'd'), (3.0, 'e')]
+    for i, (rt, line) in enumerate(requests):
+        single.add('GET /a', 200, rt, line)
+        (first if i < 2 else second).add('GET /a', 200, rt, line)
+    first.merge(second)
+
+    for sampler in (single, first):
+        top = [row['Linea'] for row in sampler.get_rows(0.5) if row['Tipo'].startswith('top_')]
+        assert top == ['e', 'a', 'c']
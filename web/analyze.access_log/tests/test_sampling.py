@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Modo aproximado: muestra determinista, total exacto e intervalos de confianza
+"""
+
+import math
+import random
+import statistics
+from collections import Counter
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.sampling import (Z_95, LineSampler, mean_interval, parse_rate, proportion_interval,
+                                          quantile_interval, scaled_interval)
+
+
+def test_parse_rate():
+    assert parse_rate('0.01') == 0.01
+    assert parse_rate('5%') == 0.05
+    assert parse_rate(1) == 1
+    for value in ('0', '1.5', '-1%'):
+        with pytest.raises(ValueError):
+            parse_rate(value)
+
+
+def test_sampler_is_deterministic(log_lines):
+    raw = [line.encode('utf-8') for line in log_lines]
+    first = [line for line in raw if LineSampler(0.1).selected(line)]
+    assert first == [line for line in raw if LineSampler(0.1).selected(line)]
+    # Una tasa mayor contiene a la menor (mismo hash, umbral más alto)
+    assert set(first) <= {line for line in raw if LineSampler(0.3).selected(line)}
+    assert 0.08 < len(first) / len(raw) < 0.12
+
+
+def test_proportion_interval_formula():
+    p, margin = proportion_interval(30, 200, 0.1)
+    assert p == 0.15
+    assert margin == pytest.approx(Z_95 * math.sqrt(0.15 * 0.85 / 200 * 0.9))
+    # Con toda la población no hay error de muestreo
+    assert proportion_interval(30, 200, 1) == (0.15, 0.0)
+    assert proportion_interval(0, 0, 0.1) == (0.0, 0.0)
+
+
+def test_scaled_interval_uses_exact_total():
+    estimate, margin = scaled_interval(30, 200, 2000, 0.1)
+    p, p_margin = proportion_interval(30, 200, 0.1)
+    assert estimate == pytest.approx(2000 * p)
+    assert margin == pytest.approx(2000 * p_margin)
+    assert scaled_interval(200, 200, 2000, 0.1) == (2000.0, 0.0)
+
+
+def test_mean_interval():
+    counts = Counter({0.1: 3, 0.5: 1, 2.0: 1})
+    values = list(counts.elements())
+    mean, margin = mean_interval(counts, 0.2)
+    assert mean == pytest.approx(statistics.mean(values))
+    assert margin == pytest.approx(Z_95 * statistics.stdev(values) / math.sqrt(len(values)) * math.sqrt(0.8))
+    assert mean_interval(Counter({0.3: 1}), 0.2) == (0.3, 0.0)
+
+
+def test_quantile_interval_covers_population_quantile():
+    """El intervalo por estadísticos de orden cubre el p95 real en ~95% de las muestras"""
+    rng = random.Random(9)
+    population = [round(rng.lognormvariate(-1, 1), 3) for _ in range(20000)]
+    true_p95 = statistics.quantiles(population, n=100)[94]
+    trials, covered = 200, 0
+    for _ in range(trials):
+        sample = Counter(rng.sample(population, 1000))
+        estimate, low, high = quantile_interval(sample, 0.95)
+        assert low <= estimate <= high
+        covered += low <= true_p95 <= high
+    assert covered / trials >= 0.9
+
+
+def test_estimates_report_exact_total(log_lines):
+    full = ComprehensiveLogAnalyzer(threshold=0.5)
+    full.feed(log_lines).finalize()
+    sampled = ComprehensiveLogAnalyzer(threshold=0.5, sample_rate=0.1)
+    sampled.feed(log_lines).finalize()
+    rows = {row['Metrica']: row for row in sampled.get_sampling_estimates()}
+
+    total = rows['Líneas totales (exacto)']
+    assert total['Estimacion'] == len(log_lines)
+    assert total['Margen_95'] == 0 and total['Muestra'] == sampled.sampled_lines
+    # Todas las líneas sintéticas son válidas: la fracción es 1 y no hay margen
+    assert rows['Requests válidos']['Estimacion'] == pytest.approx(len(log_lines))
+
+    truth = {'Requests lentos (> 0.5s)': full.count_slow(), 'Errores 499': full.status_codes[499]}
+    for metric, value in truth.items():
+        row = rows[metric]
+        assert row['Inferior'] <= value <= row['Superior'], metric
+        assert row['Estimacion'] == pytest.approx(len(log_lines) * row['Muestra'] / sampled.sampled_lines)
+
+    by_endpoint = {row['Endpoint']: row for row in sampled.get_sampling_endpoint_estimates()}
+    assert sum(row['Requests_Estimados'] for row in by_endpoint.values()) == pytest.approx(len(log_lines), abs=50)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+SLOs: configuración, presupuesto de error y alertas de burn rate multiventana
+"""
+
+import pytest
+
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.slo import SLOTracker, load_slo_config, parse_slo_config
+
+# 2025-09-25 06:00:00 UTC, inicio de minuto
+START = 1758780000
+
+
+def tracker_for(*entries, **limits):
+    return SLOTracker(**parse_slo_config(dict(limits, slos=list(entries))))
+
+
+def feed(tracker, minutes, per_minute=10, bad_every=None, start_minute=0, endpoint='GET /api/catalog'):
+    """`per_minute` requests por minuto; uno de cada `bad_every` es un 502"""
+    n = 0
+    for minute in range(start_minute, start_minute + minutes):
+        for k in range(per_minute):
+            n += 1
+            status = 502 if bad_every and n % bad_every == 0 else 200
+            tracker.add(START + minute * 60 + k, endpoint, status, 0.1)
+    return start_minute + minutes
+
+
+def test_config_defaults_and_patterns():
+    settings = parse_slo_config({'slos': [{'endpoint': 'GET /api/*', 'objective': 99.5},
+                                          {'name': 'lat', 'endpoint': ['GET /a', 'POST /b'], 'latency': 0.3,
+                                           'objective': 99}]})
+
+    assert (settings['fast_burn'], settings['slow_burn']) == (14.4, 1.0)
+    first, second = settings['slos']
+    assert (first.name, first.patterns, first.kind) == ('slo_1', ('GET /api/*',), 'disponibilidad')
+    assert first.objective == pytest.approx(0.995)
+    assert second.patterns == ('GET /a', 'POST /b') and second.latency == 0.3
+    assert first.matches('GET /api/catalog') and not first.matches('POST /api/catalog')
+
+
+@pytest.mark.parametrize('config', [
+    {},
+    {'slos': []},
+    {'slos': ['GET /a']},
+    {'slos': [{'endpoint': '', 'objective': 99}]},
+    {'slos': [{'endpoint': 'GET /a', 'objective': 100}]},
+    {'slos': [{'endpoint': 'GET /a', 'objective': True}]},
+    {'slos': [{'endpoint': 'GET /a', 'objective': 99, 'latency': 0}]},
+    {'slos': [{'endpoint': 'GET /a', 'objective': 99}], 'fast_burn': '14'},
+])
+def test_invalid_config(config):
+    with pytest.raises(ValueError):
+        parse_slo_config(config)
+
+
+def test_invalid_json(tmp_path):
+    path = tmp_path / 'slos.json'
+    path.write_text('{"slos": [', encoding='utf-8')
+    with pytest.raises(ValueError, match='JSON inválido'):
+        load_slo_config(str(path))
+
+
+def test_bad_requests_by_slo_type():
+    tracker = tracker_for({'name': 'disp', 'endpoint': 'GET /api/*', 'objective': 99},
+                          {'name': 'lat', 'endpoint': 'GET /api/*', 'latency': 0.3, 'objective': 99})
+    for status, rt in ((200, 0.1), (200, 0.5), (404, 0.1), (499, 0.1), (503, 0.1)):
+        tracker.add(START, 'GET /api/a', status, rt)
+    # No coincide con ningún patrón
+    tracker.add(START, 'POST /api/a', 503, 2.0)
+
+    availability, latency = tracker.evaluate()
+    assert (availability['requests'], availability['bad']) == (5, 2)
+    assert (latency['requests'], latency['bad']) == (5, 3)
+    assert latency['worst_endpoint'] == ('GET /api/a', 3)
+
+
+def test_clean_traffic_is_ok():
+    tracker = tracker_for({'endpoint': 'GET /api/*', 'objective': 99.9})
+    feed(tracker, 120)
+
+    result, = tracker.evaluate()
+    assert result['status'] == 'OK'
+    assert result['compliance'] == 1.0 and result['budget_consumed'] == 0.0
+    assert all(rate == 0.0 for rate in result['burn'].values())
+    assert tracker.violations() == [] and tracker.get_alert_rows() == []
+
+
+def test_fast_burn_at_the_end_of_the_log():
+    """40h limpias y 10 minutos con todo malo: quema rápida sin agotar el presupuesto"""
+    tracker = tracker_for({'name': 'api', 'endpoint': 'GET /api/*', 'objective': 99})
+    minute = feed(tracker, 40 * 60)
+    feed(tracker, 10, bad_every=1, start_minute=minute)
+
+    result, = tracker.evaluate()
+    assert (result['requests'], result['bad']) == (24100, 100)
+    assert result['compliance'] >= 0.99
+    assert result['budget_consumed'] == pytest.approx(100 / (0.01 * 24100))
+    # 5m: todo malo; 1h: 100 malos de 600
+    assert result['burn']['5m'] == pytest.approx(100)
+    assert result['burn']['1h'] == pytest.approx(100 / 600 / 0.01)
+    assert result['status'] == 'QUEMA RÁPIDA'
+    assert [r['slo'].name for r in tracker.violations()] == ['api']
+
+    # La ventana de 1h supera 14.4 desde el 9no minuto malo (9 × 10 / 600 / 0.01 = 15)
+    alert, = tracker.get_alert_rows()
+    assert (alert['Alerta'], alert['Minutos']) == ('quema rápida', 2)
+    row, = tracker.get_rows()
+    assert (row['Minutos_Quema_Rapida'], row['Minutos_Quema_Lenta']) == (2, 0)
+
+
+def test_slow_burn_without_fast_burn():
+    """0.5% de malos con objetivo 99.9: burn 5 sostenido, por debajo de 14.4"""
+    tracker = tracker_for({'endpoint': 'GET /api/*', 'objective': 99.9})
+    feed(tracker, 8 * 60, bad_every=200)
+
+    result, = tracker.evaluate()
+    assert result['burn']['6h'] == pytest.approx(5)
+    assert result['burn']['3d'] == pytest.approx(5)
+    assert result['episodes']['rapida'] == []
+    episode, = result['episodes']['lenta']
+    assert episode['end'] == (START // 60) + 8 * 60 - 1
+    assert result['status'] == 'INCUMPLE'
+
+
+def test_custom_limits():
+    tracker = tracker_for({'endpoint': 'GET /api/*', 'objective': 99.9}, fast_burn=4, slow_burn=10)
+    feed(tracker, 8 * 60, bad_every=200)
+
+    result, = tracker.evaluate()
+    assert result['episodes']['rapida'] and not result['episodes']['lenta']
+
+
+def test_merge_matches_single_tracker():
+    slo = {'endpoint': 'GET /api/*', 'latency': 0.3, 'objective': 99}
+    single, even, odd = tracker_for(slo), tracker_for(slo), tracker_for(slo)
+    for second in range(0, 90 * 60, 20):
+        status, rt = 502 if second % 7 == 0 else 200, second % 5 / 10
+        single.add(START + second, 'GET /api/a', status, rt)
+        # Los lotes comparten minutos: sus celdas se suman
+        (even if second // 20 % 2 == 0 else odd).add(START + second, 'GET /api/a', status, rt)
+    even.merge(odd)
+
+    assert even.get_rows() == single.get_rows()
+    assert even.get_alert_rows() == single.get_alert_rows()
+
+
+def test_analyzer_feeds_matching_requests(log_lines):
+    config = parse_slo_config({'slos': [{'name': 'checkout', 'endpoint': 'POST /api/checkout', 'objective': 99}]})
+    analyzer = ComprehensiveLogAnalyzer(threshold=0.5, slo=config)
+    analyzer.feed(log_lines).finalize()
+
+    result, = analyzer.slo.evaluate()
+    checkout = [line for line in log_lines if '"POST /api/checkout' in line]
+    errors = [line for line in checkout if 'status=499' in line or 'status=502' in line]
+    assert (result['requests'], result['bad']) == (len(checkout), len(errors))
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Agregados por endpoint: estadísticos exactos, spill a disco y memoria acotada
+"""
+
+import os
+import random
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+import pytest
+
+from access_log_analyzer import storage
+from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer
+from access_log_analyzer.histogram import quantile_from_counts
+from access_log_analyzer.storage import EndpointStats, RequestStore
+
+from conftest import make_line
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_moments_match_statistics():
+    rng = random.Random(3)
+    times = [round(rng.lognormvariate(-1, 1), 3) for _ in range(3000)]
+    stats = EndpointStats()
+    for i, rt in enumerate(times):
+        stats.add(200 if i % 10 else 499, rt, f"{i % 24:02d}:00", i % 3 == 0)
+
+    mean, stdev = stats.moments()
+    assert mean == statistics.mean(times)
+    assert stdev == pytest.approx(statistics.stdev(times), rel=1e-15)
+    assert stats.count == len(times)
+    assert stats.status[499] == 300
+    assert sum(cell.count for cell in stats.cells.values()) == len(times)
+    assert quantile_from_counts(stats.times, 100, 95) == statistics.quantiles(times, n=100)[94]
+
+
+def test_moments_small():
+    assert EndpointStats().moments() == (0.0, 0.0)
+    one = EndpointStats()
+    one.add(200, 0.25, '00:00', False)
+    assert one.moments() == (0.25, 0.0)
+
+
+def test_dump_load_roundtrip():
+    stats = EndpointStats()
+    for rt, status in ((0.1, 200), (0.1, 200), (1.234, 502), (0.3, 499)):
+        stats.add(status, rt, '10:00', status == 200)
+    endpoint, loaded = EndpointStats.load(stats.dump('GET /á'))
+
+    assert endpoint == 'GET /á'
+    for name in ('count', 'cloudflare', 'times', 'status', 'hours'):
+        assert getattr(loaded, name) == getattr(stats, name)
+    assert loaded.cells.keys() == stats.cells.keys()
+    for key, cell in stats.cells.items():
+        assert (loaded.cells[key].count, loaded.cells[key].max) == (cell.count, cell.max)
+        assert dict(loaded.cells[key].hist.counts) == dict(cell.hist.counts)
+
+
+def test_spill_keeps_order_and_merges_chunks(tmp_path):
+    store = RequestStore(max_memory=1, tmp_dir=str(tmp_path))
+    store.add('GET /b', 200, 0.2, '00:00', False)
+    store.add('GET /a', 200, 0.1, '00:00', False)
+    store.spill()
+    store.add('GET /a', 502, 0.4, '01:00', True)
+    store.spill()
+    store.add('GET /c', 200, 0.3, '02:00', False)
+    store.add('GET /a', 200, 0.1, '02:00', False)
+
+    assert list(store) == ['GET /b', 'GET /a', 'GET /c']
+    merged = dict(store.items())
+    assert merged['GET /a'].count == 3
+    assert merged['GET /a'].times == {0.1: 2, 0.4: 1}
+    assert merged['GET /a'].status == {200: 2, 502: 1}
+    assert store.spills == 2 and store.spilled == 3
+    store.close()
+    assert not os.listdir(tmp_path)
+
+
+def test_spilled_output_matches_in_memory(log_lines, tmp_path, monkeypatch):
+    memory = ComprehensiveLogAnalyzer(threshold=[0.5, 1])
+    memory.feed(log_lines).finalize()
+
+    # Revisar el RSS cada 1000 requests con un presupuesto que siempre se supera
+    monkeypatch.setattr(storage, 'CHECK_EVERY', 1000)
+    spilled = ComprehensiveLogAnalyzer(threshold=[0.5, 1], max_memory=1, tmp_dir=str(tmp_path))
+    spilled.feed(log_lines).finalize()
+
+    assert spilled.endpoints.spills >= 1
+    assert spilled.get_endpoint_details() == memory.get_endpoint_details()
+    memory.prepare_export_data()
+    spilled.prepare_export_data()
+    assert spilled.export_data['detalle_endpoints']
+    assert spilled.export_data == memory.export_data
+    spilled.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='mide el RSS pico con /proc/self/status')
+def test_many_endpoints_stay_under_cap(tmp_path):
+    """~38k endpoints distintos: sin límite el proceso pasa de 200 MiB; con el límite,
+    parseo, reportes y exportación CSV quedan por debajo"""
+    cap = 64 * 1024 ** 2
+    rng = random.Random(11)
+    path = tmp_path / 'users.log'
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(60000):
+            f.write(make_line(i * 14400 // 60000, 'GET', f'/api/users/{rng.randint(1, 60000)}',
+                              rng.choice([200, 200, 200, 499, 502]), round(rng.lognormvariate(-1, 0.8), 3),
+                              ip=f"187.1.1.{rng.randint(1, 200)}") + "\n")
+
+    script = (
+        "import contextlib, io, sys\n"
+        "from access_log_analyzer.analyzer import ComprehensiveLogAnalyzer\n"
+        "analyzer = ComprehensiveLogAnalyzer(sys.argv[1], 0.5, max_memory=int(sys.argv[2]), tmp_dir=sys.argv[3])\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    analyzer.parse_log()\n"
+        "    analyzer.generate_comprehensive_report()\n"
+        "    analyzer.prepare_export_data()\n"
+        "    analyzer.export_to_csv(sys.argv[3])\n"
+        # ru_maxrss hereda el pico de pytest a través del exec; VmHWM es solo de este proceso
+        "peak = next(int(l.split()[1]) for l in open('/proc/self/status') if l.startswith('VmHWM:'))\n"
+        "print(analyzer.parsed_lines, len(analyzer.endpoints), analyzer.endpoints.spills, peak * 1024)\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script, str(path), str(cap), str(tmp_path)], cwd=PACKAGE_DIR,
+                            capture_output=True, text=True, check=True)
+    parsed, endpoints, spills, peak = map(int, result.stdout.split())
+
+    assert parsed == 60000 and endpoints > 30000
+    assert spills >= 1
+    assert peak < cap, f"RSS pico {peak / 1024 ** 2:.1f} MiB"
+    with open(tmp_path / 'users_detalle_endpoints.csv', encoding='utf-8') as f:
+        assert sum(1 for _ in f) == endpoints + 1
+
+
+def test_endpoint_details_from_counters(line):
+    lines = [line(i, path='/a', rt=rt, status=status)
+             for i, (rt, status) in enumerate([(0.1, 200), (0.3, 200), (0.3, 499), (2.0, 502)])]
+    analyzer = ComprehensiveLogAnalyzer(threshold=1)
+    analyzer.feed(lines).finalize()
+
+    detail = analyzer.get_endpoint_details()['GET /a']
+    times = [0.1, 0.3, 0.3, 2.0]
+    assert detail['total'] == 4
+    assert detail['avg_time'] == statistics.mean(times)
+    assert detail['stdev'] == pytest.approx(statistics.stdev(times))
+    assert (detail['min_time'], detail['max_time']) == (0.1, 2.0)
+    assert detail['p95'] == statistics.quantiles(times, n=100)[94]
+    assert detail['status_dist'] == Counter({200: 2, 499: 1, 502: 1})
+    assert detail['errors_499'] == 1
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Clasificación de user agents
+"""
+
+import pytest
+
+from access_log_analyzer.useragent import classify_user_agent
+
+
+@pytest.mark.parametrize('ua, expected', [
+    ('Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)', ('Googlebot', 'bot', 'bot')),
+    ('Mozilla/5.0 (compatible; SeznamBot/4.0; +https://napoveda.seznam.cz)', ('Otro bot', 'bot', 'bot')),
+    ('my-monitor bot', ('Otro bot', 'bot', 'bot')),
+    ('UptimeRobot/2.0', ('UptimeRobot', 'bot', 'monitor')),
+    ('curl/8.4.0', ('curl', 'bot', 'herramienta')),
+    ('okhttp/4.9.0', ('OkHttp', 'app', 'humano')),
+    ('-', ('Vacío', 'otro', 'desconocido')),
+])
+def test_classify_user_agent(ua, expected):
+    assert classify_user_agent(ua) == expected
+
+
+@pytest.mark.parametrize('ua', [
+    'Mozilla/5.0 (Linux; Android 10; CUBOT_X19 Build/QP1A) AppleWebKit/537.36 Chrome/120.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 12; CUBOT NOTE 30) AppleWebKit/537.36 Chrome/121.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 11; Robotina Tab) AppleWebKit/537.36 Chrome/119.0 Safari/537.36',
+])
+def test_bot_substring_in_device_name_is_human(ua):
+    family, _, ua_class = classify_user_agent(ua)
+    assert (family, ua_class) == ('Chrome', 'humano')